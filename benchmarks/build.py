@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+"""Benchmark grash builds of synthetic sites.
+
+Generates a synthetic site of the given shape and times make() and
+GrashSite.render for a cold build, a warm no-op rebuild, and rebuilds after
+changing a single page and a single module. Throughput is reported in pages
+per second and in MB of build output per second.
+
+Usage:
+  build.py [options]
+
+Options:
+  -h --help               Show this screen.
+  --root=<path>           Generate the site in <path> [default: bench-site].
+  --templates=<n>         Number of page templates [default: 1000].
+  --modules=<n>           Number of template modules [default: 20].
+  --depth=<n>             Depth of the layout inheritance chain [default: 3].
+  --docs=<n>              Number of org documents (needs pandoc) [default: 0].
+  --doc-size=<bytes>      Size of each org document [default: 4096].
+  --static=<n>            Number of static files [default: 100].
+  --static-bytes=<bytes>  Total size of static files [default: 10485760].
+  --jobs=<n>              Number of rendering processes [default: 1].
+  --repeat=<n>            Number of runs of each scenario [default: 3].
+  --json=<path>           Write the results as JSON to <path>.
+
+"""
+# * Libraries
+
+
+import json
+import os
+import shutil
+import sys
+import time
+
+from docopt import docopt
+
+import grash
+
+try:
+    from .synthetic import SiteShape, SyntheticSite
+except ImportError:
+    from synthetic import SiteShape, SyntheticSite
+
+
+# * Functions
+
+
+def directorySize(path):
+    """Return the total size of the files under ~path~ in bytes."""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            total += os.path.getsize(os.path.join(dirpath, filename))
+    return total
+
+
+def timeBuild(site, jobs):
+    """Time make() and GrashSite.render on a synthetic site.
+
+    Args:
+
+        site (:obj:`SyntheticSite`): The site to build.
+
+        jobs (:obj:`int`): The number of rendering processes.
+
+    Returns:
+
+        (:obj:`float`): The wall time of the build in seconds.
+
+    """
+    cwd = os.getcwd()
+    # Pandoc directories are resolved against the working directory.
+    os.chdir(site.root)
+    try:
+        start = time.perf_counter()
+        grash.make(templatePath=site.templatePath,
+                   buildDir=site.buildDir,
+                   staticDirs=site.staticDirs,
+                   pandocDirs=site.pandocDirs,
+                   cacheDir=site.cacheDir,
+                   jobs=jobs,
+                   verbose=False).render()
+        return time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+def clean(site):
+    """Remove the outputs and caches of previous builds."""
+    shutil.rmtree(site.buildDir, ignore_errors=True)
+    shutil.rmtree(site.cacheDir, ignore_errors=True)
+    os.makedirs(site.buildDir)
+
+
+def scenarios(site):
+    """Return the benchmarked scenarios as pairs of names and preparations."""
+    return [("cold", lambda: clean(site)),
+            ("no-op", lambda: None),
+            ("page change", site.touchPage),
+            ("module change", site.touchModule)]
+
+
+def run(site, jobs=1, repeat=3):
+    """Run every scenario ~repeat~ times.
+
+    The first cold build populates the site before the warm scenarios run.
+
+    Returns:
+
+        (:obj:`list` of :obj:`dict`): The best time of each scenario with its
+        throughput.
+
+    """
+    results = []
+    for name, prepare in scenarios(site):
+        times = []
+        for _ in range(repeat):
+            prepare()
+            times.append(timeBuild(site, jobs))
+        best = min(times)
+        outputBytes = directorySize(site.buildDir)
+        results.append({
+            "scenario": name,
+            "best": best,
+            "times": times,
+            "pagesPerSecond": site.pages / best if best else float("inf"),
+            "mbPerSecond": (outputBytes / 1024 ** 2 / best
+                            if best else float("inf")),
+        })
+    return results
+
+
+def report(site, results):
+    """Return the results as a table."""
+    lines = ["{!r}".format(site.shape),
+             "{:<16} {:>10} {:>14} {:>12}".format("scenario", "best (s)",
+                                                   "pages/s", "MB/s")]
+    for result in results:
+        lines.append("{:<16} {:>10.3f} {:>14.1f} {:>12.1f}".format(
+            result["scenario"], result["best"], result["pagesPerSecond"],
+            result["mbPerSecond"]))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+    try:
+        shape = SiteShape(templates=int(args['--templates']),
+                          modules=int(args['--modules']),
+                          depth=int(args['--depth']),
+                          docs=int(args['--docs']),
+                          docSize=int(args['--doc-size']),
+                          staticFiles=int(args['--static']),
+                          staticBytes=int(args['--static-bytes']))
+        jobs = int(args['--jobs'])
+        repeat = max(1, int(args['--repeat']))
+    except ValueError as error:
+        print("Invalid option: {}".format(error))
+        sys.exit(1)
+
+    site = SyntheticSite(os.path.abspath(args['--root']), shape).generate()
+    results = run(site, jobs=jobs, repeat=repeat)
+    print(report(site, results))
+    if args['--json']:
+        with open(args['--json'], "w") as f:
+            json.dump({"shape": vars(shape), "jobs": jobs,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+"""Benchmark the startup time of the grash command line.
+
+Runs ~grash --help~, ~grash --version~ and the build of a site with a single
+template in fresh interpreters, next to an empty interpreter as a baseline,
+and reports the best and median wall time of each.
+
+Usage:
+  startup.py [options]
+
+Options:
+  -h --help      Show this screen.
+  --repeat=<n>   Number of runs of each command [default: 20].
+  --json=<path>  Write the results as JSON to <path>.
+
+"""
+# * Libraries
+
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from docopt import docopt
+
+
+# * Variables
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# * Functions
+
+
+def commands(site):
+    """Return the benchmarked commands as pairs of names and arguments."""
+    grash = [sys.executable, "-m", "grash.cli"]
+    return [("python", [sys.executable, "-c", "pass"]),
+            ("grash --help", grash + ["--help"]),
+            ("grash --version", grash + ["--version"]),
+            ("grash build", grash + ["build", "--src", "templates",
+                                     "--out", "build", "--no-cache"])]
+
+
+def makeSite(root):
+    """Write a site with a single template to ~root~."""
+    os.makedirs(os.path.join(root, "templates"))
+    os.makedirs(os.path.join(root, "build"))
+    with open(os.path.join(root, "templates", "index.html"), "w") as f:
+        f.write("<p>{{ 6 * 7 }}</p>\n")
+
+
+def timeCommand(args, cwd, repeat):
+    """Return the wall times, in seconds, of ~repeat~ runs of a command."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT, env.get("PYTHONPATH")]))
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(repeat=20):
+    """Time every command.
+
+    Returns:
+
+        (:obj:`list` of :obj:`dict`): The best and median time of each
+        command.
+
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as site:
+        makeSite(site)
+        for name, args in commands(site):
+            times = timeCommand(args, site, repeat)
+            results.append({"command": name,
+                            "best": min(times),
+                            "median": statistics.median(times),
+                            "times": times})
+    return results
+
+
+def report(results):
+    """Return the results as a table."""
+    lines = ["{:<20} {:>10} {:>10}".format("command", "best (ms)",
+                                           "median (ms)")]
+    for result in results:
+        lines.append("{:<20} {:>10.1f} {:>10.1f}".format(
+            result["command"], result["best"] * 1000,
+            result["median"] * 1000))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    args = docopt(__doc__, argv=argv)
+    try:
+        repeat = max(1, int(args['--repeat']))
+    except ValueError as error:
+        print("Invalid option: {}".format(error))
+        sys.exit(1)
+
+    results = run(repeat)
+    print(report(results))
+    if args['--json']:
+        with open(args['--json'], "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
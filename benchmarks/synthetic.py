@@ -0,0 +1,245 @@
+# -*- coding:utf-8 -*-
+
+"""Generators of synthetic grash sites of a configurable shape."""
+
+# * Libraries
+
+
+import os
+import random
+import shutil
+
+
+# * Variables
+
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do "
+         "eiusmod tempor incididunt ut labore et dolore magna aliqua").split()
+
+STATIC_DIR = "assets"
+PANDOC_DIR = "posts"
+
+# * Classes
+
+
+class SiteShape:
+    """The shape of a synthetic site.
+
+    Attributes:
+
+        templates (:obj:`int`): The number of page templates.
+
+        modules (:obj:`int`): The number of ~_~-prefixed template modules.
+
+        depth (:obj:`int`):
+            The length of the chain of layouts each page inherits from.
+            Layouts count towards ~modules~; the others are macro libraries.
+
+        docs (:obj:`int`): The number of org documents.
+
+        docSize (:obj:`int`): The approximate size of a document in bytes.
+
+        staticFiles (:obj:`int`): The number of static files.
+
+        staticBytes (:obj:`int`): The total size of static files in bytes.
+
+        seed (:obj:`int`): The seed of the pseudo-random contents.
+
+    """
+
+    def __init__(self, templates=1000, modules=20, depth=3, docs=0,
+                 docSize=4096, staticFiles=100, staticBytes=10 * 1024 ** 2,
+                 seed=0):
+        self.templates = templates
+        self.modules = max(modules, depth)
+        self.depth = depth
+        self.docs = docs
+        self.docSize = docSize
+        self.staticFiles = staticFiles
+        self.staticBytes = staticBytes
+        self.seed = seed
+
+    def __repr__(self):
+        return ("SiteShape(templates={}, modules={}, depth={}, docs={}, "
+                "staticFiles={})").format(self.templates, self.modules,
+                                          self.depth, self.docs,
+                                          self.staticFiles)
+
+
+class SyntheticSite:
+    """A synthetic site generated on disk.
+
+    Attributes:
+
+        root (:obj:`str`): The directory of the site.
+
+        shape (:obj:`SiteShape`): The shape of the site.
+
+    """
+
+    def __init__(self, root, shape):
+        self.root = root
+        self.shape = shape
+
+    def __repr__(self):
+        return "SyntheticSite({}, {!r})".format(self.root, self.shape)
+
+    # * Paths
+
+    @property
+    def templatePath(self):
+        return os.path.join(self.root, "templates")
+
+    @property
+    def buildDir(self):
+        return os.path.join(self.root, "build")
+
+    @property
+    def cacheDir(self):
+        return os.path.join(self.root, ".grash-cache")
+
+    @property
+    def staticDirs(self):
+        return [STATIC_DIR]
+
+    @property
+    def pandocDirs(self):
+        return [PANDOC_DIR] if self.shape.docs else []
+
+    def layoutName(self, level):
+        return "_layouts/level{}.html".format(level)
+
+    def macrosName(self, index):
+        return "_macros/lib{}.html".format(index)
+
+    def pageName(self, index):
+        return "section{}/page{}.html".format(index % 10, index)
+
+    # * Generation
+
+    def _write(self, path, contents, mode="w"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode) as f:
+            f.write(contents)
+
+    def _words(self, rng, count):
+        return " ".join(rng.choice(WORDS) for _ in range(count))
+
+    def generate(self):
+        """Write the site to ~self.root~, replacing any previous contents.
+
+        Returns:
+
+            (:obj:`SyntheticSite`): The site itself.
+
+        """
+        shape = self.shape
+        rng = random.Random(shape.seed)
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.buildDir)
+
+        for level in range(shape.depth):
+            if level == 0:
+                layout = ("<!doctype html>\n<html><head><title>"
+                          "{% block title %}{% endblock %}</title></head>\n"
+                          "<body>{% block body %}{% endblock %}</body>"
+                          "</html>\n")
+            else:
+                layout = ('{{% extends "{}" %}}\n{{% block body %}}'
+                          '<div class="level{}">{{{{ super() }}}}'
+                          '{{% block level{} %}}{{% endblock %}}</div>'
+                          '{{% endblock %}}\n').format(
+                              self.layoutName(level - 1), level, level)
+            self._write(os.path.join(self.templatePath,
+                                     self.layoutName(level)), layout)
+
+        libraries = shape.modules - shape.depth
+        for index in range(libraries):
+            self._write(os.path.join(self.templatePath,
+                                     self.macrosName(index)),
+                        "{{% macro card{0}(title, items) %}}"
+                        "<section><h2>{{{{ title }}}}</h2><ul>"
+                        "{{% for item in items %}}<li>{{{{ item|e }}}}</li>"
+                        "{{% endfor %}}</ul></section>{{% endmacro %}}\n"
+                        .format(index))
+
+        for index in range(shape.templates):
+            imports = ""
+            calls = ""
+            if libraries:
+                library = index % libraries
+                imports = '{{% from "{}" import card{} %}}\n'.format(
+                    self.macrosName(library), library)
+                calls = "{{{{ card{}('{}', {}) }}}}".format(
+                    library, self._words(rng, 3),
+                    [self._words(rng, 4) for _ in range(5)])
+            if shape.depth:
+                page = ('{{% extends "{}" %}}\n{}'
+                        '{{% block title %}}Page {}{{% endblock %}}\n'
+                        '{{% block body %}}<p>{}</p>{}{{% endblock %}}\n'
+                        ).format(self.layoutName(shape.depth - 1), imports,
+                                 index, self._words(rng, 60), calls)
+            else:
+                page = "{}<p>{}</p>{}\n".format(imports,
+                                                self._words(rng, 60), calls)
+            self._write(os.path.join(self.templatePath,
+                                     self.pageName(index)), page)
+
+        if shape.docs:
+            self._write(os.path.join(self.templatePath,
+                                     "_{}.html".format(PANDOC_DIR)),
+                        '{% extends "' + self.layoutName(0) + '" %}\n'
+                        if shape.depth else
+                        "<article>{% block body %}{% endblock %}</article>\n")
+            words = max(1, shape.docSize // 6)
+            for index in range(shape.docs):
+                self._write(os.path.join(self.root, PANDOC_DIR,
+                                         "post{}.org".format(index)),
+                            "#+TITLE: Post {}\n\n* Heading\n\n{}\n".format(
+                                index, self._words(rng, words)))
+
+        if shape.staticFiles:
+            size = shape.staticBytes // shape.staticFiles
+            for index in range(shape.staticFiles):
+                self._write(os.path.join(self.templatePath, STATIC_DIR,
+                                         "dir{}".format(index % 10),
+                                         "file{}.bin".format(index)),
+                            rng.getrandbits(8 * size).to_bytes(size, "little")
+                            if size else b"", mode="wb")
+        return self
+
+    # * Changes
+
+    def touchPage(self, index=0):
+        """Modify a single page template.
+
+        Returns:
+
+            (:obj:`str`): The name of the modified template.
+
+        """
+        name = self.pageName(index)
+        self._write(os.path.join(self.templatePath, name),
+                    "{# touched #}\n", mode="a")
+        return name
+
+    def touchModule(self, index=0):
+        """Modify a single macro library, or the last layout if there is none.
+
+        Returns:
+
+            (:obj:`str`): The name of the modified module.
+
+        """
+        if self.shape.modules > self.shape.depth:
+            name = self.macrosName(index)
+        else:
+            name = self.layoutName(self.shape.depth - 1)
+        self._write(os.path.join(self.templatePath, name),
+                    "{# touched #}\n", mode="a")
+        return name
+
+    @property
+    def pages(self):
+        """Return the number of pages the site renders."""
+        return self.shape.templates + self.shape.docs
@@ -1,6 +1,27 @@
 # -*- coding:utf-8 -*-
 # flake8: noqa
 
-from .config import Settings
-from .watcher import Watcher
-from .grash import make, GrashSite
+# The public names are imported on first access, so that commands which do
+# not build anything, such as ~grash --version~, skip loading jinja2.
+
+__all__ = ["Settings", "Watcher", "make", "GrashSite"]
+
+_LAZY = {"Settings": ".config",
+         "Watcher": ".watcher",
+         "make": ".grash",
+         "GrashSite": ".grash"}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}"
+                             .format(__name__, name))
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
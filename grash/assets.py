@@ -0,0 +1,77 @@
+# * Libraries
+
+
+import json
+import posixpath
+
+
+# * Variables
+
+
+# The name of the map from static files to their fingerprinted names,
+# written to the build directory.
+ASSET_MANIFEST = "asset-manifest.json"
+
+# The number of hex digits of the digest kept in fingerprinted names.
+HASH_LENGTH = 10
+
+
+# * Functions
+
+
+def fingerprint(name, digest, length=HASH_LENGTH):
+    """Return the fingerprinted name of a static file.
+
+    >>> fingerprint("js/jquery.min.js", "0123456789abcdef")
+    'js/jquery.min.0123456789.js'
+    >>> fingerprint("LICENSE", "0123456789abcdef")
+    'LICENSE.0123456789'
+
+    """
+    dirname, basename = posixpath.split(name)
+    stem, dot, extension = basename.rpartition(".")
+    if not stem:
+        # Keep dot files hidden: ~.htaccess~ becomes ~.htaccess.<hash>~.
+        stem, dot, extension = basename, "", ""
+    fingerprinted = "{}.{}{}{}".format(stem, digest[:length], dot, extension)
+    return posixpath.join(dirname, fingerprinted)
+
+
+def assetUrl(assets):
+    """Return the ~asset_url~ global of templates.
+
+    The global maps the path to a static file, relative to the template
+    directory, to the path of its current version in the build directory.
+    Paths missing from ~assets~ are returned unchanged, and a leading slash
+    is kept.
+
+    >>> asset_url = assetUrl({"css/main.css": "css/main.0123456789.css"})
+    >>> asset_url("/css/main.css"), asset_url("logo.png")
+    ('/css/main.0123456789.css', 'logo.png')
+
+    Args:
+
+        assets (:obj:`dict`):
+            A map from static files to their fingerprinted names. It may be
+            filled in after the global has been made.
+
+    Returns:
+
+        (:obj:`callable`): The ~asset_url~ global.
+
+    """
+    def asset_url(path):
+        name = path.lstrip("/")
+        return path[:len(path) - len(name)] + assets.get(name, name)
+
+    return asset_url
+
+
+def dumpAssets(assets):
+    """Return the asset manifest written to the build directory.
+
+    >>> dumpAssets({"b.js": "b.1.js", "a.css": "a.2.css"})
+    b'{"a.css": "a.2.css", "b.js": "b.1.js"}'
+
+    """
+    return json.dumps(assets, sort_keys=True).encode("utf8")
@@ -0,0 +1,187 @@
+# * Libraries
+
+
+import os
+from collections import OrderedDict
+
+import jinja2
+from jinja2.bccache import BytecodeCache, FileSystemBytecodeCache
+
+
+# * Variables
+
+
+MEMORY_CAPACITY = 1024
+
+
+# * Classes
+
+
+class LayeredBytecodeCache(BytecodeCache):
+    """A jinja2 bytecode cache keeping compiled templates in memory and on disk.
+
+    Compiled templates are stored on disk in a directory specific to the
+    installed version of jinja2, so that they survive between builds and are
+    shared by every process of a parallel build. Jinja2 itself discards
+    bytecode compiled from a different source or by another version of
+    Python.
+
+    Recently used bytecode is also kept in memory, which spares long-running
+    processes (e.g. in watch mode) reading it from disk again whenever
+    jinja2 evicts a template from its own cache.
+
+    Attributes:
+
+        directory (:obj:`str`): The directory the bytecode is stored in.
+
+        capacity (:obj:`int`): The number of templates kept in memory.
+
+    """
+
+    def __init__(self, directory, capacity=MEMORY_CAPACITY):
+        self.directory = os.path.join(directory,
+                                      "jinja2-{}".format(jinja2.__version__))
+        os.makedirs(self.directory, exist_ok=True)
+        self.capacity = capacity
+        self._disk = FileSystemBytecodeCache(self.directory)
+        self._memory = OrderedDict()
+
+    def __repr__(self):
+        return "LayeredBytecodeCache({})".format(self.directory)
+
+    def _remember(self, key, data):
+        self._memory[key] = data
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def load_bytecode(self, bucket):
+        data = self._memory.get(bucket.key)
+        if data is not None:
+            self._memory.move_to_end(bucket.key)
+            bucket.bytecode_from_string(data)
+            if bucket.code is not None:
+                return
+        self._disk.load_bytecode(bucket)
+        if bucket.code is not None:
+            self._remember(bucket.key, bucket.bytecode_to_string())
+
+    def dump_bytecode(self, bucket):
+        self._remember(bucket.key, bucket.bytecode_to_string())
+        self._disk.dump_bytecode(bucket)
+
+    def clear(self):
+        self._memory.clear()
+        self._disk.clear()
+
+
+class ContentCache:
+    """A content-addressed on-disk cache of texts.
+
+    Entries are stored in files named after their keys, which subclasses
+    derive from everything the cached text depends on. Reading an entry
+    marks it as recently used, and once the cache exceeds ~maxSize~ bytes,
+    ~evict~ removes the least recently used entries. Entries are written
+    atomically, so that several processes may share a cache.
+
+    Attributes:
+
+        directory (:obj:`str`): The directory the entries are stored in.
+
+        maxSize (:obj:`int`): The size of the cache in bytes.
+
+        hits (:obj:`int`): The number of entries found.
+
+        misses (:obj:`int`): The number of entries missing.
+
+    """
+
+    def __init__(self, directory, maxSize):
+        self.directory = directory
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self.directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Return a cached entry, or None if it is not cached.
+
+        Args:
+
+            key (:obj:`str`): The key of the entry.
+
+        Returns:
+
+            (:obj:`str`): The cached text.
+
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                text = f.read()
+            # Mark the entry as recently used.
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, key, text):
+        """Store an entry.
+
+        Args:
+
+            key (:obj:`str`): The key of the entry.
+
+            text (:obj:`str`): The text to cache.
+
+        Returns:
+
+            None.
+
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "w", encoding="utf8") as f:
+            f.write(text)
+        os.replace(temporary, path)
+
+    def evict(self):
+        """Remove the least recently used entries beyond ~self.maxSize~.
+
+        Returns:
+
+            (:obj:`int`): The number of removed entries.
+
+        """
+        entries = []
+        total = 0
+        try:
+            buckets = list(os.scandir(self.directory))
+        except OSError:
+            return 0
+        for bucket in buckets:
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.maxSize:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
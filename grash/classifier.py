@@ -0,0 +1,201 @@
+# * Libraries
+
+
+import os
+
+from .data import isDataType
+
+
+# * Variables
+
+
+PRIVATE = 1
+MODULE = 2
+STATIC = 4
+PANDOC = 8
+DATA = 16
+
+# A key of trie nodes which cannot clash with a path component.
+_MARK = None
+
+
+# * Functions
+
+
+def splitPath(path):
+    """Split a relative path into its components.
+
+    >>> splitPath("./assets//img/logo.png")
+    ['assets', 'img', 'logo.png']
+
+    """
+    return [component for component in path.replace(os.path.sep, "/")
+            .split("/") if component and component != "."]
+
+
+def _asList(dirs):
+    if not dirs:
+        return []
+    if isinstance(dirs, str):
+        return [dirs]
+    return list(dirs)
+
+
+# * Classes
+
+
+class PathClassifier:
+    """Classifies paths of the template directory by kind.
+
+    The configured static, pandoc and data directories are compiled into a
+    trie of path components, so that classifying a path takes a single walk
+    over its components, whatever the number of directories configured.
+    Results are memoized per path.
+
+    A path is:
+
+    - private if its name or the name of any of its parents starts with '.';
+    - static if it is, or lies in, a static directory;
+    - pandoc if it is a pandoc directory, or a file with one of the pandoc
+      types lying in one;
+    - data if it is a JSON, YAML, TOML or CSV file lying in the data
+      directory;
+    - a module if its name or the name of any of its parents starts with '_'.
+
+    >>> classifier = PathClassifier(["assets", "media/img"], ["posts"], ["org"],
+    ...                             "data")
+    >>> classifier.classify("media/img/logo.png")
+    'static'
+    >>> classifier.classify("media/logo.png")
+    'template'
+    >>> classifier.classify("posts/hello.org")
+    'pandoc'
+    >>> classifier.classify("posts/hello/index.html")
+    'template'
+    >>> classifier.classify("_layouts/base.html")
+    'module'
+    >>> classifier.classify("data/authors.yaml")
+    'data'
+    >>> classifier.isStatic("assets")
+    True
+
+    """
+
+    def __init__(self, staticDirs=None, pandocDirs=None, pandocTypes=None,
+                 dataDir=None):
+        self._trie = {}
+        for dirpath in _asList(staticDirs):
+            self._insert(dirpath, STATIC)
+        for dirpath in _asList(pandocDirs):
+            self._insert(dirpath, PANDOC)
+        for dirpath in _asList(dataDir):
+            self._insert(dirpath, DATA)
+        self._pandocTypes = {"." + docType.lstrip(".")
+                             for docType in _asList(pandocTypes)}
+        self._flags = {}
+
+    def __repr__(self):
+        return "PathClassifier({} paths)".format(len(self._flags))
+
+    @classmethod
+    def fromSettings(cls, settings):
+        """Compile a classifier from a :obj:`grash.config.Settings` instance."""
+        return cls(settings.staticDirs, settings.pandocDirs,
+                   settings.pandocTypes, settings.dataDir)
+
+    def _insert(self, dirpath, flag):
+        node = self._trie
+        for component in splitPath(dirpath):
+            node = node.setdefault(component, {})
+        node[_MARK] = node.get(_MARK, 0) | flag
+
+    def _compute(self, path):
+        components = splitPath(path)
+        flags = 0
+        node = self._trie
+        for depth, component in enumerate(components):
+            if component.startswith("."):
+                flags |= PRIVATE
+            elif component.startswith("_"):
+                flags |= MODULE
+            if node is not None:
+                node = node.get(component)
+                if node is not None and _MARK in node:
+                    mark = node[_MARK]
+                    if mark & STATIC:
+                        flags |= STATIC
+                    if mark & PANDOC:
+                        last = depth == len(components) - 1
+                        if last or self._isPandocType(components[-1]):
+                            flags |= PANDOC
+                    if mark & DATA and depth < len(components) - 1 \
+                       and isDataType(components[-1]):
+                        flags |= DATA
+                    # The shallowest configured directory wins.
+                    node = None
+        return flags
+
+    def _isPandocType(self, name):
+        if not self._pandocTypes:
+            return True
+        return os.path.splitext(name)[1] in self._pandocTypes
+
+    def flags(self, path):
+        """Return the memoized flags of a path.
+
+        Args:
+
+            path (:obj:`str`): A path relative to the template directory.
+
+        Returns:
+
+            (:obj:`int`): A combination of ~PRIVATE~, ~MODULE~, ~STATIC~,
+            ~PANDOC~ and ~DATA~.
+
+        """
+        flags = self._flags.get(path)
+        if flags is None:
+            flags = self._flags[path] = self._compute(path)
+        return flags
+
+    def classify(self, path):
+        """Return the kind of a path.
+
+        Args:
+
+            path (:obj:`str`): A path relative to the template directory.
+
+        Returns:
+
+            One of ~private~, ~static~, ~pandoc~, ~data~, ~module~ or
+            ~template~.
+
+        """
+        flags = self.flags(path)
+        if flags & PRIVATE:
+            return "private"
+        elif flags & STATIC:
+            return "static"
+        elif flags & PANDOC:
+            return "pandoc"
+        elif flags & DATA:
+            return "data"
+        elif flags & MODULE:
+            return "module"
+        else:
+            return "template"
+
+    def isPrivate(self, path):
+        return bool(self.flags(path) & PRIVATE)
+
+    def isModule(self, path):
+        return bool(self.flags(path) & MODULE)
+
+    def isStatic(self, path):
+        return bool(self.flags(path) & STATIC)
+
+    def isPandoc(self, path):
+        return bool(self.flags(path) & PANDOC)
+
+    def isData(self, path):
+        return bool(self.flags(path) & DATA)
@@ -7,8 +7,19 @@ Takes a directory with jinja2 templates as <srcpath> (defaults to ./templates)
 and renders the HTML pages to the <outpath> (defaults to ./build).
 
 Usage:
-  grash build [--src=<srcpath> --out=<outpath> --static=<a,b,c>]
+  grash build [--src=<srcpath> --out=<outpath> --static=<a,b,c> --jobs=<n>]
+              [--force --cache=<cachepath> --no-cache --hardlink --checksum]
+              [--profile --profile-out=<reportpath> --top=<n>]
+              [--shard=<i/N> --minify --compress --fingerprint]
+  grash merge [--hardlink] <outpath> <shardpath>...
   grash watch [--src=<srcpath> --out=<outpath> --static=<a,b,c>]
+              [--cache=<cachepath> --no-cache --minify --compress]
+              [--fingerprint]
+              [--debounce=<seconds> --latency=<seconds>]
+  grash serve [--src=<srcpath> --static=<a,b,c>]
+              [--cache=<cachepath> --no-cache]
+              [--debounce=<seconds> --latency=<seconds>]
+              [--host=<host> --port=<port>]
   grash (-h | --help)
   grash --version
 
@@ -18,6 +29,37 @@ Options:
   --static=<a,b,c> Accepts a comma-separated list of static directories
   --out=<outpath>  Render the HTML pages to the <outpath> directory.
   --src=<srcpath>  Render jinja2 templates from <srcpath> directory.
+  --jobs=<n>       Render templates with <n> parallel processes
+                   (0 stands for the number of CPUs).
+  --force          Rebuild all pages, even those which are up to date.
+  --cache=<cachepath>  Cache compiled templates in <cachepath>
+                       (defaults to ./.grash-cache).
+  --no-cache       Do not cache compiled templates and pandoc conversions
+                   between builds: every build converts every pandoc
+                   document again.
+  --hardlink       Hard link static files into <outpath> instead of copying.
+  --checksum       Compare static files by contents rather than by size and
+                   modification time.
+  --profile        Time each phase, template, pandoc conversion and static
+                   copy, print the slowest items and write a JSON report.
+  --profile-out=<reportpath>  Write the JSON report of --profile to
+                              <reportpath> [default: grash-profile.json].
+  --top=<n>        List the <n> slowest items with --profile [default: 10].
+  --shard=<i/N>    Only build the i-th of N shards of the site (counting
+                   from 1), to be combined with grash merge.
+  --minify         Minify rendered HTML pages, leaving the contents of pre,
+                   script, style and textarea elements untouched.
+  --compress       Write .gz siblings, and .br ones if brotli is installed,
+                   next to text outputs of at least 1 KiB.
+  --fingerprint    Write static files as name.<hash>.ext, listed in
+                   asset-manifest.json; templates link them with
+                   asset_url(name).
+  --debounce=<seconds>  Rebuild once changes have stopped for <seconds>
+                        [default: 0.2].
+  --latency=<seconds>   Rebuild at the latest <seconds> after a change, even
+                        if changes keep coming [default: 2.0].
+  --host=<host>    Serve pages on <host> [default: 127.0.0.1].
+  --port=<port>    Serve pages on <port> [default: 8000].
 
 """
 import os
@@ -25,6 +67,8 @@ import sys
 
 import grash
 from grash.config import Settings
+from grash.shard import mergeShards, parseShard
+from grash.profiler import Profiler
 
 from docopt import docopt
 
@@ -41,12 +85,31 @@ def render(args):
             For example:
 
             {
+                '--force': False,
+                '--cache': None,
+                '--checksum': False,
+                '--compress': False,
+                '--debounce': '0.2',
+                '--fingerprint': False,
+                '--hardlink': False,
                 '--help': False,
+                '--host': '127.0.0.1',
+                '--jobs': None,
+                '--latency': '2.0',
+                '--minify': False,
+                '--no-cache': False,
+                '--profile': False,
+                '--profile-out': 'grash-profile.json',
+                '--shard': None,
                 '--static': None,
+                '--top': '10',
                 '--version': False,
                 '--out': None,
+                '--port': '8000',
                 '--src': None,
                 'build': True,
+                'merge': False,
+                'serve': False,
                 'watch': False
             }
     """
@@ -69,7 +132,7 @@ def render(args):
     else:
         outpath = settings.buildDir
 
-    if not os.path.isdir(outpath):
+    if not args.get('serve') and not os.path.isdir(outpath):
         print("The output directory '{}' is invalid."
               .format(outpath))
         sys.exit(1)
@@ -86,19 +149,114 @@ def render(args):
                       .format(path))
                 sys.exit(1)
 
+    if args.get('--jobs') is None:
+        jobs = settings.jobs
+    else:
+        try:
+            jobs = int(args['--jobs'])
+        except ValueError:
+            print("The number of jobs '{}' is invalid."
+                  .format(args['--jobs']))
+            sys.exit(1)
+
+    try:
+        debounce = float(args.get('--debounce') or settings.debounce)
+        latency = float(args.get('--latency') or settings.latency)
+    except ValueError:
+        print("The debounce interval '{}' or latency '{}' is invalid."
+              .format(args.get('--debounce'), args.get('--latency')))
+        sys.exit(1)
+
+    profiler = Profiler() if args.get('--profile') else None
+    try:
+        top = int(args.get('--top') or 10)
+    except ValueError:
+        print("The number of slowest items '{}' is invalid."
+              .format(args['--top']))
+        sys.exit(1)
+
+    shard = None
+    if args.get('--shard') is not None:
+        try:
+            shard = parseShard(args['--shard'])
+        except ValueError:
+            print("The shard '{}' is invalid.".format(args['--shard']))
+            sys.exit(1)
+
+    if args.get('--no-cache'):
+        cachepath = None
+    elif args.get('--cache') is not None:
+        cachepath = args['--cache']
+    else:
+        cachepath = settings.cacheDir
+
     site = grash.make(
         templatePath=srcpath,
         buildDir=outpath,
-        staticDirs=staticpaths
+        staticDirs=staticpaths,
+        jobs=jobs,
+        cacheDir=cachepath,
+        copyStrategy="hardlink" if args.get('--hardlink')
+        else settings.copyStrategy,
+        checksum=args.get('--checksum') or settings.checksum,
+        minify=args.get('--minify') or settings.minify,
+        compress=args.get('--compress') or settings.compress,
+        fingerprint=args.get('--fingerprint') or settings.fingerprint,
+        debounce=debounce,
+        latency=latency,
+        profiler=profiler,
+        shard=shard
     )
 
+    if args.get('serve'):
+        try:
+            port = int(args.get('--port') or 8000)
+        except ValueError:
+            print("The port '{}' is invalid.".format(args['--port']))
+            sys.exit(1)
+        site.serve(host=args.get('--host') or '127.0.0.1', port=port)
+        return
+
     reloader = args['watch']
 
-    site.render(reloader=reloader)
+    site.render(reloader=reloader, force=args.get('--force', False))
+
+    if profiler is not None:
+        print(profiler.report(top))
+        reportpath = args.get('--profile-out') or 'grash-profile.json'
+        profiler.write(reportpath)
+        print("Wrote the profile to {}.".format(reportpath))
+
+
+def merge(args):
+    """
+    Merge the build directories of shards.
+
+    Args:
+
+        args (:obj:`dict`):
+
+            A map from command-line options to their values, with the
+            ~<outpath>~ to merge the ~<shardpath>~ directories into.
+    """
+    for shardpath in args['<shardpath>']:
+        if not os.path.isdir(shardpath):
+            print("The shard directory '{}' is invalid.".format(shardpath))
+            sys.exit(1)
+    outpath = args['<outpath>']
+    os.makedirs(outpath, exist_ok=True)
+    report = mergeShards(args['<shardpath>'], outpath,
+                         strategy="hardlink" if args.get('--hardlink')
+                         else Settings().copyStrategy)
+    print(report)
 
 
 def main():
-    render(docopt(__doc__, version='grash 0.0.1'))
+    args = docopt(__doc__, version='grash 0.0.1')
+    if args.get('merge'):
+        merge(args)
+    else:
+        render(args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,162 @@
+# * Libraries
+
+
+import gzip
+import os
+
+
+# * Variables
+
+
+# Outputs smaller than this many bytes are not worth compressing.
+THRESHOLD = 1024
+
+# The suffixes of every format compressed siblings may be written in.
+FORMATS = ("gz", "br")
+
+COMPRESSIBLE = frozenset([".html", ".htm", ".xhtml", ".css", ".js", ".mjs",
+                          ".json", ".map", ".xml", ".rss", ".atom", ".svg",
+                          ".txt", ".csv", ".md", ".ico", ".ttf", ".otf",
+                          ".eot", ".wasm"])
+
+_brotli = None
+
+
+# * Functions
+
+
+def _brotliModule():
+    """Return the brotli module, or False if none is installed."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+        except ImportError:
+            try:
+                import brotlicffi as brotli
+            except ImportError:
+                brotli = False
+        _brotli = brotli
+    return _brotli
+
+
+def compressionFormats():
+    """Return the formats compressed siblings are written in.
+
+    Brotli siblings are only written if a brotli module is installed.
+
+    Returns:
+
+        (:obj:`list` of :obj:`str`): The suffixes of the formats.
+
+    """
+    if _brotliModule():
+        return list(FORMATS)
+    return ["gz"]
+
+
+def isCompressible(name):
+    """Check whether an output is worth compressing by its name.
+
+    >>> isCompressible("css/main.css"), isCompressible("logo.png")
+    (True, False)
+
+    """
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE
+
+
+def compressBytes(data, fmt):
+    """Compress a byte string at the highest level of a format.
+
+    The output only depends on ~data~, so that unchanged outputs yield
+    identical siblings.
+
+    Args:
+
+        data (:obj:`bytes`): The data to compress.
+
+        fmt (:obj:`str`): Either ~gz~ or ~br~.
+
+    Returns:
+
+        (:obj:`bytes`): The compressed data.
+
+    """
+    if fmt == "gz":
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    if fmt == "br":
+        return _brotliModule().compress(data)
+    raise ValueError("unknown compression format {!r}".format(fmt))
+
+
+def compressFile(path, formats):
+    """Write the compressed siblings ~<path>.<format>~ of a file.
+
+    Siblings are written atomically, and only kept if they are smaller than
+    the file itself. Siblings in other formats, or larger than the file, are
+    removed.
+
+    Args:
+
+        path (:obj:`str`): The path to the file.
+
+        formats (:obj:`list` of :obj:`str`): The formats to compress it in.
+
+    Returns:
+
+        (:obj:`tuple`): The path, the formats of the siblings kept and the
+        number of bytes written.
+
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    kept = []
+    written = 0
+    for fmt in FORMATS:
+        sibling = "{}.{}".format(path, fmt)
+        compressed = compressBytes(data, fmt) if fmt in formats else data
+        if len(compressed) >= len(data):
+            if os.path.lexists(sibling):
+                os.remove(sibling)
+            continue
+        temporary = "{}.{}.tmp".format(sibling, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(compressed)
+        os.replace(temporary, sibling)
+        kept.append(fmt)
+        written += len(compressed)
+    return path, kept, written
+
+
+def _compressWorker(item):
+    return compressFile(*item)
+
+
+def compressFiles(paths, formats, jobs=1):
+    """Write the compressed siblings of files, over worker processes.
+
+    Args:
+
+        paths (:obj:`list` of :obj:`str`): The paths to the files.
+
+        formats (:obj:`list` of :obj:`str`): The formats to compress them in.
+
+        jobs (:obj:`int`): The number of worker processes.
+
+    Yields:
+
+        (:obj:`tuple`): The path, the formats of the siblings kept and the
+        number of bytes written for each file, in the order of ~paths~.
+
+    """
+    items = [(path, formats) for path in paths]
+    if jobs <= 1 or len(items) <= 1:
+        yield from map(_compressWorker, items)
+        return
+    # Serial builds do not pay for loading multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = min(jobs, len(items))
+    chunksize = max(1, len(items) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        yield from executor.map(_compressWorker, items, chunksize=chunksize)
@@ -3,9 +3,24 @@
 
 ASSETS = "assets"
 BUILD_PATH = "build"
+CACHE_DIR = ".grash-cache"
+CHECKSUM = False
+DATA_DIR = "data"
+COMPRESS = False
+COMPRESS_THRESHOLD = 1024
+DEBOUNCE = 0.2
+FINGERPRINT = False
+HOST = "127.0.0.1"
+LATENCY = 2.0
+MINIFY = False
+PANDOC_CACHE_SIZE = 512 * 1024 * 1024
+COPY_STRATEGY = "copy"
 ENCODING = "utf8"
+JOBS = 1
 PANDOC_DIRS = []
 PANDOC_TYPES = ["org"]
+PLUGINS = []
+PORT = 8000
 TEMPLATE_DIRECTORY = "templates"
 
 # * Classes
@@ -35,6 +50,63 @@ class Settings:
             The list of paths to the directories with static files.
             Defaults to ['pages', 'posts']
 
+        jobs (:obj:`int`):
+            The number of processes rendering templates in parallel.
+            Values below 1 stand for the number of CPUs available.
+
+        cacheDir (:obj:`str`):
+            The path to the directory where compiled templates and pandoc
+            conversions are cached between builds. No cache is kept if
+            None, in which case every build converts every pandoc document
+            again, even if none has changed; only the outputs whose
+            contents have changed are written.
+
+        copyStrategy (:obj:`str`):
+            Either ~copy~, or ~hardlink~ to link static files into the build
+            directory where possible.
+
+        checksum (:obj:`bool`):
+            True if static files are compared by contents rather than by
+            size and modification time, False otherwise.
+
+        debounce (:obj:`float`):
+            The quiet period, in seconds, after which a burst of changes to
+            watched files triggers a single rebuild.
+
+        latency (:obj:`float`):
+            The longest time, in seconds, a change to a watched file may wait
+            for its rebuild while changes keep coming.
+
+        pandocCacheSize (:obj:`int`):
+            The size, in bytes, beyond which the least recently used pandoc
+            conversions are evicted from the cache.
+
+        minify (:obj:`bool`):
+            True if rendered HTML pages are minified before being written,
+            False otherwise.
+
+        compress (:obj:`bool`):
+            True if compressed siblings are written next to outputs, False
+            otherwise.
+
+        compressThreshold (:obj:`int`):
+            The size, in bytes, below which outputs are not compressed.
+
+        fingerprint (:obj:`bool`):
+            True if static files are written under names holding a digest
+            of their contents, False otherwise.
+
+        dataDir (:obj:`str`):
+            The path, relative to ~templatePath~, to the directory of JSON,
+            YAML, TOML and CSV files exposed to templates as the ~data~
+            global. No data is exposed if None.
+
+        plugins (:obj:`list` of :obj:`str`):
+            The modules registering filters, tests and globals, as module
+            names or paths to their sources, in addition to the installed
+            plugins and to the ~grash_plugins.py~ module next to
+            ~templatePath~.
+
     """
     def __init__(self,
                  buildDir=BUILD_PATH,
@@ -42,7 +114,20 @@ class Settings:
                  templatePath=TEMPLATE_DIRECTORY,
                  pandocDirs=PANDOC_DIRS,
                  pandocTypes=PANDOC_TYPES,
-                 encoding=ENCODING):
+                 encoding=ENCODING,
+                 jobs=JOBS,
+                 cacheDir=CACHE_DIR,
+                 copyStrategy=COPY_STRATEGY,
+                 checksum=CHECKSUM,
+                 debounce=DEBOUNCE,
+                 latency=LATENCY,
+                 pandocCacheSize=PANDOC_CACHE_SIZE,
+                 minify=MINIFY,
+                 compress=COMPRESS,
+                 compressThreshold=COMPRESS_THRESHOLD,
+                 fingerprint=FINGERPRINT,
+                 dataDir=DATA_DIR,
+                 plugins=PLUGINS):
 
         self.templatePath = templatePath
         self.buildDir = buildDir
@@ -50,3 +135,16 @@ class Settings:
         self.encoding = encoding
         self.pandocDirs = pandocDirs
         self.pandocTypes = pandocTypes
+        self.jobs = jobs
+        self.cacheDir = cacheDir
+        self.copyStrategy = copyStrategy
+        self.checksum = checksum
+        self.debounce = debounce
+        self.latency = latency
+        self.pandocCacheSize = pandocCacheSize
+        self.minify = minify
+        self.compress = compress
+        self.compressThreshold = compressThreshold
+        self.fingerprint = fingerprint
+        self.dataDir = dataDir
+        self.plugins = plugins
@@ -0,0 +1,257 @@
+# * Libraries
+
+
+import csv
+import io
+import json
+import os
+
+
+# * Variables
+
+
+# The suffixes of the files of the data directory, in order of precedence
+# when several files share a stem.
+DATA_TYPES = (".json", ".yaml", ".yml", ".toml", ".csv")
+
+# The attributes of data stores, which shadow the data files of the same
+# stem: those are only read by subscript, e.g. ~data["keys"]~.
+RESERVED = frozenset(["root", "encoding", "keys", "get", "invalidate",
+                      "clear"])
+
+
+# * Functions
+
+
+def _loadJSON(text):
+    return json.loads(text)
+
+
+def _loadYAML(text):
+    import yaml
+
+    return yaml.safe_load(text)
+
+
+def _loadTOML(text):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            import toml
+
+            return toml.loads(text)
+    return tomllib.loads(text)
+
+
+def _loadCSV(text):
+    return list(csv.DictReader(io.StringIO(text, newline="")))
+
+
+_LOADERS = {".json": _loadJSON,
+            ".yaml": _loadYAML,
+            ".yml": _loadYAML,
+            ".toml": _loadTOML,
+            ".csv": _loadCSV}
+
+
+def isDataType(name):
+    """Check whether a file is a data file by its name.
+
+    >>> isDataType("authors.yaml"), isDataType("index.html")
+    (True, False)
+
+    """
+    return os.path.splitext(name)[1].lower() in _LOADERS
+
+
+def dataKey(name):
+    """Return the key of the ~data~ global a data file is read through.
+
+    Files are read through their stem, and files of subdirectories through
+    the name of their topmost directory.
+
+    >>> dataKey("authors.json"), dataKey("team/members.yaml")
+    ('authors', 'team')
+
+    Args:
+
+        name (:obj:`str`): The name of a file relative to the data directory.
+
+    Returns:
+
+        (:obj:`str`): The key of the file.
+
+    """
+    head, _, rest = name.partition("/")
+    return head if rest else os.path.splitext(head)[0]
+
+
+def loadData(path, encoding="utf8"):
+    """Parse a data file according to its suffix.
+
+    CSV files are parsed as lists of rows, each mapping the fields of the
+    header to their values. YAML files require PyYAML, and TOML files
+    ~tomllib~ or one of its backports.
+
+    Args:
+
+        path (:obj:`str`): The path to the file.
+
+        encoding (:obj:`str`): The encoding of the file.
+
+    Returns:
+
+        The parsed contents of the file.
+
+    """
+    loader = _LOADERS[os.path.splitext(path)[1].lower()]
+    with open(path, encoding=encoding) as f:
+        return loader(f.read())
+
+
+# * Classes
+
+
+class DataStore:
+    """The files of the data directory, exposed as the ~data~ global.
+
+    ~data.authors~ (or ~data["authors"]~) is the parsed contents of
+    ~authors.json~, ~authors.yaml~, ~authors.toml~ or ~authors.csv~, and
+    ~data.team~ the store of the ~team~ subdirectory. Files are parsed on
+    their first access and kept until ~invalidate~ drops them, so that every
+    template of a build shares a single parse. The files whose stem is
+    one of the ~RESERVED~ attributes of the store are only read by
+    subscript.
+
+    >>> import tempfile
+    >>> root = tempfile.mkdtemp()
+    >>> for name in ["site", "keys"]:
+    ...     with open(os.path.join(root, name + ".json"), "w") as f:
+    ...         _ = f.write('{"title": "Grash"}')
+    >>> data = DataStore(root)
+    >>> data.site["title"], "site" in data, data.get("missing")
+    ('Grash', True, None)
+    >>> data["keys"]["title"], sorted(data.keys())
+    ('Grash', ['keys', 'site'])
+
+    Attributes:
+
+        root (:obj:`str`): The path to the data directory.
+
+        encoding (:obj:`str`): The encoding of the data files.
+
+    """
+
+    def __init__(self, root, encoding="utf8"):
+        self.root = root
+        self.encoding = encoding
+        self._entries = None
+        self._values = {}
+
+    def __repr__(self):
+        return "DataStore({})".format(self.root)
+
+    def __getstate__(self):
+        # Workers parse the files they read themselves.
+        return {"root": self.root, "encoding": self.encoding}
+
+    def __setstate__(self, state):
+        self.__init__(state["root"], state["encoding"])
+
+    def _scan(self):
+        """Return a map from keys to the file or subdirectory they read."""
+        if self._entries is None:
+            entries = {}
+            try:
+                scanned = sorted(os.scandir(self.root),
+                                 key=lambda entry: entry.name)
+            except OSError:
+                scanned = []
+            for entry in scanned:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir():
+                    entries.setdefault(entry.name, entry.name)
+                elif isDataType(entry.name):
+                    key = dataKey(entry.name)
+                    current = entries.get(key)
+                    if current is None or current != key \
+                       and self._precedes(entry.name, current):
+                        entries[key] = entry.name
+            self._entries = entries
+        return self._entries
+
+    @staticmethod
+    def _precedes(name, other):
+        suffixes = [os.path.splitext(filename)[1].lower()
+                    for filename in (name, other)]
+        return DATA_TYPES.index(suffixes[0]) < DATA_TYPES.index(suffixes[1])
+
+    def __contains__(self, key):
+        return key in self._scan()
+
+    def __iter__(self):
+        return iter(self._scan())
+
+    def __len__(self):
+        return len(self._scan())
+
+    def keys(self):
+        return self._scan().keys()
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        entry = self._scan()[key]
+        path = os.path.join(self.root, entry)
+        if entry == key:
+            value = DataStore(path, self.encoding)
+        else:
+            value = loadData(path, self.encoding)
+        self._values[key] = value
+        return value
+
+    def __getattr__(self, key):
+        if key.startswith("_"):
+            raise AttributeError(key)
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def invalidate(self, name):
+        """Drop the parsed contents of a data file.
+
+        Args:
+
+            name (:obj:`str`): The name of the file relative to the data
+                directory, with components separated by ~/~.
+
+        Returns:
+
+            None.
+
+        """
+        # The file may have been added or removed.
+        self._entries = None
+        head, _, rest = name.partition("/")
+        if rest:
+            store = self._values.get(head)
+            if isinstance(store, DataStore):
+                store.invalidate(rest)
+                return
+        self._values.pop(dataKey(name), None)
+
+    def clear(self):
+        """Drop the parsed contents of every data file."""
+        self._entries = None
+        self._values.clear()
@@ -0,0 +1,417 @@
+# * Libraries
+
+
+from jinja2 import TemplateError, meta, nodes
+
+from .data import RESERVED
+from .pagination import paginationOf
+
+
+# * Functions
+
+
+def _dataKeys(ast):
+    """Return the keys of the ~data~ global a parsed template reads.
+
+    Returns:
+
+        (:obj:`set` of :obj:`str`): The keys read through constant
+        attributes or subscripts, or None if ~data~ is used in any other
+        way.
+
+    """
+    keys = set()
+    accessed = set()
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        if not isinstance(node.node, nodes.Name) or node.node.name != "data":
+            continue
+        if isinstance(node, nodes.Getattr):
+            if node.attr in ("get", "keys"):
+                # Methods of :obj:`grash.data.DataStore` may read any key.
+                continue
+            if node.attr not in RESERVED:
+                keys.add(node.attr)
+        elif isinstance(node.arg, nodes.Const) \
+           and isinstance(node.arg.value, str):
+            keys.add(node.arg.value)
+        else:
+            continue
+        accessed.add(id(node.node))
+    for node in ast.find_all(nodes.Name):
+        if node.name == "data" and node.ctx == "load" \
+           and id(node) not in accessed:
+            return None
+    return keys
+
+
+# * Classes
+
+
+class DependencyGraph:
+    """A graph of references between templates.
+
+    Edges are built from the ~{% extends %}~, ~{% include %}~, ~{% import %}~
+    and ~{% from %}~ tags of each template, as reported by
+    ~jinja2.meta.find_referenced_templates~, and can be followed in both
+    directions: from a template to the templates it depends on, and from a
+    template to the templates depending on it.
+
+    A template referencing a name which is only known at render time
+    (e.g. ~{% include page.layout %}~) is dynamic: it may depend on any
+    template, so it is reported as a dependent of every template.
+
+    The graph also records the static files each template references
+    through calls to ~asset_url~ with a constant path, and the global
+    variables it reads, such as ~documents~, the pagination it declares and
+    the keys of the ~data~ global it reads (~data.authors~ or
+    ~data["authors"]~). A template calling ~asset_url~ with any other
+    argument may reference every static file, and a template using ~data~
+    in any other way may read every data file.
+
+    The references of each template are cached by the digest of its source,
+    so that unchanged templates are not parsed again.
+
+    Attributes:
+
+        cache (:obj:`dict`):
+            A map from template names to a map holding the ~digest~ of their
+            source, their ~references~, whether they are ~dynamic~, the
+            static files they reference (~assets~, None for any), the
+            ~globals~ they read, their ~pagination~ and the keys of ~data~
+            they read (None for any). It can be persisted between builds.
+
+    """
+
+    def __init__(self, environment, sourceDigest, cache=None):
+        """
+        Args:
+
+            environment (:obj:`jinja2.Environment`):
+                The environment used to load and parse templates.
+
+            sourceDigest (:obj:`callable`):
+                A function returning the digest of the source of a template
+                given its name, raising ~OSError~ if the template is missing.
+
+            cache (:obj:`dict`): A cache of references to start from.
+
+        """
+        self._env = environment
+        self._sourceDigest = sourceDigest
+        self.cache = cache if cache is not None else {}
+        self._references = {}
+        self._referrers = {}
+        self._dynamic = set()
+        self._assets = {}
+        self._globals = {}
+        self._pagination = {}
+        self._data = {}
+
+    def __repr__(self):
+        return "DependencyGraph({} templates)".format(len(self._references))
+
+    def __contains__(self, name):
+        return name in self._references
+
+    # * Updates
+
+    def _parse(self, name):
+        """Return the references of a template, whether it is dynamic, the
+        static files it references, the global variables it reads, its
+        pagination and the keys of ~data~ it reads."""
+        try:
+            source = self._env.loader.get_source(self._env, name)[0]
+            ast = self._env.parse(source, name)
+        except (TemplateError, UnicodeDecodeError):
+            # Broken templates reference nothing; rendering them reports
+            # the error.
+            return set(), False, set(), set(), None, set()
+        references = set()
+        dynamic = False
+        for reference in meta.find_referenced_templates(ast):
+            if reference is None:
+                dynamic = True
+            else:
+                references.add(reference)
+        assets = set()
+        for call in ast.find_all(nodes.Call):
+            if not isinstance(call.node, nodes.Name) \
+               or call.node.name != "asset_url":
+                continue
+            if call.args and isinstance(call.args[0], nodes.Const) \
+               and isinstance(call.args[0].value, str):
+                assets.add(call.args[0].value.lstrip("/"))
+            else:
+                assets = None
+                break
+        # Globals of the environment are not undeclared to
+        # ~meta.find_undeclared_variables~, so every name read is kept.
+        variables = {node.name for node in ast.find_all(nodes.Name)
+                     if node.ctx == "load"}
+        data = _dataKeys(ast)
+        pagination = paginationOf(ast)
+        if pagination is not None:
+            # The reads of the paginated collection are kept apart from
+            # those of the template, as each page is described by its own
+            # slice of the collection.
+            try:
+                collection = self._env.parse(
+                    "{{{{ {} }}}}".format(pagination["items"]))
+            except TemplateError:
+                collection = None
+            if collection is not None:
+                pagination["globals"] = sorted(
+                    {node.name for node in collection.find_all(nodes.Name)
+                     if node.ctx == "load"})
+                keys = _dataKeys(collection)
+                pagination["data"] = sorted(keys) if keys is not None \
+                    else None
+            else:
+                pagination.update({"globals": [], "data": []})
+        return references, dynamic, assets, variables, pagination, data
+
+    def _unlink(self, name):
+        for reference in self._references.pop(name, ()):
+            referrers = self._referrers.get(reference)
+            if referrers is not None:
+                referrers.discard(name)
+                if not referrers:
+                    del self._referrers[reference]
+        self._dynamic.discard(name)
+        self._assets.pop(name, None)
+        self._globals.pop(name, None)
+        self._pagination.pop(name, None)
+        self._data.pop(name, None)
+
+    def update(self, name):
+        """Add a template to the graph or refresh its references.
+
+        A template whose source is missing is removed from the graph.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            None.
+
+        """
+        try:
+            digest = self._sourceDigest(name)
+        except OSError:
+            self.remove(name)
+            return
+        cached = self.cache.get(name)
+        if cached is not None and cached["digest"] == digest:
+            references = set(cached["references"])
+            dynamic = cached["dynamic"]
+            assets = set(cached["assets"]) if cached["assets"] is not None \
+                else None
+            variables = set(cached["globals"])
+            pagination = cached["pagination"]
+            data = set(cached["data"]) if cached["data"] is not None \
+                else None
+        else:
+            references, dynamic, assets, variables, pagination, data = \
+                self._parse(name)
+            self.cache[name] = {
+                "digest": digest,
+                "references": sorted(references),
+                "dynamic": dynamic,
+                "assets": sorted(assets) if assets is not None else None,
+                "globals": sorted(variables),
+                "pagination": pagination,
+                "data": sorted(data) if data is not None else None}
+        self._unlink(name)
+        self._references[name] = references
+        self._assets[name] = assets
+        self._globals[name] = variables
+        self._data[name] = data
+        if pagination is not None:
+            self._pagination[name] = pagination
+        for reference in references:
+            self._referrers.setdefault(reference, set()).add(name)
+        if dynamic:
+            self._dynamic.add(name)
+
+    def build(self, names):
+        """Add templates to the graph.
+
+        Args:
+
+            names (:obj:`list` of :obj:`str`): The names of templates.
+
+        Returns:
+
+            None.
+
+        """
+        for name in names:
+            self.update(name)
+
+    def remove(self, name):
+        """Remove a template and the references it makes from the graph.
+
+        References made to the template by others are kept, as they still
+        depend on it should it reappear.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            None.
+
+        """
+        self._unlink(name)
+        self.cache.pop(name, None)
+
+    # * Queries
+
+    def references(self, name):
+        """Return the templates directly referenced by a template."""
+        return set(self._references.get(name, ()))
+
+    def referrers(self, name):
+        """Return the templates directly referencing a template."""
+        return set(self._referrers.get(name, ()))
+
+    def _reach(self, start, edges):
+        reached = set()
+        pending = list(start)
+        while pending:
+            name = pending.pop()
+            for neighbour in edges.get(name, ()):
+                if neighbour not in reached:
+                    reached.add(neighbour)
+                    pending.append(neighbour)
+        return reached
+
+    def dependencies(self, name):
+        """Return the templates a template depends on, directly or not.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The names of its dependencies.
+
+        """
+        return self._reach([name], self._references)
+
+    def dependents(self, name):
+        """Return the templates depending on a template, directly or not.
+
+        Dynamic templates and their dependents are always included.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The names of its dependents.
+
+        """
+        start = [name] + sorted(self._dynamic - {name})
+        return (self._reach(start, self._referrers)
+                | self._dynamic) - {name}
+
+    def assets(self, name):
+        """Return the static files a template references, directly or not.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The names of the static files passed
+            to ~asset_url~ by the template or its dependencies, or None if
+            they may reference any static file.
+
+        """
+        assets = set()
+        for dependency in self.dependencies(name) | {name}:
+            referenced = self._assets.get(dependency, set())
+            if referenced is None:
+                return None
+            assets.update(referenced)
+        return assets
+
+    def globals(self, name):
+        """Return the global variables a template reads, directly or not.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The names of the variables read by
+            the template or its dependencies, local ones included.
+
+        """
+        variables = set()
+        for dependency in self.dependencies(name) | {name}:
+            variables.update(self._globals.get(dependency, ()))
+        return variables
+
+    def data(self, name):
+        """Return the keys of ~data~ a template reads, directly or not.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The keys of ~data~ read by the
+            template or its dependencies, or None if they may read any.
+
+        """
+        keys = set()
+        for dependency in self.dependencies(name) | {name}:
+            read = self._data.get(dependency, set())
+            if read is None:
+                return None
+            keys.update(read)
+        return keys
+
+    def pagination(self, name):
+        """Return the pagination a template declares.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`dict`): The expression of the paginated collection as
+            ~items~, the number of items per page as ~size~, the global
+            variables the expression reads as ~globals~ and the keys of
+            ~data~ it reads as ~data~ (None for any), or None if the
+            template is not paginated.
+
+        """
+        return self._pagination.get(name)
+
+    def isDynamic(self, name):
+        """Check whether a template may depend on templates unknown to the graph.
+
+        Args:
+
+            name (:obj:`str`): The name of a template.
+
+        Returns:
+
+            True if the template or any of its dependencies is dynamic,
+            False otherwise.
+
+        """
+        return any(dependency in self._dynamic
+                   for dependency in self.dependencies(name) | {name})
@@ -0,0 +1,84 @@
+# * Libraries
+
+
+import os
+
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemLoader
+
+from .assets import assetUrl
+from .cache import LayeredBytecodeCache
+from .data import DataStore
+from .metadata import DocumentIndex
+from .plugins import loadPlugins
+
+
+# * Functions
+
+
+def makeEnvironment(settings, pages=None, assets=None, documents=None,
+                    data=None, plugins=None):
+    """Build a jinja2 environment for the site described by ~settings~.
+
+    Every process rendering templates (the main one as well as the workers of
+    the parallel renderer) builds its environment through this function, so
+    that all of them render identically and share the same bytecode cache.
+
+    Args:
+
+        settings (:obj:`grash.config.Settings`):
+            The configuration of the site.
+
+        pages (:obj:`dict`):
+            A map from the names of generated templates, such as converted
+            pandoc documents, to their sources. They are looked up before
+            the template directory, and the map may be filled in after the
+            environment has been built.
+
+        assets (:obj:`dict`):
+            A map from static files to their fingerprinted names, looked up
+            by the ~asset_url~ global. It may be filled in after the
+            environment has been built.
+
+        documents (:obj:`grash.metadata.DocumentIndex`):
+            The metadata of pandoc documents, exposed as the ~documents~
+            global. It may be filled in after the environment has been
+            built.
+
+        data (:obj:`grash.data.DataStore`):
+            The files of the data directory, exposed as the ~data~ global.
+            A store of its own is made from ~settings~ if None.
+
+        plugins (:obj:`grash.plugins.PluginRegistry`):
+            The filters, tests and globals added to the environment. They
+            are loaded from ~settings~ if None.
+
+    Returns:
+
+        (:obj:`jinja2.Environment`): A configured jinja2 environment.
+
+    """
+    jinjaEnvArgs = {}
+    loader = FileSystemLoader(searchpath=settings.templatePath,
+                              encoding=settings.encoding,
+                              followlinks=True)
+    if pages is not None:
+        loader = ChoiceLoader([DictLoader(pages), loader])
+    jinjaEnvArgs['loader'] = loader
+    if settings.cacheDir:
+        jinjaEnvArgs['bytecode_cache'] = LayeredBytecodeCache(
+            os.path.join(settings.cacheDir, "bytecode"))
+    environment = Environment(**jinjaEnvArgs)
+    environment.globals["asset_url"] = assetUrl(
+        assets if assets is not None else {})
+    environment.globals["documents"] = documents \
+        if documents is not None else DocumentIndex()
+    if data is None and settings.dataDir:
+        data = DataStore(os.path.join(settings.templatePath,
+                                      settings.dataDir),
+                         settings.encoding)
+    if data is not None:
+        environment.globals["data"] = data
+    if plugins is None:
+        plugins = loadPlugins(settings)
+    plugins.install(environment)
+    return environment
@@ -4,17 +4,35 @@
 # * Libraries
 
 
+import functools
 import logging
 import os
 import pathlib
-import shutil
-
-import pypandoc
-
-from jinja2 import Environment, FileSystemLoader
+import posixpath
+from contextlib import contextmanager
 
 from .watcher import Watcher
-from .config import Settings
+from .assets import ASSET_MANIFEST, dumpAssets, fingerprint
+from .config import HOST, PORT, Settings
+from .classifier import PathClassifier, splitPath
+from .compress import FORMATS, compressFiles, compressionFormats, \
+    isCompressible
+from .data import DataStore, dataKey
+from .dependencies import DependencyGraph
+from .environment import makeEnvironment
+from .index import SourceIndex
+from .manifest import Manifest, digestBytes, digestObject
+from .metadata import METADATA_VERSION, DocumentIndex, parseMetadata
+from .minify import makeMinifier
+from .output import MemorySink, OutputWriter
+from . import pagination
+from .pagination import Page, digestItems, evaluate, pageName
+from .pandoc import PandocCache, convert
+from .plugins import PluginRegistry, loadPlugins
+from .profiler import NULL_PROFILER
+from .parallel import renderParallel, resolveJobs
+from .shard import inShard
+from .sync import formatSize, syncFiles
 
 
 # * Variables
@@ -28,6 +46,19 @@ BUILD_PATH = settings.buildDir
 ASSETS = settings.staticDirs
 PANDOC_DIRS = settings.pandocDirs
 PANDOC_TYPES = settings.pandocTypes
+JOBS = settings.jobs
+CACHE_DIR = settings.cacheDir
+COPY_STRATEGY = settings.copyStrategy
+CHECKSUM = settings.checksum
+DEBOUNCE = settings.debounce
+LATENCY = settings.latency
+PANDOC_CACHE_SIZE = settings.pandocCacheSize
+MINIFY = settings.minify
+COMPRESS = settings.compress
+COMPRESS_THRESHOLD = settings.compressThreshold
+FINGERPRINT = settings.fingerprint
+DATA_DIR = settings.dataDir
+PLUGINS = settings.plugins
 
 # * Classes
 
@@ -66,6 +97,80 @@ class GrashSite:
             True if the methods should be verbose on execution,
             False otherwise.
 
+        jobs (:obj:`int`):
+            The number of processes rendering templates in parallel.
+
+        cacheDir (:obj:`str`):
+            The path to the directory where compiled templates and pandoc
+            conversions are cached. Without it, pandoc documents are
+            converted again on every build.
+
+        copyStrategy (:obj:`str`):
+            Either ~copy~ or ~hardlink~, the way static files are copied.
+
+        checksum (:obj:`bool`):
+            True if static files are compared by contents rather than by
+            size and modification time, False otherwise.
+
+        debounce (:obj:`float`):
+            The quiet period, in seconds, ending a burst of changes in
+            watch mode.
+
+        latency (:obj:`float`):
+            The longest time, in seconds, a change waits for its rebuild in
+            watch mode.
+
+        pandocCacheSize (:obj:`int`):
+            The size of the cache of pandoc conversions in bytes.
+
+        minify (:obj:`bool`):
+            True if rendered HTML pages are minified, False otherwise.
+
+        compress (:obj:`bool`):
+            True if compressed siblings are written next to outputs, False
+            otherwise.
+
+        compressThreshold (:obj:`int`):
+            The size, in bytes, below which outputs are not compressed.
+
+        fingerprint (:obj:`bool`):
+            True if static files are written as ~name.<hash>.ext~, False
+            otherwise.
+
+        profiler (:obj:`grash.profiler.Profiler`):
+            A profiler recording the time spent on each phase and item of
+            the build.
+
+        pages (:obj:`dict`):
+            A map from the names of generated templates, such as converted
+            pandoc documents, to their sources. It must be the map the
+            loader of ~jinjaEnvironment~ looks generated templates up in.
+
+        shard (:obj:`tuple` of :obj:`int`):
+            The shard ~(i, N)~ of the site to build, the i-th of N counting
+            from 1, or None to build the whole site.
+
+        assets (:obj:`dict`):
+            A map from static files to their fingerprinted names. It must be
+            the map the ~asset_url~ global of ~jinjaEnvironment~ looks
+            names up in.
+
+        documents (:obj:`grash.metadata.DocumentIndex`):
+            The metadata of pandoc documents. It must be the index exposed
+            as the ~documents~ global of ~jinjaEnvironment~.
+
+        dataDir (:obj:`str`):
+            The path, relative to ~templatePath~, to the directory of data
+            files, or None.
+
+        data (:obj:`grash.data.DataStore`):
+            The parsed data files. It must be the store exposed as the
+            ~data~ global of ~jinjaEnvironment~, or None if there is none.
+
+        plugins (:obj:`grash.plugins.PluginRegistry`):
+            The filters, tests and globals of plugins. It must be the
+            registry installed in ~jinjaEnvironment~.
+
     """
     def __init__(self,
                  encoding,
@@ -76,59 +181,264 @@ class GrashSite:
                  staticDirs=[],
                  pandocDirs=PANDOC_DIRS,
                  pandocTypes=PANDOC_TYPES,
-                 verbose=True):
+                 verbose=True,
+                 jobs=JOBS,
+                 cacheDir=CACHE_DIR,
+                 copyStrategy=COPY_STRATEGY,
+                 checksum=CHECKSUM,
+                 debounce=DEBOUNCE,
+                 latency=LATENCY,
+                 pandocCacheSize=PANDOC_CACHE_SIZE,
+                 minify=MINIFY,
+                 compress=COMPRESS,
+                 compressThreshold=COMPRESS_THRESHOLD,
+                 fingerprint=FINGERPRINT,
+                 profiler=NULL_PROFILER,
+                 pages=None,
+                 shard=None,
+                 assets=None,
+                 documents=None,
+                 dataDir=DATA_DIR,
+                 data=None,
+                 plugins=None):
         # Variables
         self.encoding = encoding
+        self.jobs = resolveJobs(jobs)
 
         # Paths
         self.buildDir = buildDir
         self.staticDirs = staticDirs
         self.templatePath = templatePath
+        self.cacheDir = cacheDir
+
+        # Static Files
+        self.copyStrategy = copyStrategy
+        self.checksum = checksum
+        self.fingerprint = fingerprint
+        self.assets = assets if assets is not None else {}
 
         # Pandoc
 
         self.pandocDirs = pandocDirs
         self.pandocTypes = pandocTypes
+        self.pandocCacheSize = pandocCacheSize
+        self._pandocCache = None
+        self.pages = pages if pages is not None else {}
+        self._pageInputs = {}
+        self._pageSources = {}
+        self.documents = documents if documents is not None \
+            else DocumentIndex()
+
+        # Data
+        self.dataDir = dataDir
+        self.data = data
+
+        # Plugins
+        self.plugins = plugins if plugins is not None else PluginRegistry()
+        self._pluginDigest = None
+
+        # Post-rendering
+        self.minify = minify
+        self._minifier = None
+        self.compress = compress
+        self.compressThreshold = compressThreshold
+
+        # Path Classification
+        self._classifier = PathClassifier(staticDirs, pandocDirs, pandocTypes,
+                                          dataDir)
 
         # Jinja Configuration
         self._jinjaEnv = jinjaEnvironment
 
+        # Build Manifest
+        self._manifest = None
+        self._dependencyGraph = None
+        self._sourceIndex = None
+
+        # Outputs
+        self._writer = None
+        self.shard = shard
+
         # Utilities
         self.logger = logger
         self.verbose = verbose
+        self.debounce = debounce
+        self.latency = latency
+        self.profiler = profiler
 
     def __repr__(self):
         return "GrashSite({}, {})".format(self.templatePath, self.buildDir)
 
-    def _ensureParent(self, filename):
-        """Ensure the parent directory of a file exists.
+    # * Instance properties
+
+    @property
+    def settings(self):
+        """Return the configuration of the site.
 
-        Args:
+        Returns:
+
+            (:obj:`grash.config.Settings`):
+                The settings the site has been configured with.
+
+        """
+        return Settings(buildDir=self.buildDir,
+                        staticDirs=self.staticDirs,
+                        templatePath=self.templatePath,
+                        pandocDirs=self.pandocDirs,
+                        pandocTypes=self.pandocTypes,
+                        encoding=self.encoding,
+                        jobs=self.jobs,
+                        cacheDir=self.cacheDir,
+                        copyStrategy=self.copyStrategy,
+                        checksum=self.checksum,
+                        debounce=self.debounce,
+                        latency=self.latency,
+                        pandocCacheSize=self.pandocCacheSize,
+                        minify=self.minify,
+                        compress=self.compress,
+                        compressThreshold=self.compressThreshold,
+                        fingerprint=self.fingerprint,
+                        dataDir=self.dataDir,
+                        plugins=self.plugins.modules)
+
+    @property
+    def manifest(self):
+        """Return the manifest of the build directory, loading it on demand.
+
+        Returns:
 
-            filename (:obj: `str`): The name of a file (with or without dir.)
+            (:obj:`grash.manifest.Manifest`): The build manifest.
+
+        """
+        if self._manifest is None:
+            self._manifest = Manifest.load(self.buildDir)
+        return self._manifest
+
+    @property
+    def pandocCache(self):
+        """Return the cache of pandoc conversions, or None if caching is off.
 
         Returns:
 
-            None.
+            (:obj:`grash.pandoc.PandocCache`): The cache of conversions.
 
         """
-        parent = os.path.dirname(filename)
-        if parent:
-            dirpath = os.path.join(self.buildDir, parent)
-            pathlib.Path(dirpath).mkdir(parents=True, exist_ok=True)
+        if self._pandocCache is None and self.cacheDir:
+            self._pandocCache = PandocCache(
+                os.path.join(self.cacheDir, "pandoc"),
+                maxSize=self.pandocCacheSize)
+        return self._pandocCache
 
-    # * Instance properties
+    @property
+    def minifier(self):
+        """Return the minifier of rendered pages, or None if it is off.
+
+        Returns:
+
+            (:obj:`grash.minify.Minifier`): The minifier.
+
+        """
+        if self._minifier is None and self.minify:
+            self._minifier = makeMinifier(self.settings)
+        return self._minifier
+
+    @property
+    def pluginDigest(self):
+        """Return the digest of the plugins, computed once per build.
+
+        Returns:
+
+            (:obj:`str`): The digest of the registered functions and of the
+            sources of the modules registering them.
+
+        """
+        if self._pluginDigest is None:
+            self._pluginDigest = self.plugins.digest
+        return self._pluginDigest
+
+    def reloadPlugins(self):
+        """Load the plugins again if one of their modules has been edited.
+
+        The new functions replace the former ones in the environment, whose
+        compiled templates, referring to the former functions, are dropped.
+
+        Returns:
+
+            True if the plugins have been loaded again, False otherwise.
+
+        """
+        if not self.plugins.isOutdated():
+            return False
+        plugins = loadPlugins(self.settings)
+        self.plugins.uninstall(self._jinjaEnv)
+        plugins.install(self._jinjaEnv)
+        if self._jinjaEnv.cache is not None:
+            self._jinjaEnv.cache.clear()
+        self.plugins = plugins
+        self._pluginDigest = None
+        return True
+
+    @property
+    def sourceIndex(self):
+        """Return the index of the template directory, scanning it on demand.
+
+        Returns:
+
+            (:obj:`grash.index.SourceIndex`):
+                The files of ~self.templatePath~ sorted by kind.
+
+        """
+        if self._sourceIndex is None:
+            self._sourceIndex = SourceIndex(self.templatePath,
+                                            self.classify).scan()
+        return self._sourceIndex
+
+    @property
+    def dependencyGraph(self):
+        """Return the graph of references between templates and modules.
+
+        The graph is built on demand and its parsed references are cached
+        in the build manifest.
+
+        Returns:
+
+            (:obj:`grash.dependencies.DependencyGraph`):
+                The dependency graph of the site.
+
+        """
+        if self._dependencyGraph is None:
+            self._dependencyGraph = DependencyGraph(
+                self._jinjaEnv,
+                self._sourceDigest,
+                cache=self.manifest.references)
+            self._dependencyGraph.build(self.templateNames
+                                        + self.moduleNames)
+        return self._dependencyGraph
+
+    @property
+    def moduleNames(self):
+        """Return a list of template module names.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): A list of template module names.
+
+        """
+        return self.sourceIndex.names("module")
 
     @property
     def templateNames(self):
-        """Return a list of template names.
+        """Return a list of template names, generated templates included.
 
         Returns:
 
             (:obj:`list` of :obj:`str`): A list of template names.
 
         """
-        return self._jinjaEnv.list_templates(filter_func=self.isTemplate)
+        names = self.sourceIndex.names("template")
+        if self.pages:
+            names = sorted(set(names).union(self.pages))
+        return names
 
     @property
     def templates(self):
@@ -151,7 +461,7 @@ class GrashSite:
                 A list of names corresponding to static files.
 
         """
-        return self._jinjaEnv.list_templates(filter_func=self.isStatic)
+        return self.sourceIndex.names("static")
 
     # * Getters
 
@@ -167,6 +477,10 @@ class GrashSite:
     def getDependencies(self, filename):
         """Get a list of files dependent on the file ~filename~.
 
+        For templates and modules, the dependency graph is refreshed with the
+        current contents of ~filename~, and only the templates reaching it
+        through their references are returned.
+
         Args:
             filename (:obj:`str`): the name of a file
 
@@ -174,58 +488,392 @@ class GrashSite:
             A `list` of `str`, files dependent on the file ~filename~.
 
         """
-        if self.isModule(filename):
-            return self.templates
-        elif self.isTemplate(filename):
-            return [self.getTemplate(filename)]
-        elif self.isStatic(filename) or self.isPandoc:
+        if self.isModule(filename) or self.isTemplate(filename):
+            self.dependencyGraph.update(filename)
+            dependents = self.dependencyGraph.dependents(filename)
+            dependents.add(filename)
+            return sorted(name for name in dependents
+                          if name in self.pages
+                          or self.sourceIndex.kind(name) == "template")
+        elif self.isData(filename):
+            key = self.invalidateData(filename)
+            graph = self.dependencyGraph
+            dependents = []
+            for templateName in self.templateNames:
+                keys = graph.data(templateName)
+                spec = graph.pagination(templateName)
+                if spec is not None and keys is not None:
+                    # Only the pages whose slice changed are rendered.
+                    keys = None if spec["data"] is None \
+                        else keys | set(spec["data"])
+                if keys is None or key in keys \
+                   or graph.isDynamic(templateName):
+                    dependents.append(templateName)
+            return dependents
+        elif self.isStatic(filename) or self.isPandoc(filename):
             return [filename]
         else:
             return []
 
+    # * Build Inputs
+
+    def _sourceDigest(self, name):
+        """Return the digest of a file of the template directory.
+
+        Generated templates are digested from their sources in memory.
+
+        Raises:
+
+            OSError: if the file does not exist.
+
+        """
+        page = self.pages.get(name)
+        if page is not None:
+            return digestBytes(page.encode(self.encoding))
+        path = os.path.join(self.templatePath, name)
+        sourceFile = self.sourceIndex.files.get(name)
+        if sourceFile is None:
+            return self.manifest.digest(path)
+        return self.manifest.digest(path, sourceFile.size, sourceFile.mtime)
+
+    def _templateDigest(self, templateName):
+        """Return the digest of a template source, or None if it is missing."""
+        try:
+            return self._sourceDigest(templateName)
+        except OSError:
+            return None
+
+    def templateInputs(self, templateName):
+        """Describe the inputs the output of a template is built from.
+
+        Args:
+
+            templateName (:obj:`str`): The name of a template.
+
+        Returns:
+
+            (:obj:`dict`): The digests of the template source, of the
+            templates it depends on and of the settings used, along with
+            the fingerprinted names of the static files it references, the
+            digest of the document index if it reads it and the digests of
+            the data files it reads.
+
+        """
+        graph = self.dependencyGraph
+        dependencies = graph.dependencies(templateName)
+        if graph.isDynamic(templateName):
+            # The template may reference any module at render time.
+            dependencies.update(self.moduleNames)
+        dependencies.discard(templateName)
+        settings = {"encoding": self.encoding, "minify": self.minify}
+        if len(self.plugins):
+            settings["plugins"] = self.pluginDigest
+        inputs = {"source": self._sourceDigest(templateName),
+                  "dependencies": {dependency:
+                                   self._templateDigest(dependency)
+                                   for dependency in sorted(dependencies)},
+                  "settings": digestObject(settings)}
+        if self.fingerprint:
+            assets = graph.assets(templateName)
+            if assets is None or graph.isDynamic(templateName):
+                assets = self.assets
+            inputs["assets"] = {name: self.assets.get(name)
+                                for name in sorted(assets)}
+        if "documents" in graph.globals(templateName) \
+           or graph.isDynamic(templateName):
+            inputs["documents"] = self.documents.digest
+        keys = graph.data(templateName)
+        if graph.isDynamic(templateName):
+            keys = None
+        if keys is None or keys:
+            inputs["data"] = {name: self._sourceDigest(name)
+                              for name in self.sourceIndex.names("data")
+                              if keys is None
+                              or dataKey(self.dataName(name)) in keys}
+        return inputs
+
+    # * Data
+
+    def dataName(self, name):
+        """Return the name of a data file relative to the data directory.
+
+        Args:
+
+            name (:obj:`str`): The name of a file of the data directory,
+                relative to the template directory.
+
+        Returns:
+
+            (:obj:`str`): Its name relative to ~self.dataDir~.
+
+        """
+        return "/".join(splitPath(name)[len(splitPath(self.dataDir)):])
+
+    def invalidateData(self, name):
+        """Drop the parsed contents of a changed data file.
+
+        Args:
+
+            name (:obj:`str`): The name of a file of the data directory,
+                relative to the template directory.
+
+        Returns:
+
+            (:obj:`str`): The key of ~data~ the file is read through.
+
+        """
+        name = self.dataName(name)
+        if self.data is not None:
+            self.data.invalidate(name)
+        return dataKey(name)
+
+    def outdatedTemplates(self, templateNames):
+        """Filter out templates whose outputs are up to date.
+
+        Args:
+
+            templateNames (:obj:`list` of :obj:`str`): A list of template names.
+
+        A paginated template is outdated if any of its pages is.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`):
+                The names of templates which have to be rendered again.
+
+        """
+        outdated = []
+        for templateName in templateNames:
+            if self.isPaginated(templateName):
+                pages = self.paginate(templateName)
+                if self.outdatedPages(pages) \
+                   or self.stalePages([templateName], pages):
+                    outdated.append(templateName)
+            elif not self.manifest.isFresh(
+                    "templates", templateName,
+                    self.templateInputs(templateName),
+                    os.path.join(self.buildDir, templateName)):
+                outdated.append(templateName)
+        return outdated
+
+    # * Pagination
+
+    def isPaginated(self, templateName):
+        """Check whether a template declares a pagination."""
+        return self.dependencyGraph.pagination(templateName) is not None
+
+    def paginate(self, templateName):
+        """Split the collection of a paginated template into pages.
+
+        The first page is written both to ~templateName~ and to
+        ~page/1/index.html~ next to it, the others to ~page/<n>/index.html~.
+        Pages are described by the inputs of the template, their position,
+        the size of the collection and the digest of their own items, so
+        that a change to an item only outdates the pages showing it. The
+        global variables and data read by the expression of the collection
+        are left out of the inputs of the template for that reason.
+
+        Args:
+
+            templateName (:obj:`str`): The name of a paginated template.
+
+        Returns:
+
+            (:obj:`dict`): A map from the pages of the template, as
+            :obj:`grash.pagination.Page`, to their inputs.
+
+        """
+        spec = self.dependencyGraph.pagination(templateName)
+        items = evaluate(self._jinjaEnv, spec["items"])
+        size = spec["size"]
+        count = max(1, -(-len(items) // size))
+        templateInputs = self.templateInputs(templateName)
+        pages = {}
+        for number in range(1, count + 1):
+            names = [pageName(templateName, number)]
+            if number == 1:
+                names.insert(0, templateName)
+            for name in names:
+                page = Page(templateName, name, number, count, size,
+                            spec["items"])
+                pages[page] = {"template": templateName,
+                               "inputs": templateInputs,
+                               "number": number,
+                               "count": count,
+                               "total": len(items),
+                               "items": digestItems(items[page.bounds])}
+        return pages
+
+    def outdatedPages(self, pages):
+        """Filter out the pages of the shard which are up to date.
+
+        Args:
+
+            pages (:obj:`dict`): Pages and their inputs, as returned by
+                ~paginate~.
+
+        Returns:
+
+            (:obj:`list` of :obj:`grash.pagination.Page`): The pages which
+            have to be rendered again.
+
+        """
+        return [page for page, inputs in pages.items()
+                if self.inShard(page.name)
+                and not self.manifest.isFresh(
+                    "pagination", page.name, inputs,
+                    os.path.join(self.buildDir, page.name))]
+
+    def stalePages(self, templateNames, pages=None):
+        """Return the recorded pages which are no longer written.
+
+        Args:
+
+            templateNames (:obj:`list` of :obj:`str`):
+                The names of paginated templates.
+
+            pages (:obj:`dict`): The current pages of these templates, or
+                None to return the pages of every other template.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of the recorded pages of
+            ~templateNames~ missing from ~pages~, or, without ~pages~, of
+            the recorded pages of templates which are no longer paginated.
+
+        """
+        templateNames = set(templateNames)
+        recorded = self.manifest.outputs.get("pagination", {})
+        if pages is None:
+            return sorted(name for name, inputs in recorded.items()
+                          if inputs.get("template") not in templateNames)
+        current = {page.name for page in pages}
+        return sorted(name for name, inputs in recorded.items()
+                      if inputs.get("template") in templateNames
+                      and name not in current)
+
+    def pageOf(self, name):
+        """Return the page of a paginated template written to ~name~.
+
+        Args:
+
+            name (:obj:`str`): The name of an output.
+
+        Returns:
+
+            (:obj:`grash.pagination.Page`): The page, or None if no
+            paginated template writes ~name~.
+
+        """
+        for templateName in self.templateNames:
+            if self.isPaginated(templateName):
+                for page in self.paginate(templateName):
+                    if page.name == name:
+                        return page
+        return None
+
+    def renderOutput(self, name):
+        """Render the output ~name~ of a template or of a paginated one.
+
+        Returns:
+
+            (:obj:`str`): The rendered text.
+
+        """
+        page = self.pageOf(name)
+        if page is not None:
+            return pagination.renderPage(self._jinjaEnv, page)
+        return self.getTemplate(name).render()
+
+    def inShard(self, name):
+        """Check whether an output is built by the shard of the site.
+
+        Args:
+
+            name (:obj:`str`): The name of an output.
+
+        Returns:
+
+            True if the output belongs to ~self.shard~ or the whole site is
+            built, False otherwise.
+
+        """
+        return inShard(name, self.shard)
+
+    def shardOutputs(self, names):
+        """Filter out the outputs built by other shards.
+
+        Args:
+
+            names (:obj:`list` of :obj:`str`): The names of outputs.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of the outputs of
+            ~self.shard~.
+
+        """
+        return [name for name in names if self.inShard(name)]
+
     # * Typisation
 
+    def classify(self, path):
+        """Return the kind of a file of the template directory.
+
+        Classification is memoized by the path classifier compiled from the
+        static and pandoc directories the site has been created with.
+
+        Args:
+            path (:obj: `str`): the name of a file being classified
+        Returns:
+            One of ~private~, ~static~, ~pandoc~, ~module~ or ~template~.
+
+        """
+        return self._classifier.classify(path)
+
     def isStatic(self, dirname):
-        """Check whether a directory contains static files.
+        """Check whether a file or directory is, or lies in, a static directory.
 
         Static files are not processed by Jinja2.
 
         Args:
-            filename (:obj: `str`): the name of a directory being checked
+            dirname (:obj: `str`): the name of a file or directory being checked
         Returns:
-            True if the directory is considered static,
+            True if the file or directory is considered static,
             False otherwise.
 
         """
-        if not self.staticDirs:
-            # No directories with static files are listed.
-            return False
-        else:
-            for dirpath in self.staticDirs:
-                if dirpath.startswith(dirname):
-                    return True
-                else:
-                    return False
+        return self._classifier.isStatic(dirname)
 
     def isPandoc(self, dirname):
         """Check whether a directory or a file is to be processed with pandoc.
 
+        A directory is processed with pandoc if it is one of
+        ~self.pandocDirs~; a file, if it lies in one of them and has one of
+        ~self.pandocTypes~.
+
         Args:
-            filename (:obj: `str`): the name of a directory being checked
+            dirname (:obj: `str`): the name of a file or directory being checked
         Returns:
             True if the directory or file is to be processed with pandoc,
             False otherwise.
 
         """
-        if not self.pandocDirs:
-            # No directories with static files are listed.
-            return False
-        else:
-            for dirpath in self.pandocDirs:
-                if dirpath.startswith(dirname):
-                    return True
-                else:
-                    return False
+        return self._classifier.isPandoc(dirname)
+
+    def isData(self, path):
+        """Check whether a file is read through the ~data~ global.
+
+        A file is a data file if it lies in ~self.dataDir~ and is a JSON,
+        YAML, TOML or CSV file.
+
+        Args:
+            path (:obj: `str`): the name of a file being checked
+        Returns:
+            True if the file is a data file, False otherwise.
+
+        """
+        return self._classifier.isData(path)
 
     def isModule(self, path):
         """Checks if a file or directory with the ~path~ is/has a template module.
@@ -243,8 +891,7 @@ class GrashSite:
             False otherwise.
 
         """
-        return any((route.startswith("_")
-                    for route in path.split(os.path.sep)))
+        return self._classifier.isModule(path)
 
     def isPrivate(self, path):
         """Checks if a file or directory is private.
@@ -261,9 +908,7 @@ class GrashSite:
             False otherwise.
 
         """
-
-        return any((route.startswith(".")
-                    for route in path.split(os.path.sep)))
+        return self._classifier.isPrivate(path)
 
     def isTemplate(self, path):
         """Checks if a file is a template.
@@ -280,33 +925,216 @@ class GrashSite:
             False otherwise.
         """
 
-        if self.isModule(path) or self.isPrivate(path)\
-           or self.isStatic(path) or self.isPandoc(path):
-            return False
-        else:
-            return True
+        return self.classify(path) == "template"
 
     # * Deal with Static Files
 
     def copyStatic(self, paths, verbose=True):
-        """Copies static files or directories given in dirpaths to the build directory.
+        """Copies static files given in paths to the build directory.
+
+        Files whose copies are already up to date are skipped; the others
+        are copied over a thread pool with the fastest method the file
+        system supports. Copies are recorded in the manifest, so that they
+        are removed once their sources are gone.
 
         Args:
 
             paths (:obj:`list` of :obj:`str`):
-                a list of paths to files or directories
+                a list of paths to files relative to ~self.templatePath~
 
         Returns:
 
-            None
+            (:obj:`grash.sync.SyncReport`):
+                The numbers of files and bytes copied and skipped.
         """
+        def onCopy(source, destination):
+            print("Copying {} to {}...".format(source, destination))
+
+        with self.writing() as writer:
+            for path in paths:
+                # The contents, hence the fingerprint, of the file changed.
+                previous = self.manifest.outputName("static", path)
+                if previous != self.outputName(path):
+                    writer.remove(previous)
+        pairs = [(os.path.join(self.templatePath, path),
+                  os.path.join(self.buildDir, self.outputName(path)))
+                 for path in paths]
+        report = syncFiles(pairs,
+                           strategy=self.copyStrategy,
+                           digest=self.manifest.digest if self.checksum
+                           else None,
+                           onCopy=onCopy if verbose else None,
+                           profiler=self.profiler)
         for path in paths:
-            source = os.path.join(os.getcwd(), path)
-            destination = os.path.join(self.buildPath, path)
-            if verbose:
-                print("Copying {} to {}...".format(path, destination))
-            self._ensureParent(path)
-            shutil.copy2(source, destination)
+            self.manifest.record("static", path, self._staticInputs(path))
+        if verbose and pairs:
+            print(report)
+        return report
+
+    def _staticInputs(self, path):
+        """Describe the output of a static file for the manifest."""
+        output = self.outputName(path)
+        return {"output": output} if output != path else {}
+
+    def outputName(self, name):
+        """Return the name a static file is written to.
+
+        Args:
+
+            name (:obj:`str`): The name of a file of the template directory.
+
+        Returns:
+
+            (:obj:`str`): Its fingerprinted name if fingerprinting is on,
+            ~name~ otherwise.
+
+        """
+        return self.assets.get(name, name)
+
+    def outputNames(self):
+        """Return the names of the outputs of the shard of the site.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of the outputs, relative
+            to ~self.buildDir~.
+
+        """
+        return [name for name in self.templateNames
+                if self.inShard(name) and not self.isPaginated(name)] \
+            + [name for name in self.manifest.outputs.get("pagination", {})
+               if self.inShard(name)] \
+            + [self.outputName(name) for name in self.staticFiles
+               if self.inShard(name)]
+
+    def updateAssets(self):
+        """Fingerprint static files by the digest of their contents.
+
+        Digests are cached by the manifest, so that only the static files
+        changed since the last build are read. ~self.assets~ is updated in
+        place, as the ~asset_url~ global of templates looks names up in it.
+
+        Returns:
+
+            (:obj:`set` of :obj:`str`): The names of the static files whose
+            fingerprinted names have changed.
+
+        """
+        assets = {}
+        if self.fingerprint:
+            for name in self.staticFiles:
+                assets[name] = fingerprint(name, self._sourceDigest(name))
+        changed = {name for name in set(assets) | set(self.assets)
+                   if assets.get(name) != self.assets.get(name)}
+        self.assets.clear()
+        self.assets.update(assets)
+        return changed
+
+    def writeAssetManifest(self):
+        """Write the map from static files to their fingerprinted names.
+
+        The map is written to ~ASSET_MANIFEST~ in the build directory, and
+        removed once fingerprinting is off.
+
+        Returns:
+
+            None.
+
+        """
+        with self.writing() as writer:
+            if not writer.persistent:
+                if self.fingerprint:
+                    writer.write(ASSET_MANIFEST, dumpAssets(self.assets))
+                return
+            self.removeOutputs("assets", self.manifest.stale(
+                "assets", [ASSET_MANIFEST] if self.fingerprint else []))
+            if self.fingerprint:
+                writer.write(ASSET_MANIFEST, dumpAssets(self.assets))
+                writer.after(functools.partial(
+                    self.manifest.record, "assets", ASSET_MANIFEST, {}))
+
+    # * Deal with Compression
+
+    def compressOutputs(self, names, verbose=True):
+        """Write the compressed siblings of outputs to the build directory.
+
+        Outputs are compressed to ~<name>.gz~, and to ~<name>.br~ if a
+        brotli module is installed, over a pool of ~self.jobs~ processes.
+        Only the outputs which are compressible by their names and at least
+        ~self.compressThreshold~ bytes large are compressed, and those
+        whose contents have not changed since their last compression, as
+        recorded in the manifest, are skipped. The siblings of outputs
+        which are no longer compressed are removed, so that passing no
+        names removes every sibling of the shard.
+
+        Args:
+
+            names (:obj:`list` of :obj:`str`):
+                The names of every output of the site, relative to
+                ~self.buildDir~, or none if compression is off.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of compressed outputs.
+
+        """
+        formats = compressionFormats()
+        candidates = {}
+        for name in names:
+            if not isCompressible(name):
+                continue
+            path = os.path.join(self.buildDir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.st_size < self.compressThreshold:
+                continue
+            # Outputs have just been written or copied, so their digests
+            # are cached by the manifest.
+            candidates[name] = {
+                "source": self.manifest.digest(path, stat.st_size,
+                                               stat.st_mtime_ns),
+                "formats": formats}
+
+        # The siblings of other shards are left to them.
+        stale = self.shardOutputs(self.manifest.stale("compress", candidates))
+        if stale:
+            with self.writing() as writer:
+                for name in stale:
+                    for fmt in FORMATS:
+                        writer.remove("{}.{}".format(name, fmt))
+                    self.manifest.forget("compress", name)
+
+        outdated = [name for name, inputs in candidates.items()
+                    if not self._isCompressed(name, inputs)]
+        written = 0
+        paths = [os.path.join(self.buildDir, name) for name in outdated]
+        for name, (_, kept, size) in zip(
+                outdated, compressFiles(paths, formats, self.jobs)):
+            # Siblings no smaller than their output are not kept.
+            self.manifest.record("compress", name,
+                                 dict(candidates[name], siblings=kept))
+            written += size
+        if verbose and outdated:
+            print("Compressed {} outputs ({}).".format(len(outdated),
+                                                       formatSize(written)))
+        return outdated
+
+    def _isCompressed(self, name, inputs):
+        """Check whether the siblings of an output are up to date.
+
+        The siblings kept by the last compression of the output, as
+        recorded in the manifest, must all exist.
+
+        """
+        recorded = dict(self.manifest.outputs.get("compress", {})
+                        .get(name) or {})
+        siblings = recorded.pop("siblings", None)
+        if siblings is None or recorded != inputs:
+            return False
+        return all(os.path.exists(os.path.join(
+            self.buildDir, "{}.{}".format(name, fmt))) for fmt in siblings)
 
     # * Deal with Pandoc Files
 
@@ -329,12 +1157,24 @@ class GrashSite:
         suffix = '{% endblock %}'
         return '{}\n{}\n{}'.format(prefix, string, suffix)
 
-    def renderDoc(self, docType, path, prettyLink=True, verbose=True):
+    def renderDoc(self, docType, path, prettyLink=True, verbose=True,
+                  force=False):
         """Renders a file at the filepath via pandoc.
 
         Requires the existence of a template in ~self.templatePath~ with the
         name corresponding to a parent directory in ~self.pandocDirs~.
 
+        Converted documents are kept in ~self.pages~, where the template
+        loader finds them, rather than written to the template directory.
+        The metadata of every document, in any shard, is indexed in
+        ~self.documents~; it is cached in the manifest by the digest of the
+        document, so that unchanged documents are not read again.
+        Documents converted from the same source, template and settings are
+        skipped within a process, and conversions are reused from the pandoc
+        cache between builds; without a cache, a new build converts every
+        document again. The pages of documents which no longer exist are dropped and
+        their outputs removed.
+
         Args:
 
             docType (:obj:`str`):
@@ -344,39 +1184,96 @@ class GrashSite:
             path (:obj:`str`):
                 A relative path to the directory with files
 
+            force (:obj:`bool`):
+                If True, convert documents even if they are up to date.
+
         Returns:
 
-            None
+            (:obj:`list` of :obj:`str`): The names of the generated
+            templates whose sources have changed.
 
         """
         source = os.path.join(os.getcwd(), path)
-        destination = os.path.join(self.templatePath, path)
+        prefix = pathlib.PurePath(path).as_posix()
 
-        docfilepaths = pathlib.Path(source).glob('*.' + docType)
+        docfilepaths = sorted(pathlib.Path(source).glob('*.' + docType))
         docTemplate = "_" + os.path.basename(path) + ".html"
 
         templatePath = os.path.join(self.templatePath, docTemplate)
         assert os.path.isfile(templatePath) is True, \
             "No template {} has been found, aborting.".format(templatePath)
 
+        docSettings = digestObject({"docType": docType,
+                                    "prettyLink": prettyLink})
+
+        changed = []
+        produced = set()
         for filepath in docfilepaths:
-            with open(str(filepath), 'r') as docfile:
-                htmltext = pypandoc.convert(docfile.read(), "html",
-                                            format=docType)
-            htmltext = self._platify(htmltext, docTemplate)
             if prettyLink:
-                pagedir = os.path.join(destination,
-                                       filepath.with_suffix('').name)
-                newFilepath = os.path.join(pagedir, "index.html")
-                pathlib.Path(pagedir).mkdir(parents=True, exist_ok=True)
-                with open(newFilepath, 'w') as f:
-                    f.write(htmltext)
+                name = posixpath.join(prefix, filepath.stem, "index.html")
             else:
-                newFilepath = os.path.join(destination, filepath.name)
-                with open(newFilepath, 'w') as f:
-                    f.write(htmltext)
-
-    def renderDocs(self, docType, dirpaths, prettyLink=True, verbose=True):
+                name = posixpath.join(prefix,
+                                      filepath.with_suffix(".html").name)
+            produced.add(name)
+            digest = self.manifest.digest(str(filepath))
+            text = None
+            cached = self.manifest.documents.get(name)
+            if cached is None or cached[:2] != [digest, METADATA_VERSION]:
+                text = filepath.read_text(encoding=self.encoding)
+                metadata = parseMetadata(text, filepath.stem)
+                metadata.update({"url": "/" + name[:-len("index.html")]
+                                 if prettyLink else "/" + name,
+                                 "directory": prefix,
+                                 "source": posixpath.join(prefix,
+                                                          filepath.name)})
+                cached = [digest, METADATA_VERSION, metadata]
+                self.manifest.documents[name] = cached
+            self.documents.update(name, cached[2])
+
+            if not self.inShard(name):
+                continue
+            inputs = {"source": digest,
+                      "template": docTemplate,
+                      "settings": docSettings}
+            if not force and name in self.pages \
+               and self._pageInputs.get(name) == inputs:
+                continue
+
+            with self.profiler.measure("pandoc", str(filepath)):
+                if text is None:
+                    text = filepath.read_text(encoding=self.encoding)
+                htmltext = convert(text, docType, "html",
+                                   cache=None if force
+                                   else self.pandocCache)
+            page = self._platify(htmltext, docTemplate)
+            self._pageInputs[name] = inputs
+            self._pageSources[name] = filepath
+            if self.pages.get(name) != page:
+                self.pages[name] = page
+                changed.append(name)
+
+        vanished = [name for name, origin in self._pageSources.items()
+                    if name not in produced
+                    and origin.parent == pathlib.Path(source)
+                    and origin.suffix == "." + docType]
+        for name in vanished:
+            del self.pages[name]
+            del self._pageInputs[name]
+            del self._pageSources[name]
+            if self._dependencyGraph is not None:
+                self._dependencyGraph.remove(name)
+        self.removeOutputs("templates", vanished)
+        # Documents of other shards are indexed too.
+        for name, cached in list(self.manifest.documents.items()):
+            metadata = cached[-1]
+            if name not in produced and metadata["directory"] == prefix \
+               and metadata["source"].endswith("." + docType):
+                del self.manifest.documents[name]
+                self.documents.remove(name)
+        return changed
+
+    def renderDocs(self, docType, dirpaths, prettyLink=True, verbose=True,
+                   force=False):
         """Renders files given in filepaths via pandoc.
 
         Requires the existence of templates in ~self.templatePath~ with the
@@ -391,17 +1288,127 @@ class GrashSite:
             dirpaths (:obj:`list` of :obj:`str`):
                 A list of relative paths to directories with files
 
+            force (:obj:`bool`):
+                If True, convert documents even if they are up to date.
+
         Returns:
 
-            None
+            (:obj:`list` of :obj:`str`): The names of the generated
+            templates whose sources have changed.
 
         """
-
+        changed = []
         for path in dirpaths:
-            self.renderDoc(docType, path, prettyLink=True, verbose=True)
+            changed.extend(self.renderDoc(docType, path, prettyLink=prettyLink,
+                                          verbose=verbose, force=force))
+        return changed
+
+    # * Deal with Outputs
+
+    @contextmanager
+    def writing(self, sink=None):
+        """Send the outputs of the enclosed block to an output sink.
+
+        By default, outputs are written in the background by an
+        :obj:`grash.output.OutputWriter`, which leaves alone the files whose
+        contents have not changed. Nested blocks share the sink of the
+        outermost one, which is closed when it exits.
+
+        Args:
+
+            sink (:obj:`grash.output.OutputWriter` or
+                  :obj:`grash.output.MemorySink`):
+                The sink receiving the outputs instead of the build
+                directory.
+
+        Yields:
+
+            The sink of the block.
+
+        """
+        if self._writer is not None:
+            yield self._writer
+            return
+        self._writer = sink if sink is not None else OutputWriter(
+            self.buildDir, self.manifest, profiler=self.profiler)
+        try:
+            with self._writer as writer:
+                yield writer
+        finally:
+            self._writer = None
+
+    def removeOutputs(self, stage, names):
+        """Remove outputs from the build directory and from the manifest.
+
+        Args:
+
+            stage (:obj:`str`): The stage which produced the outputs.
+
+            names (:obj:`list` of :obj:`str`):
+                The names of the outputs, relative to the build directory.
+
+        Returns:
+
+            None.
+
+        """
+        if not names:
+            return
+        with self.writing() as writer:
+            for name in names:
+                writer.remove(self.manifest.outputName(stage, name))
+                if writer.persistent:
+                    self.manifest.forget(stage, name)
+
+    def moveOutputs(self, stage, moves):
+        """Move outputs within the build directory and the manifest.
+
+        Args:
+
+            stage (:obj:`str`): The stage which produced the outputs.
+
+            moves (:obj:`list` of :obj:`tuple` of :obj:`str`):
+                Pairs of former and new names of outputs, relative to the
+                build directory.
+
+        Returns:
+
+            None.
+
+        """
+        if not moves:
+            return
+        with self.writing() as writer:
+            for name, newName in moves:
+                writer.move(self.manifest.outputName(stage, name),
+                            self.outputName(newName))
+                if writer.persistent:
+                    self.manifest.move(stage, name, newName)
+                    if stage == "static":
+                        self.manifest.record(stage, newName,
+                                             self._staticInputs(newName))
 
     # * Deal with Templates
 
+    def writeTemplate(self, templateName, text):
+        """Writes the rendered text of a template to a corresponding file.
+
+        The file is left untouched if it already holds the same text.
+
+        Args:
+
+            templateName (:obj:`str`): The name of the rendered template.
+
+            text (:obj:`str`): The rendered text.
+
+        Returns:
+
+            None.
+        """
+
+        with self.writing() as writer:
+            writer.write(templateName, text.encode(self.encoding))
+
     def renderTemplate(self, template):
         """Renders a jinja2 template to a corresponding file.
 
@@ -414,46 +1421,290 @@ class GrashSite:
             None.
         """
 
-        self._ensureParent(template.name)
-        filepath = os.path.join(self.buildDir, template.name)
-        template.stream().dump(filepath, self.encoding)
+        with self.profiler.measure("template", template.name):
+            text = template.render()
+            if self.minifier is not None:
+                text = self.minifier(template.name, text)
+            self.writeTemplate(template.name, text)
+
+    def renderPage(self, page, collections=None):
+        """Renders a page of a paginated template to a corresponding file.
 
-    def renderTemplates(self, templates):
-        """Render a list of jinja2 templates.
         Args:
 
-            templates (:obj:`list` of :obj:`jinja2.Template`): a template list
+            page (:obj:`grash.pagination.Page`): The page to render.
+
+            collections (:obj:`dict`):
+                A cache of the collections of paginated templates.
 
         Returns:
 
             None.
+        """
+
+        with self.profiler.measure("template", page.name):
+            text = pagination.renderPage(self._jinjaEnv, page, collections)
+            if self.minifier is not None:
+                text = self.minifier(page.name, text)
+            self.writeTemplate(page.name, text)
 
+    def renderItem(self, item, collections=None):
+        """Renders a template or a page of a paginated template.
+
+        Args:
+
+            item (:obj:`str` or :obj:`grash.pagination.Page`):
+                The name of the template, or the page.
+
+            collections (:obj:`dict`):
+                A cache of the collections of paginated templates.
+
+        Returns:
+
+            (:obj:`str`): The name of the output.
         """
 
-        for template in templates:
-            self.renderTemplate(template)
+        if isinstance(item, Page):
+            self.renderPage(item, collections)
+            return item.name
+        self.renderTemplate(self.getTemplate(item))
+        return item
+
+    def renderTemplates(self, templates, force=False):
+        """Render a list of jinja2 templates.
+
+        With more than one job, the templates are rendered by a pool of
+        worker processes, each building its own environment; the output
+        and the errors are identical to the serial ones. Paginated
+        templates are rendered
+        page by page, skipping the pages which are up to date, and their
+        pages which are gone are removed.
+
+        Args:
+
+            templates (:obj:`list` of :obj:`jinja2.Template` or :obj:`str`):
+                a list of templates or template names
+
+            force (:obj:`bool`):
+                If True, render every page of paginated templates.
 
-    def render(self, prettyLink=True, reloader=False):
+        Returns:
+
+            None.
+
+        """
+
+        templateNames = [getattr(template, 'name', template)
+                         for template in templates]
+        with self.writing() as writer:
+            items = []
+            pages = {}
+            paginated = []
+            for templateName in templateNames:
+                if self.isPaginated(templateName):
+                    paginated.append(templateName)
+                    current = self.paginate(templateName)
+                    self.removeOutputs("pagination", self.shardOutputs(
+                        self.stalePages([templateName], current)))
+                    if writer.persistent and not force:
+                        outdated = self.outdatedPages(current)
+                    else:
+                        outdated = [page for page in current
+                                    if self.inShard(page.name)]
+                    pages.update((page.name, ("pagination", current[page]))
+                                 for page in outdated)
+                    items.extend(outdated)
+                else:
+                    items.append(templateName)
+            # Outputs kept in memory are not recorded in the manifest, and
+            # the others only once they have been written.
+            inputs = {}
+            if writer.persistent:
+                inputs = {templateName:
+                          ("templates", self.templateInputs(templateName))
+                          for templateName in templateNames
+                          if templateName not in paginated}
+                inputs.update(pages)
+            if self.jobs > 1 and len(items) > 1:
+                rendered = renderParallel(self.settings, items,
+                                          self.jobs,
+                                          profile=self.profiler.enabled,
+                                          pages=self.pages,
+                                          assets=self.assets,
+                                          documents=self.documents)
+                done = 0
+                try:
+                    for name, text, timing in rendered:
+                        if timing is not None:
+                            self.profiler.record("template", name, *timing)
+                        self.writeTemplate(name, text)
+                        done += 1
+                        if name in inputs:
+                            stage, itemInputs = inputs[name]
+                            writer.after(functools.partial(
+                                self.manifest.record, stage, name,
+                                itemInputs))
+                except Exception:
+                    # Exceptions lose part of their state when pickled back
+                    # from workers: render the failing item again to raise
+                    # its error as the serial renderer does.
+                    if done < len(items):
+                        self.renderItem(items[done])
+                    raise
+            else:
+                collections = {}
+                for item in items:
+                    name = self.renderItem(item, collections)
+                    if name in inputs:
+                        stage, itemInputs = inputs[name]
+                        writer.after(functools.partial(
+                            self.manifest.record, stage, name, itemInputs))
+
+    def render(self, prettyLink=True, reloader=False, force=False):
         """Generate pages.
 
+        Only the outputs whose inputs have changed since the last build, as
+        recorded in the build manifest, are generated again, and only those
+        whose contents have changed are written. The outputs of templates
+        and static files which no longer exist are removed. If ~self.shard~
+        is set, only the outputs of the shard are built.
+
         Args:
 
             reloader (:obj:`bool`):
                 If True, a watchdog is spawned to look for
                 changes in templates.
 
+            force (:obj:`bool`):
+                If True, generate all the outputs regardless of the manifest.
+
         """
         pathlib.Path(self.buildDir).mkdir(parents=True, exist_ok=True)
-        for docType in self.pandocTypes:
-            self.renderDocs(docType, self.pandocDirs, prettyLink)
-        self.renderTemplates(self.templates)
-        self.copyStatic(self.staticFiles, verbose=self.verbose)
+        # Scan the sources again and rebuild the graph from the cached
+        # references to pick up files changed since the last build.
+        self._sourceIndex = None
+        self._dependencyGraph = None
+        # Data files and the results of pure functions are kept for a
+        # single build.
+        if self.data is not None:
+            self.data.clear()
+        self.reloadPlugins()
+        self.plugins.memo.clear()
+        self._pluginDigest = None
+        profiler = self.profiler
+        try:
+            with profiler.phase("pandoc"):
+                for docType in self.pandocTypes:
+                    self.renderDocs(docType, self.pandocDirs, prettyLink,
+                                    force=force)
+                if self.pandocDirs and self.pandocCache is not None:
+                    self.pandocCache.evict()
+            with profiler.phase("scan"):
+                # Every shard references the fingerprints of all the
+                # static files.
+                self.updateAssets()
+                # The pages of paginated templates are split among shards.
+                paginated = [name for name in self.templateNames
+                             if self.isPaginated(name)]
+                allTemplateNames = [name for name in self.templateNames
+                                    if self.inShard(name)
+                                    and name not in paginated]
+                templateNames = allTemplateNames + paginated
+                if not force:
+                    templateNames = self.outdatedTemplates(templateNames)
+            with profiler.phase("templates"):
+                with self.writing() as writer:
+                    # The outputs of other shards are left to them.
+                    self.removeOutputs("templates", self.shardOutputs(
+                        self.manifest.stale("templates", allTemplateNames)))
+                    self.removeOutputs("pagination", self.shardOutputs(
+                        self.stalePages(paginated)))
+                    self.renderTemplates(templateNames, force=force)
+                if self.verbose:
+                    print(writer.report)
+                minifier = self.minifier
+                if minifier is not None and minifier.cache is not None:
+                    minifier.cache.evict()
+            with profiler.phase("static"):
+                staticFiles = [name for name in self.staticFiles
+                               if self.inShard(name)]
+                self.removeOutputs("static", self.shardOutputs(
+                    self.manifest.stale("static", staticFiles)))
+                self.copyStatic(staticFiles, verbose=self.verbose)
+                self.writeAssetManifest()
+            with profiler.phase("compress"):
+                # The siblings are removed once compression is off.
+                self.compressOutputs(self.outputNames() if self.compress
+                                     else [], verbose=self.verbose)
+        finally:
+            with profiler.phase("manifest"):
+                self.manifest.save()
 
         if reloader:
             self.logger.info("Watching for changes in {}..."
                              .format(self.templatePath))
             self.logger.info("Press Ctrl + C to stop.")
-            Watcher(self, self.verbose).watch()
+            Watcher(self, self.verbose, self.debounce, self.latency).watch()
+
+    def buildToMemory(self, prettyLink=True, static=True):
+        """Generate every page in memory, leaving the build directory alone.
+
+        The build manifest is neither used nor updated.
+
+        Args:
+
+            static (:obj:`bool`):
+                If True, the contents of static files are included.
+
+        Returns:
+
+            (:obj:`dict`): A map from output names, relative to the build
+            directory, to their contents.
+
+        """
+        self._sourceIndex = None
+        self._dependencyGraph = None
+        with self.writing(MemorySink()) as sink:
+            # The outputs of vanished documents are only removed from the
+            # sink.
+            for docType in self.pandocTypes:
+                self.renderDocs(docType, self.pandocDirs, prettyLink,
+                                verbose=self.verbose)
+            self.updateAssets()
+            self.renderTemplates(self.templateNames)
+            if static:
+                for name in self.staticFiles:
+                    with open(self.sourceIndex.path(name), "rb") as f:
+                        sink.write(self.outputName(name), f.read())
+                self.writeAssetManifest()
+        return sink.outputs
+
+    def serve(self, host=HOST, port=PORT, prettyLink=True):
+        """Serve pages over HTTP, rendering them on demand.
+
+        Nothing is written to the build directory: pages are rendered on
+        their first request and kept in memory until one of their sources
+        changes, and open pages reload whenever sources change.
+
+        Args:
+
+            host (:obj:`str`): The address to listen on.
+
+            port (:obj:`int`): The port to listen on.
+
+            prettyLink (:obj:`bool`):
+                If True, pandoc documents are served as ~<name>/index.html~.
+
+        """
+        from .server import DevServer
+
+        with self.writing(MemorySink()):
+            for docType in self.pandocTypes:
+                self.renderDocs(docType, self.pandocDirs, prettyLink,
+                                verbose=self.verbose)
+        self._sourceIndex = None
+        self._dependencyGraph = None
+        DevServer(self, host, port, self.verbose).serve()
 
 
 # * Main Functions
@@ -465,7 +1716,22 @@ def make(templatePath=TEMPLATE_DIRECTORY,
          pandocTypes=PANDOC_TYPES,
          staticDirs=ASSETS,
          encoding=ENCODING,
-         verbose=True):
+         verbose=True,
+         jobs=JOBS,
+         cacheDir=CACHE_DIR,
+         copyStrategy=COPY_STRATEGY,
+         checksum=CHECKSUM,
+         debounce=DEBOUNCE,
+         latency=LATENCY,
+         pandocCacheSize=PANDOC_CACHE_SIZE,
+         minify=MINIFY,
+         compress=COMPRESS,
+         compressThreshold=COMPRESS_THRESHOLD,
+         fingerprint=FINGERPRINT,
+         profiler=None,
+         shard=None,
+         dataDir=DATA_DIR,
+         plugins=PLUGINS):
     """Instantiate a GrashSite object.
 
     Args:
@@ -498,12 +1764,109 @@ def make(templatePath=TEMPLATE_DIRECTORY,
             True if the methods should be verbose on execution,
             False otherwise.
 
+        jobs (:obj:`int`):
+            The number of processes rendering templates in parallel.
+            Values below 1 stand for the number of CPUs available.
+
+        cacheDir (:obj:`str`):
+            The path to the directory where compiled templates and pandoc
+            conversions are cached between builds. No cache is kept if
+            None, in which case every build converts every pandoc document
+            again, even if none has changed; only the outputs whose
+            contents have changed are written.
+
+        copyStrategy (:obj:`str`):
+            Either ~copy~, or ~hardlink~ to link static files into the build
+            directory where possible.
+
+        checksum (:obj:`bool`):
+            True if static files are compared by contents rather than by
+            size and modification time, False otherwise.
+
+        debounce (:obj:`float`):
+            The quiet period, in seconds, after which a burst of changes to
+            watched files triggers a single rebuild.
+
+        latency (:obj:`float`):
+            The longest time, in seconds, a change to a watched file may wait
+            for its rebuild while changes keep coming.
+
+        pandocCacheSize (:obj:`int`):
+            The size, in bytes, beyond which the least recently used pandoc
+            conversions are evicted from the cache.
+
+        minify (:obj:`bool`):
+            True if rendered HTML pages are minified before being written,
+            False otherwise. Minified pages are cached by their rendered
+            contents.
+
+        compress (:obj:`bool`):
+            True if compressed siblings, ~.gz~ and ~.br~ if a brotli module
+            is installed, are written next to outputs, False otherwise.
+
+        compressThreshold (:obj:`int`):
+            The size, in bytes, below which outputs are not compressed.
+
+        fingerprint (:obj:`bool`):
+            True if static files are written as ~name.<hash>.ext~, the map
+            from their names to their fingerprinted names being written to
+            ~asset-manifest.json~, False otherwise. Templates reference the
+            current version of a static file with ~asset_url(name)~.
+
+        profiler (:obj:`grash.profiler.Profiler`):
+            A profiler recording the time spent on each phase and item of
+            the build. Nothing is recorded if None.
+
+        shard (:obj:`tuple` of :obj:`int`):
+            The shard ~(i, N)~ of the site to build, the i-th of N counting
+            from 1, or None to build the whole site. Outputs are assigned to
+            shards by a stable hash of their names.
+
+        dataDir (:obj:`str`):
+            The path, relative to ~templatePath~, to the directory of JSON,
+            YAML, TOML and CSV files exposed to templates as the ~data~
+            global: ~data.authors~ reads ~authors.json~ (or ~.yaml~,
+            ~.toml~, ~.csv~). Files are parsed on first access, once per
+            build, and templates are only rendered again when a data file
+            they read changes. No data is exposed if None.
+
+        plugins (:obj:`list` of :obj:`str`):
+            The modules registering filters, tests and globals, as module
+            names or paths to their sources. Installed packages declaring
+            ~grash.plugins~ entry points and the ~grash_plugins.py~ module
+            next to ~templatePath~ are loaded as well. Each module has a
+            ~register(registry)~ function; functions it registers with
+            ~pure=True~ (or marks with ~grash.plugins.pure~) are memoized
+            for the duration of a build.
+
     """
-    jinjaEnvArgs = {}
-    jinjaEnvArgs['loader'] = FileSystemLoader(searchpath=templatePath,
-                                              encoding=encoding,
-                                              followlinks=True)
-    jinjaEnvironment = Environment(**jinjaEnvArgs)
+    siteSettings = Settings(templatePath=templatePath,
+                            buildDir=buildDir,
+                            pandocDirs=pandocDirs,
+                            pandocTypes=pandocTypes,
+                            staticDirs=staticDirs,
+                            encoding=encoding,
+                            jobs=jobs,
+                            cacheDir=cacheDir,
+                            copyStrategy=copyStrategy,
+                            checksum=checksum,
+                            debounce=debounce,
+                            latency=latency,
+                            pandocCacheSize=pandocCacheSize,
+                            minify=minify,
+                            compress=compress,
+                            compressThreshold=compressThreshold,
+                            fingerprint=fingerprint,
+                            dataDir=dataDir,
+                            plugins=plugins)
+    pages = {}
+    assets = {}
+    documents = DocumentIndex()
+    data = DataStore(os.path.join(templatePath, dataDir), encoding) \
+        if dataDir else None
+    registry = loadPlugins(siteSettings)
+    jinjaEnvironment = makeEnvironment(siteSettings, pages, assets,
+                                       documents, data, registry)
 
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.INFO)
@@ -514,5 +1877,25 @@ def make(templatePath=TEMPLATE_DIRECTORY,
                      templatePath=templatePath,
                      buildDir=buildDir,
                      pandocDirs=pandocDirs,
+                     pandocTypes=pandocTypes,
                      staticDirs=staticDirs,
-                     verbose=verbose)
+                     verbose=verbose,
+                     jobs=jobs,
+                     cacheDir=cacheDir,
+                     copyStrategy=copyStrategy,
+                     checksum=checksum,
+                     debounce=debounce,
+                     latency=latency,
+                     pandocCacheSize=pandocCacheSize,
+                     minify=minify,
+                     compress=compress,
+                     compressThreshold=compressThreshold,
+                     fingerprint=fingerprint,
+                     profiler=profiler or NULL_PROFILER,
+                     pages=pages,
+                     shard=shard,
+                     assets=assets,
+                     documents=documents,
+                     dataDir=dataDir,
+                     data=data,
+                     plugins=registry)
@@ -0,0 +1,192 @@
+# * Libraries
+
+
+import os
+import stat as statinfo
+
+
+# * Variables
+
+
+KINDS = ("template", "module", "private", "static", "pandoc", "data")
+
+
+# * Classes
+
+
+class SourceFile:
+    """A file of the source tree.
+
+    Attributes:
+
+        name (:obj:`str`):
+            The path to the file relative to the root of the tree, with
+            components separated by ~/~ as in template names.
+
+        kind (:obj:`str`): One of ~grash.index.KINDS~.
+
+        size (:obj:`int`): The size of the file in bytes.
+
+        mtime (:obj:`int`): The modification time of the file in ns.
+
+    """
+    __slots__ = ("name", "kind", "size", "mtime")
+
+    def __init__(self, name, kind, size, mtime):
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.mtime = mtime
+
+    def __repr__(self):
+        return "SourceFile({}, {})".format(self.name, self.kind)
+
+
+class SourceIndex:
+    """An index of the source tree, sorting files by kind.
+
+    The tree is walked once with ~os.scandir~, following symbolic links like
+    the template loader does, and every file is classified once. Private
+    directories are not descended into.
+
+    Attributes:
+
+        root (:obj:`str`): The root of the source tree.
+
+        files (:obj:`dict`):
+            A map from file names to :obj:`SourceFile` instances.
+
+    """
+
+    def __init__(self, root, classify):
+        """
+        Args:
+
+            root (:obj:`str`): The root of the source tree.
+
+            classify (:obj:`callable`):
+                A function returning the kind of a file given its name.
+
+        """
+        self.root = root
+        self.files = {}
+        self._classify = classify
+        self._kinds = {kind: set() for kind in KINDS}
+
+    def __repr__(self):
+        return "SourceIndex({}, {} files)".format(self.root, len(self.files))
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    def _add(self, name, stat):
+        self._discard(name)
+        kind = self._classify(name)
+        self.files[name] = SourceFile(name, kind, stat.st_size,
+                                      stat.st_mtime_ns)
+        self._kinds[kind].add(name)
+
+    def _discard(self, name):
+        sourceFile = self.files.pop(name, None)
+        if sourceFile is not None:
+            self._kinds[sourceFile.kind].discard(name)
+
+    def scan(self):
+        """Walk the source tree and index all of its files.
+
+        Returns:
+
+            (:obj:`SourceIndex`): The index itself.
+
+        """
+        self.files = {}
+        self._kinds = {kind: set() for kind in KINDS}
+        visited = set()
+        pending = [(self.root, "")]
+        while pending:
+            dirpath, prefix = pending.pop()
+            realpath = os.path.realpath(dirpath)
+            if realpath in visited:
+                # A symbolic link cycle.
+                continue
+            visited.add(realpath)
+            try:
+                entries = list(os.scandir(dirpath))
+            except OSError:
+                continue
+            for entry in entries:
+                name = prefix + entry.name
+                try:
+                    if entry.is_dir():
+                        if not entry.name.startswith("."):
+                            pending.append((entry.path, name + "/"))
+                    elif entry.is_file():
+                        self._add(name, entry.stat())
+                except OSError:
+                    # The entry vanished or is a dangling link.
+                    continue
+        return self
+
+    def update(self, name):
+        """Refresh the entry of a single file.
+
+        A file which no longer exists is removed from the index.
+
+        Args:
+
+            name (:obj:`str`): The name of the file.
+
+        Returns:
+
+            (:obj:`SourceFile`): The entry of the file, or None if it is gone.
+
+        """
+        try:
+            stat = os.stat(self.path(name))
+        except OSError:
+            stat = None
+        if stat is None or not statinfo.S_ISREG(stat.st_mode):
+            self._discard(name)
+            return None
+        self._add(name, stat)
+        return self.files[name]
+
+    def remove(self, name):
+        """Remove a file from the index.
+
+        Args:
+
+            name (:obj:`str`): The name of the file.
+
+        Returns:
+
+            None.
+
+        """
+        self._discard(name)
+
+    def path(self, name):
+        """Return the path to a file of the index."""
+        return os.path.join(self.root, *name.split("/"))
+
+    def names(self, kind):
+        """Return the sorted names of all the files of a kind.
+
+        Args:
+
+            kind (:obj:`str`): One of ~grash.index.KINDS~.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of the files.
+
+        """
+        return sorted(self._kinds[kind])
+
+    def kind(self, name):
+        """Return the kind of an indexed file, or None if it is unknown."""
+        sourceFile = self.files.get(name)
+        return sourceFile.kind if sourceFile is not None else None
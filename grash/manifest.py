@@ -0,0 +1,327 @@
+# * Libraries
+
+
+import hashlib
+import json
+import os
+
+
+# * Variables
+
+
+MANIFEST_NAME = ".grash-manifest.json"
+MANIFEST_VERSION = 2
+
+
+# * Functions
+
+
+def digestBytes(data):
+    """Return the hex digest of a byte string.
+
+    >>> digestBytes(b"grash")[:12]
+    '9ad4db7cfb08'
+
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def digestObject(obj):
+    """Return the hex digest of a JSON-serialisable object.
+
+    The digest does not depend on the order of dictionary keys.
+
+    >>> digestObject({"a": 1, "b": 2}) == digestObject({"b": 2, "a": 1})
+    True
+
+    """
+    return digestBytes(json.dumps(obj, sort_keys=True).encode("utf8"))
+
+
+def digestFile(path, blockSize=1 << 20):
+    """Return the hex digest of the contents of the file at ~path~."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# * Classes
+
+
+class Manifest:
+    """A persistent record of the inputs each output has been built from.
+
+    Outputs are grouped in stages (e.g. ~templates~, ~pandoc~, ~static~) and
+    map to a JSON-serialisable description of their inputs: digests of their
+    sources, of the templates they depend on and of the settings used. An
+    output is fresh if it exists and its inputs have not changed since it was
+    recorded.
+
+    File digests are cached by size and modification time, so that checking
+    an unchanged tree only costs a ~stat~ per file.
+
+    Attributes:
+
+        path (:obj:`str`): The path to the manifest file.
+
+        outputs (:obj:`dict`):
+            A map from stages to maps from output names to their inputs.
+
+        files (:obj:`dict`):
+            A map from file paths to their size, modification time and digest.
+
+        references (:obj:`dict`):
+            The cache of a :obj:`grash.dependencies.DependencyGraph`.
+
+        buildDir (:obj:`str`):
+            The build directory the manifest was saved from, as the paths
+            to outputs in ~files~ start with it. None for a new manifest.
+
+        documents (:obj:`dict`):
+            A map from the pages generated from pandoc documents to the
+            digest of the document and its metadata, as indexed by
+            :obj:`grash.metadata.DocumentIndex`.
+
+    """
+
+    def __init__(self, path, outputs=None, files=None, references=None,
+                 buildDir=None, documents=None):
+        self.path = path
+        self.outputs = outputs if outputs is not None else {}
+        self.files = files if files is not None else {}
+        self.references = references if references is not None else {}
+        self.buildDir = buildDir
+        self.documents = documents if documents is not None else {}
+
+    def __repr__(self):
+        return "Manifest({})".format(self.path)
+
+    @classmethod
+    def load(cls, buildDir):
+        """Load the manifest of the build directory ~buildDir~.
+
+        A missing, unreadable or outdated manifest yields an empty one, which
+        causes everything to be rebuilt.
+
+        Args:
+
+            buildDir (:obj:`str`): The path to the build directory.
+
+        Returns:
+
+            (:obj:`Manifest`): The manifest of the build directory.
+
+        """
+        path = os.path.join(buildDir, MANIFEST_NAME)
+        try:
+            with open(path, "r", encoding="utf8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) \
+           or data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("outputs"), data.get("files"),
+                   data.get("references"), data.get("buildDir"),
+                   data.get("documents"))
+
+    def save(self):
+        """Atomically write the manifest to its path.
+
+        Returns:
+
+            None.
+
+        """
+        self.buildDir = os.path.dirname(self.path)
+        data = {"version": MANIFEST_VERSION,
+                "buildDir": self.buildDir,
+                "outputs": self.outputs,
+                "files": self.files,
+                "references": self.references,
+                "documents": self.documents}
+        temporary = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(temporary, "w", encoding="utf8") as f:
+            json.dump(data, f, sort_keys=True)
+        os.replace(temporary, self.path)
+
+    def digest(self, path, size=None, mtime=None):
+        """Return the digest of the file at ~path~.
+
+        The file is only read if its size or modification time differ from
+        the ones recorded with its last digest.
+
+        Args:
+
+            path (:obj:`str`): The path to a file.
+
+            size (:obj:`int`):
+                The size of the file, if already known.
+
+            mtime (:obj:`int`):
+                The modification time of the file in ns, if already known.
+
+        Returns:
+
+            (:obj:`str`): The hex digest of the file contents.
+
+        """
+        if size is None or mtime is None:
+            stat = os.stat(path)
+            size, mtime = stat.st_size, stat.st_mtime_ns
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == size and cached[1] == mtime:
+            return cached[2]
+        digest = digestFile(path)
+        self.files[path] = [size, mtime, digest]
+        return digest
+
+    def remember(self, path, digest):
+        """Record the digest of a file just written to ~path~.
+
+        Args:
+
+            path (:obj:`str`): The path to the file.
+
+            digest (:obj:`str`): The hex digest of its contents.
+
+        Returns:
+
+            None.
+
+        """
+        stat = os.stat(path)
+        self.files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+
+    def forgetFile(self, path):
+        """Drop the cached digest of the file at ~path~.
+
+        Returns:
+
+            None.
+
+        """
+        self.files.pop(path, None)
+
+    def isFresh(self, stage, name, inputs, output=None):
+        """Check whether an output is up to date.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the output.
+
+            name (:obj:`str`): The name of the output within its stage.
+
+            inputs (:obj:`dict`): The current inputs of the output.
+
+            output (:obj:`str`):
+                The path to the output file. If given, the output is only
+                fresh if the file exists.
+
+        Returns:
+
+            True if the output has been built from the same inputs,
+            False otherwise.
+
+        """
+        if output is not None and not os.path.exists(output):
+            return False
+        return self.outputs.get(stage, {}).get(name) == inputs
+
+    def record(self, stage, name, inputs):
+        """Record the inputs an output has been built from.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the output.
+
+            name (:obj:`str`): The name of the output within its stage.
+
+            inputs (:obj:`dict`): The inputs of the output.
+
+        Returns:
+
+            None.
+
+        """
+        self.outputs.setdefault(stage, {})[name] = inputs
+
+    def outputName(self, stage, name):
+        """Return the name of the file an output has been written to.
+
+        Outputs written under another name than their own, such as
+        fingerprinted static files, record it as their ~output~ input.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the output.
+
+            name (:obj:`str`): The name of the output within its stage.
+
+        Returns:
+
+            (:obj:`str`): The name of the file, relative to the build
+            directory.
+
+        """
+        inputs = self.outputs.get(stage, {}).get(name)
+        if isinstance(inputs, dict):
+            return inputs.get("output", name)
+        return name
+
+    def forget(self, stage, name):
+        """Drop the record of an output.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the output.
+
+            name (:obj:`str`): The name of the output within its stage.
+
+        Returns:
+
+            None.
+
+        """
+        self.outputs.get(stage, {}).pop(name, None)
+
+    def move(self, stage, name, newName):
+        """Record an output under a new name.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the output.
+
+            name (:obj:`str`): The former name of the output.
+
+            newName (:obj:`str`): The new name of the output.
+
+        Returns:
+
+            None.
+
+        """
+        outputs = self.outputs.get(stage, {})
+        if name in outputs:
+            outputs[newName] = outputs.pop(name)
+
+    def stale(self, stage, names):
+        """Return the recorded outputs of a stage missing from ~names~.
+
+        Args:
+
+            stage (:obj:`str`): The stage producing the outputs.
+
+            names (:obj:`list` of :obj:`str`):
+                The names of the outputs the stage currently produces.
+
+        Returns:
+
+            (:obj:`list` of :obj:`str`): The names of stale outputs.
+
+        """
+        names = set(names)
+        return sorted(name for name in self.outputs.get(stage, {})
+                      if name not in names)
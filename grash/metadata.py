@@ -0,0 +1,243 @@
+# * Libraries
+
+
+import re
+
+from .manifest import digestObject
+
+
+# * Variables
+
+
+# Bump whenever ~parseMetadata~ changes its output, to parse documents again.
+METADATA_VERSION = 1
+
+_KEYWORD = re.compile(r"^#\+(\w+):[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+
+_FRONT_MATTER = re.compile(r"\A---[ \t]*\n(.*?)\n(?:---|\.\.\.)[ \t]*\n",
+                           re.DOTALL)
+
+_FIELD = re.compile(r"^(\w+)[ \t]*:[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+_WORD = re.compile(r"\w+(?:['\u2019-]\w+)*")
+
+_SLUG = re.compile(r"[^\w]+")
+
+
+# * Functions
+
+
+def slugify(text):
+    """Return a lowercase slug of ~text~ made of words and dashes.
+
+    >>> slugify("Hello, World!")
+    'hello-world'
+
+    """
+    return _SLUG.sub("-", text.lower()).strip("-")
+
+
+def _splitTags(text):
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1]
+    return [tag for tag in re.split(r"[:,\s]+", text) if tag]
+
+
+def parseMetadata(text, stem):
+    """Extract the metadata of a document.
+
+    Metadata is read from the ~#+KEYWORD:~ lines of org documents, or from
+    a front matter of ~key: value~ lines between ~---~ lines, without
+    converting the document. The words of its body are counted.
+
+    >>> metadata = parseMetadata(
+    ...     "#+TITLE: Hello\\n#+DATE: <2020-01-02 Thu>\\n"
+    ...     "#+FILETAGS: :a:b:\\nSome words here.\\n", "hello-world")
+    >>> metadata["title"], metadata["date"], metadata["tags"]
+    ('Hello', '2020-01-02', ['a', 'b'])
+    >>> metadata["slug"], metadata["words"]
+    ('hello-world', 3)
+
+    Args:
+
+        text (:obj:`str`): The contents of the document.
+
+        stem (:obj:`str`): The name of the document without its suffix.
+
+    Returns:
+
+        (:obj:`dict`): The title, date (as ~YYYY-MM-DD~ or None), tags,
+        slug and word count of the document, along with every other
+        keyword in lowercase.
+
+    """
+    fields = {}
+    frontMatter = _FRONT_MATTER.match(text)
+    if frontMatter is not None:
+        for key, value in _FIELD.findall(frontMatter.group(1)):
+            fields[key.lower()] = value.strip("\"'")
+        body = text[frontMatter.end():]
+    else:
+        for key, value in _KEYWORD.findall(text):
+            fields.setdefault(key.lower(), value)
+        body = _KEYWORD.sub("", text)
+
+    date = _DATE.search(fields.get("date", ""))
+    tags = _splitTags(fields.get("filetags", "") or fields.get("tags", ""))
+    metadata = {key: value for key, value in fields.items()
+                if key != "filetags"}
+    metadata.update({"title": fields.get("title") or stem,
+                     "date": date.group() if date else None,
+                     "tags": tags,
+                     "slug": slugify(fields.get("slug") or stem) or stem,
+                     "words": len(_WORD.findall(body))})
+    return metadata
+
+
+# * Classes
+
+
+class DocumentIndex:
+    """The metadata of the pandoc documents of a site.
+
+    The index is exposed to templates as the ~documents~ global. Iterating
+    over it yields the metadata of every document, newest first, and its
+    views (~sorted~, ~tagged~, ~inDirectory~) are computed once per version
+    of the index, so that many pages listing documents share them.
+
+    Each entry is a :obj:`dict` with the ~name~ of the generated page, its
+    ~url~, the ~directory~ and ~source~ of the document, and the fields
+    returned by ~parseMetadata~.
+
+    >>> index = DocumentIndex()
+    >>> index.update("a.html", {"title": "A", "date": "2020-01-01",
+    ...                         "tags": ["x"]})
+    >>> index.update("b.html", {"title": "B", "date": "2021-01-01",
+    ...                         "tags": []})
+    >>> [document["title"] for document in index]
+    ['B', 'A']
+    >>> [document["title"] for document in index.tagged("x")]
+    ['A']
+
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.version = 0
+        self._views = {}
+
+    def __repr__(self):
+        return "DocumentIndex({} documents)".format(len(self.entries))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.sorted())
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getstate__(self):
+        # Views are cheaper to compute again than to send to workers.
+        return {"entries": self.entries, "version": self.version}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.entries = state["entries"]
+        self.version = state["version"]
+
+    # * Updates
+
+    def update(self, name, metadata):
+        """Add the metadata of a document, or replace it if it changed."""
+        metadata = dict(metadata, name=name)
+        if self.entries.get(name) == metadata:
+            return
+        self.entries[name] = metadata
+        self._changed()
+
+    def remove(self, name):
+        """Drop the metadata of a document, if it is indexed."""
+        if self.entries.pop(name, None) is not None:
+            self._changed()
+
+    def _changed(self):
+        self.version += 1
+        self._views.clear()
+
+    def _view(self, key, compute):
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = compute()
+        return view
+
+    # * Queries
+
+    def get(self, name, default=None):
+        """Return the metadata of the document generating page ~name~."""
+        return self.entries.get(name, default)
+
+    @property
+    def digest(self):
+        """Return the digest of the whole index."""
+        return self._view(("digest",), lambda: digestObject(self.entries))
+
+    def sorted(self, key="date", reverse=None):
+        """Return the documents sorted by a field.
+
+        Documents lacking the field come last, and ties are broken by the
+        names of their pages.
+
+        Args:
+
+            key (:obj:`str`): The field to sort by.
+
+            reverse (:obj:`bool`):
+                True for a descending order. Defaults to True for dates and
+                word counts, False otherwise.
+
+        Returns:
+
+            (:obj:`list` of :obj:`dict`): The sorted documents.
+
+        """
+        if reverse is None:
+            reverse = key in ("date", "words")
+
+        def compute():
+            present = [entry for entry in self.entries.values()
+                       if entry.get(key) is not None]
+            missing = [entry for entry in self.entries.values()
+                       if entry.get(key) is None]
+            present.sort(key=lambda entry: entry["name"])
+            present.sort(key=lambda entry: entry[key], reverse=reverse)
+            missing.sort(key=lambda entry: entry["name"])
+            return present + missing
+
+        return self._view(("sorted", key, reverse), compute)
+
+    @property
+    def tags(self):
+        """Return a map from tags to the documents bearing them, newest
+        first."""
+        def compute():
+            tags = {}
+            for entry in self.sorted():
+                for tag in entry.get("tags", ()):
+                    tags.setdefault(tag, []).append(entry)
+            return dict(sorted(tags.items()))
+
+        return self._view(("tags",), compute)
+
+    def tagged(self, tag):
+        """Return the documents bearing ~tag~, newest first."""
+        return self.tags.get(tag, [])
+
+    def inDirectory(self, directory):
+        """Return the documents of a pandoc directory, newest first."""
+        return self._view(("directory", directory), lambda: [
+            entry for entry in self.sorted()
+            if entry.get("directory") == directory])
@@ -0,0 +1,171 @@
+# * Libraries
+
+
+import hashlib
+import os
+import re
+
+from .cache import ContentCache
+
+
+# * Variables
+
+
+# Bump whenever ~minifyHTML~ changes its output, to invalidate cached pages.
+MINIFIER_VERSION = 2
+
+MAX_SIZE = 128 * 1024 * 1024
+
+HTML_SUFFIXES = (".html", ".htm")
+
+_TOKENS = re.compile(
+    r"(?P<comment><!--.*?-->)"
+    r"|(?P<raw><(?P<tag>pre|script|style|textarea)\b.*?</(?P=tag)\s*>)"
+    r"|(?P<element><(?:\"[^\"]*\"|'[^']*'|[^'\">])*>)",
+    re.IGNORECASE | re.DOTALL)
+
+# Only the whitespace of HTML: non-breaking spaces are content.
+_SPACE = re.compile(r"[ \t\n\r\f]+")
+
+_QUOTED = re.compile(r"(\"[^\"]*\"|'[^']*')")
+
+
+# * Functions
+
+
+def _collapseElement(element):
+    parts = _QUOTED.split(element)
+    # Odd parts are quoted attribute values, kept as they are.
+    for index in range(0, len(parts), 2):
+        parts[index] = _SPACE.sub(" ", parts[index])
+    return "".join(parts)
+
+
+def minifyHTML(text):
+    """Collapse the whitespace and remove the comments of an HTML page.
+
+    Runs of whitespace are collapsed to a single space, which renders the
+    same. The contents of ~pre~, ~script~, ~style~ and ~textarea~ elements,
+    quoted attribute values and conditional comments are left untouched.
+
+    >>> minifyHTML("<p>\\n  Hello   <b>world</b> <!-- x --></p>")
+    '<p> Hello <b>world</b> </p>'
+    >>> minifyHTML("<pre>  a\\n  b</pre>\\n<div   title='a  b'>")
+    "<pre>  a\\n  b</pre> <div title='a  b'>"
+    >>> minifyHTML('<a  title="a > b   c">  x</a>')
+    '<a title="a > b   c"> x</a>'
+
+    """
+    result = []
+    # The text around removed comments is collapsed as a whole.
+    pending = []
+    position = 0
+    for match in _TOKENS.finditer(text):
+        pending.append(text[position:match.start()])
+        position = match.end()
+        comment = match.group("comment")
+        if comment is not None and not comment.startswith("<!--[if"):
+            continue
+        result.append(_SPACE.sub(" ", "".join(pending)))
+        pending = []
+        if match.group("element") is not None:
+            result.append(_collapseElement(match.group("element")))
+        else:
+            result.append(match.group())
+    pending.append(text[position:])
+    result.append(_SPACE.sub(" ", "".join(pending)))
+    return "".join(result)
+
+
+def isHTML(name):
+    """Check whether an output is an HTML page by its name."""
+    return name.lower().endswith(HTML_SUFFIXES)
+
+
+def makeMinifier(settings):
+    """Return the post-rendering stage of the site described by ~settings~.
+
+    Every process rendering templates builds its minifier through this
+    function, sharing the cache of minified pages.
+
+    Args:
+
+        settings (:obj:`grash.config.Settings`):
+            The configuration of the site.
+
+    Returns:
+
+        (:obj:`Minifier`): A minifier, or None if minification is off.
+
+    """
+    if not settings.minify:
+        return None
+    cache = None
+    if settings.cacheDir:
+        cache = MinifyCache(os.path.join(settings.cacheDir, "minify"))
+    return Minifier(cache)
+
+
+# * Classes
+
+
+class MinifyCache(ContentCache):
+    """A content-addressed on-disk cache of minified pages.
+
+    Pages are keyed by their rendered contents and the version of the
+    minifier, so that a page rendered again with the same contents is not
+    minified again.
+
+    """
+
+    def __init__(self, directory, maxSize=MAX_SIZE):
+        super().__init__(directory, maxSize)
+
+    def key(self, text):
+        """Return the key of the minified version of ~text~."""
+        digest = hashlib.sha256(str(MINIFIER_VERSION).encode("utf8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf8"))
+        return digest.hexdigest()
+
+
+class Minifier:
+    """Minifies rendered HTML pages, reusing cached results.
+
+    Attributes:
+
+        cache (:obj:`MinifyCache`):
+            The cache of minified pages, or None to minify every page.
+
+    """
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def __repr__(self):
+        return "Minifier({})".format(self.cache)
+
+    def __call__(self, name, text):
+        """Return the minified text of an output, if it is an HTML page.
+
+        Args:
+
+            name (:obj:`str`): The name of the output.
+
+            text (:obj:`str`): The rendered text of the output.
+
+        Returns:
+
+            (:obj:`str`): The text to write.
+
+        """
+        if not isHTML(name):
+            return text
+        if self.cache is None:
+            return minifyHTML(text)
+        key = self.cache.key(text)
+        minified = self.cache.get(key)
+        if minified is None:
+            minified = minifyHTML(text)
+            self.cache.put(key, minified)
+        return minified
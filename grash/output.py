@@ -0,0 +1,355 @@
+# * Libraries
+
+
+import os
+import queue
+import threading
+
+from .manifest import digestBytes
+from .profiler import NULL_PROFILER
+from .sync import formatSize
+
+
+# * Variables
+
+
+# The number of outputs waiting to be written before rendering blocks.
+QUEUE_SIZE = 256
+
+
+# * Classes
+
+
+class OutputReport:
+    """A summary of the outputs of a build.
+
+    Attributes:
+
+        written (:obj:`int`): The number of outputs written.
+
+        writtenBytes (:obj:`int`): The number of bytes written.
+
+        unchanged (:obj:`int`):
+            The number of outputs left untouched, their contents being
+            identical to the rendered ones.
+
+        unchangedBytes (:obj:`int`): The number of bytes of unchanged outputs.
+
+        moved (:obj:`int`): The number of outputs moved.
+
+        removed (:obj:`int`): The number of outputs removed.
+
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.writtenBytes = 0
+        self.unchanged = 0
+        self.unchangedBytes = 0
+        self.moved = 0
+        self.removed = 0
+
+    def __repr__(self):
+        return ("OutputReport(written={}, unchanged={}, moved={}, "
+                "removed={})").format(self.written, self.unchanged,
+                                      self.moved, self.removed)
+
+    def __str__(self):
+        return ("Wrote {} outputs ({}), left {} unchanged ({}), moved {}, "
+                "removed {}.").format(
+                    self.written, formatSize(self.writtenBytes),
+                    self.unchanged, formatSize(self.unchangedBytes),
+                    self.moved, self.removed)
+
+
+class OutputWriter:
+    """Writes outputs to the build directory from a background thread.
+
+    Output sinks, such as :obj:`OutputWriter` and :obj:`MemorySink`, take the
+    outputs of a build through ~write~ and ~remove~, and return a report of
+    them from ~close~. Persistent sinks keep their outputs between builds, so
+    that the manifest may record them.
+
+    An output is only written if its contents differ from the file already
+    in place, so that unchanged outputs keep their modification time. Files
+    are compared by size first, then by digest; digests of files on disk are
+    cached by the manifest, so an unchanged output is not read again.
+
+    Outputs are queued to a single writer thread, letting rendering go on
+    while earlier outputs reach the disk. The queue is bounded so that a
+    slow disk throttles rendering instead of piling up rendered pages in
+    memory. The first error raised by the writer thread is raised again by
+    the next call to ~write~, ~remove~ or ~close~, and nothing queued after
+    the failing output is handled.
+
+    Attributes:
+
+        buildDir (:obj:`str`): The path to the build directory.
+
+        manifest (:obj:`grash.manifest.Manifest`):
+            The manifest caching the digests of the outputs.
+
+        report (:obj:`OutputReport`): The outputs handled so far.
+
+    """
+    persistent = True
+
+    def __init__(self, buildDir, manifest, queueSize=QUEUE_SIZE,
+                 profiler=NULL_PROFILER):
+        self.buildDir = buildDir
+        self.manifest = manifest
+        self.profiler = profiler
+        self.report = OutputReport()
+        self._queue = queue.Queue(maxsize=queueSize)
+        self._error = None
+        self._done = []
+        self._thread = threading.Thread(target=self._run,
+                                        name="grash-writer", daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return "OutputWriter({})".format(self.buildDir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # * Queue
+
+    def _raiseError(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def write(self, name, data):
+        """Queue an output to be written if its contents have changed.
+
+        Args:
+
+            name (:obj:`str`):
+                The name of the output, relative to the build directory.
+
+            data (:obj:`bytes`): The contents of the output.
+
+        Returns:
+
+            None.
+
+        """
+        self._raiseError()
+        self._queue.put((self._write, name, data))
+
+    def remove(self, name):
+        """Queue an output to be removed.
+
+        Args:
+
+            name (:obj:`str`):
+                The name of the output, relative to the build directory.
+
+        Returns:
+
+            None.
+
+        """
+        self._raiseError()
+        self._queue.put((self._remove, name, None))
+
+    def move(self, name, newName):
+        """Queue an output to be moved.
+
+        Args:
+
+            name (:obj:`str`):
+                The name of the output, relative to the build directory.
+
+            newName (:obj:`str`): The new name of the output.
+
+        Returns:
+
+            None.
+
+        """
+        self._raiseError()
+        self._queue.put((self._move, name, newName))
+
+    def after(self, function):
+        """Queue a function to call once the outputs queued so far are handled.
+
+        Functions are called by ~close~ from the calling thread, and only
+        if every output queued before them has been handled, so that the
+        manifest only records outputs which have reached the disk.
+
+        Args:
+
+            function (:obj:`callable`): A function called without arguments.
+
+        Returns:
+
+            None.
+
+        """
+        self._raiseError()
+        self._queue.put((self._after, function, None))
+
+    def close(self):
+        """Wait until every queued output has been handled.
+
+        Returns:
+
+            (:obj:`OutputReport`): The outputs handled by the writer.
+
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        done, self._done = self._done, []
+        for function in done:
+            function()
+        self._raiseError()
+        return self.report
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Drain the queue without touching the disk any further.
+                continue
+            handler, name, data = item
+            try:
+                handler(name, data)
+            except BaseException as error:
+                self._error = error
+
+    # * Handlers
+
+    def isUnchanged(self, path, size, digest):
+        """Check whether the file at ~path~ has the given size and digest."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if stat.st_size != size:
+            return False
+        return self.manifest.digest(path, stat.st_size, stat.st_mtime_ns) \
+            == digest
+
+    def _write(self, name, data):
+        path = os.path.join(self.buildDir, name)
+        digest = digestBytes(data)
+        if self.isUnchanged(path, len(data), digest):
+            self.report.unchanged += 1
+            self.report.unchangedBytes += len(data)
+            return
+        with self.profiler.measure("output", name):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            temporary = "{}.{}.tmp".format(path, os.getpid())
+            try:
+                with open(temporary, "wb") as f:
+                    f.write(data)
+                os.replace(temporary, path)
+            finally:
+                if os.path.lexists(temporary):
+                    os.remove(temporary)
+            self.manifest.remember(path, digest)
+        self.report.written += 1
+        self.report.writtenBytes += len(data)
+
+    def _after(self, function, data):
+        self._done.append(function)
+
+    def _pruneParents(self, path):
+        """Remove the directories left empty above a removed output."""
+        root = os.path.normpath(self.buildDir)
+        parent = os.path.dirname(os.path.normpath(path))
+        while parent != root and parent.startswith(root + os.sep):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                return
+            parent = os.path.dirname(parent)
+
+    def _remove(self, name, data):
+        path = os.path.join(self.buildDir, name)
+        self.manifest.forgetFile(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self._pruneParents(path)
+        self.report.removed += 1
+
+    def _move(self, name, newName):
+        path = os.path.join(self.buildDir, name)
+        newPath = os.path.join(self.buildDir, newName)
+        if not os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(newPath) or ".", exist_ok=True)
+        os.replace(path, newPath)
+        cached = self.manifest.files.pop(path, None)
+        if cached is not None:
+            self.manifest.files[newPath] = cached
+        self._pruneParents(path)
+        self.report.moved += 1
+
+
+class MemorySink:
+    """Keeps the outputs of a build in memory.
+
+    Attributes:
+
+        outputs (:obj:`dict`):
+            A map from output names, relative to the build directory, to
+            their contents.
+
+        report (:obj:`OutputReport`): The outputs handled so far.
+
+    """
+    persistent = False
+
+    def __init__(self):
+        self.outputs = {}
+        self.report = OutputReport()
+
+    def __repr__(self):
+        return "MemorySink({} outputs)".format(len(self.outputs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def write(self, name, data):
+        """Keep the contents of an output, replacing any previous ones."""
+        if self.outputs.get(name) == data:
+            self.report.unchanged += 1
+            self.report.unchangedBytes += len(data)
+            return
+        self.outputs[name] = data
+        self.report.written += 1
+        self.report.writtenBytes += len(data)
+
+    def remove(self, name):
+        """Drop an output."""
+        if self.outputs.pop(name, None) is not None:
+            self.report.removed += 1
+
+    def move(self, name, newName):
+        """Keep an output under a new name."""
+        if name in self.outputs:
+            self.outputs[newName] = self.outputs.pop(name)
+            self.report.moved += 1
+
+    def after(self, function):
+        """Call a function right away, outputs being kept as they come."""
+        function()
+
+    def close(self):
+        return self.report
@@ -0,0 +1,226 @@
+# * Libraries
+
+
+import posixpath
+from collections import namedtuple
+
+from jinja2 import nodes
+
+from .manifest import digestBytes, digestObject
+
+
+# * Variables
+
+
+# The number of items on a page unless the template sets ~size~.
+PAGE_SIZE = 10
+
+
+# * Functions
+
+
+def pageName(templateName, number):
+    """Return the name of a page of a paginated template.
+
+    >>> pageName("index.html", 2)
+    'page/2/index.html'
+    >>> pageName("blog/archive.html", 1)
+    'blog/archive/page/1/index.html'
+
+    """
+    dirname, basename = posixpath.split(templateName)
+    if basename == "index.html":
+        base = dirname
+    else:
+        base = posixpath.splitext(templateName)[0]
+    return posixpath.join(base, "page", str(number), "index.html")
+
+
+def paginationOf(ast):
+    """Return the pagination declared by a parsed template, if any.
+
+    A template is paginated by assigning a constant map to ~paginate~, with
+    the expression of the collection to paginate as ~items~ and the number
+    of items per page as ~size~:
+
+    ~{% set paginate = {"items": "documents.tagged('python')", "size": 20} %}~
+
+    Args:
+
+        ast (:obj:`jinja2.nodes.Template`): The parsed template.
+
+    Returns:
+
+        (:obj:`dict`): The expression and size of the pagination, or None.
+
+    """
+    for assign in ast.find_all(nodes.Assign):
+        if not isinstance(assign.target, nodes.Name) \
+           or assign.target.name != "paginate":
+            continue
+        try:
+            spec = assign.node.as_const()
+        except nodes.Impossible:
+            return None
+        if not isinstance(spec, dict) or not isinstance(spec.get("items"),
+                                                        str):
+            return None
+        size = spec.get("size", PAGE_SIZE)
+        if not isinstance(size, int) or size < 1:
+            size = PAGE_SIZE
+        return {"items": spec["items"], "size": size}
+    return None
+
+
+def evaluate(environment, expression, collections=None):
+    """Evaluate the collection of a paginated template as a list.
+
+    Args:
+
+        environment (:obj:`jinja2.Environment`):
+            The environment whose globals the expression reads.
+
+        expression (:obj:`str`): The expression of the collection.
+
+        collections (:obj:`dict`):
+            A map from expressions to their collections, filled in as they
+            are evaluated, or None to evaluate the expression every time.
+
+    Returns:
+
+        (:obj:`list`): The items of the collection.
+
+    """
+    if collections is not None and expression in collections:
+        return collections[expression]
+    items = environment.compile_expression(expression)()
+    items = list(items.values() if isinstance(items, dict) else items or ())
+    if collections is not None:
+        collections[expression] = items
+    return items
+
+
+def digestItems(items):
+    """Return the digest of the items of a page."""
+    try:
+        return digestObject(items)
+    except (TypeError, ValueError):
+        return digestBytes(repr(items).encode("utf8"))
+
+
+def renderPage(environment, page, collections=None):
+    """Render a page of a paginated template.
+
+    The template receives the page as ~pager~, a :obj:`Pager` slicing the
+    collection on demand.
+
+    Args:
+
+        environment (:obj:`jinja2.Environment`): The environment to use.
+
+        page (:obj:`Page`): The page to render.
+
+        collections (:obj:`dict`): A cache of evaluated collections.
+
+    Returns:
+
+        (:obj:`str`): The rendered page.
+
+    """
+    items = evaluate(environment, page.expression, collections)
+    template = environment.get_template(page.template)
+    return template.render(pager=Pager(page, items))
+
+
+# * Classes
+
+
+class Page(namedtuple("Page", ["template", "name", "number", "count", "size",
+                               "expression"])):
+    """A page of a paginated template, to be rendered.
+
+    Pages are sent to the workers of the parallel renderer, which evaluate
+    the collection and slice it themselves.
+
+    Attributes:
+
+        template (:obj:`str`): The name of the paginated template.
+
+        name (:obj:`str`): The name of the output.
+
+        number (:obj:`int`): The number of the page, counting from 1.
+
+        count (:obj:`int`): The number of pages.
+
+        size (:obj:`int`): The number of items per page.
+
+        expression (:obj:`str`): The expression of the collection.
+
+    """
+    __slots__ = ()
+
+    @property
+    def bounds(self):
+        """Return the slice of the collection shown on the page."""
+        start = (self.number - 1) * self.size
+        return slice(start, start + self.size)
+
+
+class Pager:
+    """The page of a collection a paginated template renders.
+
+    >>> page = Page("index.html", "page/2/index.html", 2, 3, 2, "items")
+    >>> pager = Pager(page, list("abcde"))
+    >>> pager.items, pager.previous, pager.next
+    (['c', 'd'], '/page/1/', '/page/3/')
+
+    Attributes:
+
+        number (:obj:`int`): The number of the page, counting from 1.
+
+        count (:obj:`int`): The number of pages.
+
+        size (:obj:`int`): The number of items per page.
+
+        total (:obj:`int`): The number of items of the collection.
+
+    """
+
+    def __init__(self, page, collection):
+        self._page = page
+        self._collection = collection
+        self._items = None
+        self.number = page.number
+        self.count = page.count
+        self.size = page.size
+        self.total = len(collection)
+
+    def __repr__(self):
+        return "Pager({}/{})".format(self.number, self.count)
+
+    @property
+    def items(self):
+        """Return the items of the page, slicing the collection once."""
+        if self._items is None:
+            self._items = self._collection[self._page.bounds]
+        return self._items
+
+    @property
+    def pages(self):
+        """Return the numbers of every page."""
+        return range(1, self.count + 1)
+
+    def url(self, number):
+        """Return the URL of page ~number~ of the collection."""
+        name = pageName(self._page.template, number)
+        return "/" + name[:-len("index.html")]
+
+    @property
+    def previous(self):
+        """Return the URL of the previous page, or None on the first."""
+        return self.url(self.number - 1) if self.number > 1 else None
+
+    @property
+    def next(self):
+        """Return the URL of the next page, or None on the last."""
+        return self.url(self.number + 1) if self.number < self.count else None
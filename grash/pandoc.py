@@ -0,0 +1,114 @@
+# * Libraries
+
+
+import hashlib
+import json
+
+from .cache import ContentCache
+
+
+# * Variables
+
+
+MAX_SIZE = 512 * 1024 * 1024
+
+_pandocVersion = None
+
+
+# * Functions
+
+
+def pandocVersion():
+    """Return the version of the pandoc executable, probing it only once."""
+    global _pandocVersion
+    if _pandocVersion is None:
+        import pypandoc
+        _pandocVersion = pypandoc.get_pandoc_version()
+    return _pandocVersion
+
+
+def convert(source, docType, to="html", extraArgs=(), cache=None):
+    """Convert a document with pandoc.
+
+    Args:
+
+        source (:obj:`str`): The contents of the document.
+
+        docType (:obj:`str`): The input format of the document.
+
+        to (:obj:`str`): The output format.
+
+        extraArgs (:obj:`list` of :obj:`str`):
+            Additional command-line arguments to pandoc.
+
+        cache (:obj:`PandocCache`):
+            A cache of conversions. Documents found in it are not converted
+            again.
+
+    Returns:
+
+        (:obj:`str`): The converted document.
+
+    """
+    # Sites without pandoc documents never load pypandoc.
+    import pypandoc
+
+    if cache is None:
+        return pypandoc.convert_text(source, to, format=docType,
+                                     extra_args=list(extraArgs))
+    key = cache.key(source, docType, to, extraArgs)
+    converted = cache.get(key)
+    if converted is None:
+        converted = pypandoc.convert_text(source, to, format=docType,
+                                          extra_args=list(extraArgs))
+        cache.put(key, converted)
+    return converted
+
+
+# * Classes
+
+
+class PandocCache(ContentCache):
+    """A content-addressed on-disk cache of pandoc conversions.
+
+    Conversions are keyed by the contents of the document, its input format,
+    the output format, the extra arguments and the version of pandoc, so
+    that any change to them yields a new conversion. Once the cache exceeds
+    ~maxSize~ bytes, ~evict~ removes the least recently used conversions.
+
+    Attributes:
+
+        directory (:obj:`str`): The directory the conversions are stored in.
+
+        maxSize (:obj:`int`): The size of the cache in bytes.
+
+    """
+
+    def __init__(self, directory, maxSize=MAX_SIZE):
+        super().__init__(directory, maxSize)
+
+    def key(self, source, docType, to="html", extraArgs=()):
+        """Return the key of a conversion.
+
+        Args:
+
+            source (:obj:`str`): The contents of the document.
+
+            docType (:obj:`str`): The input format of the document.
+
+            to (:obj:`str`): The output format.
+
+            extraArgs (:obj:`list` of :obj:`str`):
+                Additional command-line arguments to pandoc.
+
+        Returns:
+
+            (:obj:`str`): The hex digest identifying the conversion.
+
+        """
+        digest = hashlib.sha256()
+        digest.update(json.dumps([pandocVersion(), docType, to,
+                                  list(extraArgs)]).encode("utf8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf8"))
+        return digest.hexdigest()
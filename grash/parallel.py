@@ -0,0 +1,132 @@
+# * Libraries
+
+
+import os
+import time
+
+from .environment import makeEnvironment
+from .minify import makeMinifier
+from .pagination import Page, renderPage
+
+
+# * Variables
+
+
+# The environment of a worker process, built once by ~_initWorker~ and reused
+# for every template the worker renders.
+_workerEnv = None
+_workerMinifier = None
+_workerProfile = False
+# The collections of paginated templates, evaluated once per worker.
+_workerCollections = {}
+
+
+# * Functions
+
+
+def resolveJobs(jobs):
+    """Return the number of worker processes to use.
+
+    Args:
+
+        jobs (:obj:`int`):
+            The requested number of jobs. Values below 1 (or None) stand for
+            the number of CPUs available.
+
+    Returns:
+
+        (:obj:`int`): A positive number of jobs.
+
+    """
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _initWorker(settings, profile, pages, assets, documents):
+    global _workerEnv, _workerMinifier, _workerProfile
+    _workerEnv = makeEnvironment(settings, pages, assets, documents)
+    _workerMinifier = makeMinifier(settings)
+    _workerProfile = profile
+
+
+def _render(item):
+    if isinstance(item, Page):
+        name = item.name
+        text = renderPage(_workerEnv, item, _workerCollections)
+    else:
+        name = item
+        text = _workerEnv.get_template(item).render()
+    if _workerMinifier is not None:
+        text = _workerMinifier(name, text)
+    return name, text
+
+
+def _renderWorker(item):
+    if not _workerProfile:
+        return _render(item) + (None,)
+    wall, cpu = time.perf_counter(), time.process_time()
+    name, text = _render(item)
+    timing = (time.perf_counter() - wall, time.process_time() - cpu)
+    return name, text, timing
+
+
+def renderParallel(settings, templateNames, jobs, profile=False, pages=None,
+                   assets=None, documents=None):
+    """Render templates over a pool of worker processes.
+
+    Each worker builds its own environment once and renders its whole share
+    of templates with it, minifying the rendered pages if the settings ask
+    for it. Pages of paginated templates are rendered from their
+    collections, evaluated once per worker. Results are yielded in the order
+    of ~templateNames~, and the first failing template raises the exception
+    pickled back from its worker.
+
+    Args:
+
+        settings (:obj:`grash.config.Settings`):
+            The configuration used to build the environment of each worker.
+
+        templateNames (:obj:`list` of :obj:`str` or
+                       :obj:`grash.pagination.Page`):
+            The names of the templates and the pages to render.
+
+        jobs (:obj:`int`): The number of worker processes.
+
+        profile (:obj:`bool`):
+            If True, workers measure the wall and CPU time of each template.
+
+        pages (:obj:`dict`):
+            The generated templates of the site, passed to
+            ~grash.environment.makeEnvironment~.
+
+        assets (:obj:`dict`):
+            The fingerprinted names of static files, passed to
+            ~grash.environment.makeEnvironment~.
+
+        documents (:obj:`grash.metadata.DocumentIndex`):
+            The metadata of pandoc documents, passed to
+            ~grash.environment.makeEnvironment~.
+
+    Yields:
+
+        (:obj:`tuple`): Triples of an output name, its rendered text and
+        its wall and CPU times (None unless profiling).
+
+    """
+    # Serial builds do not pay for loading multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor
+
+    templateNames = list(templateNames)
+    if not templateNames:
+        return
+    jobs = min(jobs, len(templateNames))
+    # A few chunks per worker balance the load without paying the IPC
+    # overhead of dispatching templates one by one.
+    chunksize = max(1, len(templateNames) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=_initWorker,
+                             initargs=(settings, profile, pages,
+                                       assets, documents)) as executor:
+        yield from executor.map(_renderWorker, templateNames,
+                                chunksize=chunksize)
@@ -0,0 +1,418 @@
+# * Libraries
+
+
+import functools
+import importlib
+import importlib.util
+import os
+import sys
+from collections import OrderedDict
+
+from .manifest import digestBytes, digestObject
+
+
+# * Variables
+
+
+# The group of the entry points registering plugins.
+ENTRY_POINT_GROUP = "grash.plugins"
+
+# The module of a project registering plugins, looked up next to its
+# template directory.
+PLUGIN_MODULE = "grash_plugins.py"
+
+# The number of results of pure functions kept by a registry.
+MEMO_SIZE = 65536
+
+# The kinds of functions a registry installs, and the attributes of the
+# jinja2 environment they are installed in.
+KINDS = {"filter": "filters", "test": "tests", "global": "globals"}
+
+# The attribute marking pure functions.
+_PURE = "grashPure"
+
+# jinja2 passes the context of a template to functions marked with these,
+# which therefore depend on more than their arguments.
+_CONTEXTUAL = frozenset(["context", "eval_context"])
+
+_MISSING = object()
+
+# The digests of the sources of the modules imported by name, when they
+# were last imported.
+_moduleDigests = {}
+
+
+# * Functions
+
+
+def pure(function):
+    """Mark a function as pure, for registries to memoize its results.
+
+    A pure function returns the same value whenever it is called with the
+    same arguments, and has no side effects.
+
+    >>> @pure
+    ... def double(x):
+    ...     return 2 * x
+    >>> isPure(double)
+    True
+
+    """
+    setattr(function, _PURE, True)
+    return function
+
+
+def isPure(function):
+    """Check whether a function has been marked as pure."""
+    return getattr(function, _PURE, False)
+
+
+def _isContextual(function):
+    passArg = getattr(function, "jinja_pass_arg", None) \
+        or getattr(function, "_jinja_pass_arg", None)
+    return getattr(passArg, "name", None) in _CONTEXTUAL
+
+
+def _entryPoints():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    entryPoints = entry_points()
+    if hasattr(entryPoints, "select"):
+        return list(entryPoints.select(group=ENTRY_POINT_GROUP))
+    return list(entryPoints.get(ENTRY_POINT_GROUP, ()))
+
+
+def _digestSource(path):
+    """Return the digest of the source of a module, None if unreadable."""
+    try:
+        with open(path, "rb") as f:
+            return digestBytes(f.read())
+    except (OSError, TypeError):
+        return None
+
+
+def _importPath(path):
+    """Import a module from the path to its source.
+
+    Modules are named after the digest of their path and source, so that a
+    module edited since its last import is imported again. The source is
+    compiled from the bytes digested rather than from cached bytecode, which
+    misses edits keeping the size of the file within the same second.
+
+    """
+    path = os.path.abspath(path)
+    with open(path, "rb") as f:
+        source = f.read()
+    prefix = "_grash_plugin_{}_".format(
+        digestBytes(path.encode("utf8"))[:16])
+    name = prefix + digestBytes(source)[:16]
+    module = sys.modules.get(name)
+    if module is None:
+        # Former versions of the module are forgotten.
+        for former in [key for key in sys.modules if key.startswith(prefix)]:
+            del sys.modules[former]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            exec(compile(source, path, "exec"), module.__dict__)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return module
+
+
+def _importModule(name):
+    """Import a module by name, reloading it if its source has changed."""
+    module = importlib.import_module(name)
+    digest = _digestSource(getattr(module, "__file__", None))
+    if _moduleDigests.setdefault(name, digest) != digest:
+        module = importlib.reload(module)
+        _moduleDigests[name] = digest
+    return module
+
+
+def loadPlugins(settings):
+    """Build the registry of the plugins of a site.
+
+    Plugins are registered, in order, by the installed packages declaring
+    entry points in the ~grash.plugins~ group, by the modules listed in
+    ~settings.plugins~, and by the ~grash_plugins.py~ module lying next to
+    the template directory, if any. Each of them is, or has, a ~register~
+    function called with the registry. Modules edited since they were last
+    loaded are imported again, unlike installed packages.
+
+    Args:
+
+        settings (:obj:`grash.config.Settings`):
+            The configuration of the site.
+
+    Returns:
+
+        (:obj:`PluginRegistry`): The registry of the plugins.
+
+    """
+    registry = PluginRegistry(modules=settings.plugins)
+    for entryPoint in _entryPoints():
+        registry.load(entryPoint.load())
+    for plugin in settings.plugins or ():
+        if plugin.endswith(".py") or os.path.sep in plugin:
+            registry.load(_importPath(plugin))
+        else:
+            registry.load(_importModule(plugin))
+    path = os.path.join(os.path.dirname(os.path.abspath(
+        settings.templatePath)), PLUGIN_MODULE)
+    if os.path.isfile(path):
+        registry.load(_importPath(path))
+    return registry
+
+
+# * Classes
+
+
+class Memo:
+    """A bounded map from calls of pure functions to their results.
+
+    The least recently used results are dropped beyond ~maxSize~. Calls
+    with unhashable arguments are not memoized.
+
+    >>> memo = Memo(maxSize=2)
+    >>> square = memo.wrap(lambda x: x * x)
+    >>> square(2), square(2), square(3), memo.hits, memo.misses
+    (4, 4, 9, 1, 2)
+
+    Attributes:
+
+        maxSize (:obj:`int`): The number of results kept.
+
+        hits (:obj:`int`): The number of calls answered from the memo.
+
+        misses (:obj:`int`): The number of calls computed.
+
+    """
+
+    def __init__(self, maxSize=MEMO_SIZE):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __repr__(self):
+        return "Memo({}/{} results)".format(len(self._results), self.maxSize)
+
+    def __len__(self):
+        return len(self._results)
+
+    def clear(self):
+        """Drop every result."""
+        self._results.clear()
+
+    def wrap(self, function):
+        """Return a memoized version of a pure function.
+
+        Results of every function wrapped by the memo share its bound.
+
+        """
+        results = self._results
+
+        @functools.wraps(function)
+        def memoized(*args, **kwargs):
+            key = (memoized, args, tuple(sorted(kwargs.items())))
+            try:
+                result = results.get(key, _MISSING)
+            except TypeError:
+                # Unhashable arguments.
+                return function(*args, **kwargs)
+            if result is not _MISSING:
+                results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+            result = results[key] = function(*args, **kwargs)
+            if len(results) > self.maxSize:
+                results.popitem(last=False)
+            return result
+
+        return memoized
+
+
+class PluginRegistry:
+    """The filters, tests and globals plugins add to the environment.
+
+    Functions marked as pure, with the ~pure~ decorator or argument, are
+    memoized in a single bounded memo shared by every template rendered
+    with the environment. Functions passed the context of templates are
+    never memoized.
+
+    >>> registry = PluginRegistry()
+    >>> @registry.filter(name="shout", pure=True)
+    ... def shout(text):
+    ...     return text.upper() + "!"
+    >>> from jinja2 import Environment
+    >>> environment = Environment()
+    >>> registry.install(environment)
+    >>> environment.from_string("{{ 'hi' | shout }}").render()
+    'HI!'
+
+    Attributes:
+
+        functions (:obj:`dict`):
+            A map from kinds (~filter~, ~test~ or ~global~) to maps from
+            names to registered functions.
+
+        modules (:obj:`list` of :obj:`str`):
+            The modules the registry has been loaded from, as listed in the
+            settings of the site.
+
+        sources (:obj:`list` of :obj:`str`):
+            The paths to the source of the modules registering plugins.
+
+        memo (:obj:`Memo`): The results of pure functions.
+
+    """
+
+    def __init__(self, modules=None, memoSize=MEMO_SIZE):
+        self.functions = {kind: {} for kind in KINDS}
+        self.modules = list(modules or [])
+        self.sources = []
+        self.memo = Memo(memoSize)
+        self._loaded = {}
+
+    def __repr__(self):
+        return "PluginRegistry({} functions)".format(len(self))
+
+    def __len__(self):
+        return sum(len(functions) for functions in self.functions.values())
+
+    def _register(self, kind, function, name, pure):
+        def register(function):
+            if pure:
+                setattr(function, _PURE, True)
+            self.functions[kind][name or function.__name__] = function
+            return function
+
+        if function is None:
+            return register
+        return register(function)
+
+    def filter(self, function=None, name=None, pure=False):
+        """Register a filter, directly or as a decorator.
+
+        Args:
+
+            function (:obj:`callable`): The filter.
+
+            name (:obj:`str`): The name of the filter, defaulting to the
+                name of the function.
+
+            pure (:obj:`bool`): True to memoize the filter.
+
+        Returns:
+
+            (:obj:`callable`): The function, or a decorator registering it
+            if ~function~ is None.
+
+        """
+        return self._register("filter", function, name, pure)
+
+    def test(self, function=None, name=None, pure=False):
+        """Register a test, as ~filter~ does for filters."""
+        return self._register("test", function, name, pure)
+
+    def global_(self, function=None, name=None, pure=False):
+        """Register a global function, as ~filter~ does for filters."""
+        return self._register("global", function, name, pure)
+
+    def load(self, plugin):
+        """Let a plugin register its functions.
+
+        Args:
+
+            plugin: A module with a ~register~ function, or the function
+                itself, called with the registry.
+
+        Returns:
+
+            None.
+
+        """
+        register = plugin if callable(plugin) \
+            else getattr(plugin, "register", None)
+        if register is None:
+            raise ValueError("plugin {!r} has no register function"
+                             .format(getattr(plugin, "__name__", plugin)))
+        source = getattr(sys.modules.get(register.__module__), "__file__",
+                         None)
+        if source is not None and source not in self.sources:
+            self.sources.append(source)
+            self._loaded[source] = _digestSource(source)
+        register(self)
+
+    def isOutdated(self):
+        """Check whether the source of a module has changed since loaded.
+
+        Returns:
+
+            True if a module registering plugins has been edited since it
+            was loaded, False otherwise.
+
+        """
+        return any(_digestSource(source) != digest
+                   for source, digest in self._loaded.items())
+
+    def install(self, environment):
+        """Add the registered functions to a jinja2 environment.
+
+        Args:
+
+            environment (:obj:`jinja2.Environment`): The environment.
+
+        Returns:
+
+            None.
+
+        """
+        for kind, attribute in KINDS.items():
+            installed = getattr(environment, attribute)
+            for name, function in self.functions[kind].items():
+                if isPure(function) and not _isContextual(function):
+                    function = self.memo.wrap(function)
+                installed[name] = function
+
+    def uninstall(self, environment):
+        """Remove the registered functions from a jinja2 environment.
+
+        Args:
+
+            environment (:obj:`jinja2.Environment`): The environment.
+
+        Returns:
+
+            None.
+
+        """
+        for kind, attribute in KINDS.items():
+            installed = getattr(environment, attribute)
+            for name in self.functions[kind]:
+                installed.pop(name, None)
+
+    @property
+    def digest(self):
+        """Return the digest of the registered functions and their sources.
+
+        Returns:
+
+            (:obj:`str`): The digest, which changes whenever a function is
+            registered under another name or the source of a module
+            registering plugins changes.
+
+        """
+        sources = {source: _digestSource(source) for source in self.sources}
+        return digestObject({
+            "functions": {kind: sorted([name, bool(isPure(function))]
+                                       for name, function in
+                                       functions.items())
+                          for kind, functions in self.functions.items()},
+            "sources": sources})
@@ -0,0 +1,223 @@
+# * Libraries
+
+
+import json
+import time
+from contextlib import contextmanager
+
+
+# * Variables
+
+
+TOP = 10
+
+
+# * Classes
+
+
+class Timing:
+    """The wall and CPU time spent on an item of a build.
+
+    Attributes:
+
+        kind (:obj:`str`):
+            The kind of the item, e.g. ~phase~, ~template~, ~pandoc~ or
+            ~static~.
+
+        name (:obj:`str`): The name of the item.
+
+        wall (:obj:`float`): The wall time in seconds.
+
+        cpu (:obj:`float`): The CPU time in seconds.
+
+    """
+    __slots__ = ("kind", "name", "wall", "cpu")
+
+    def __init__(self, kind, name, wall, cpu):
+        self.kind = kind
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+
+    def __repr__(self):
+        return "Timing({}, {}, {:.6f}s)".format(self.kind, self.name,
+                                               self.wall)
+
+    def asDict(self):
+        return {"kind": self.kind, "name": self.name,
+                "wall": self.wall, "cpu": self.cpu}
+
+
+class Profiler:
+    """Records where the time of a build goes.
+
+    Phases are timed with the CPU time of the whole process, items (templates,
+    pandoc conversions, static copies) with the CPU time of the thread
+    handling them. Timings measured elsewhere, e.g. by the workers of a
+    parallel build, can be added with ~record~.
+
+    Attributes:
+
+        timings (:obj:`list` of :obj:`Timing`): The recorded timings.
+
+    """
+    enabled = True
+
+    def __init__(self):
+        self.timings = []
+
+    def __repr__(self):
+        return "Profiler({} timings)".format(len(self.timings))
+
+    def record(self, kind, name, wall, cpu):
+        """Record a timing.
+
+        Args:
+
+            kind (:obj:`str`): The kind of the timed item.
+
+            name (:obj:`str`): The name of the timed item.
+
+            wall (:obj:`float`): The wall time in seconds.
+
+            cpu (:obj:`float`): The CPU time in seconds.
+
+        Returns:
+
+            None.
+
+        """
+        self.timings.append(Timing(kind, name, wall, cpu))
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase of the build."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.record("phase", name, time.perf_counter() - wall,
+                        time.process_time() - cpu)
+
+    @contextmanager
+    def measure(self, kind, name):
+        """Time an item of the build handled by the current thread."""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(kind, name, time.perf_counter() - wall,
+                        time.thread_time() - cpu)
+
+    def top(self, count=TOP, kind=None):
+        """Return the slowest items by wall time.
+
+        Args:
+
+            count (:obj:`int`): The number of items to return.
+
+            kind (:obj:`str`):
+                The kind of items to consider. Phases are left out if None.
+
+        Returns:
+
+            (:obj:`list` of :obj:`Timing`): The slowest items.
+
+        """
+        timings = [timing for timing in self.timings
+                   if (timing.kind == kind if kind is not None
+                       else timing.kind != "phase")]
+        return sorted(timings, key=lambda timing: timing.wall,
+                      reverse=True)[:count]
+
+    def summary(self):
+        """Return the total, average and maximum time per kind of item.
+
+        Returns:
+
+            (:obj:`dict`): A map from kinds to their statistics.
+
+        """
+        summary = {}
+        for timing in self.timings:
+            stats = summary.setdefault(timing.kind, {
+                "count": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["wall"] += timing.wall
+            stats["cpu"] += timing.cpu
+            stats["max"] = max(stats["max"], timing.wall)
+        for stats in summary.values():
+            stats["mean"] = stats["wall"] / stats["count"]
+        return summary
+
+    def report(self, count=TOP):
+        """Return a human-readable report of the build.
+
+        Args:
+
+            count (:obj:`int`): The number of slowest items to list.
+
+        Returns:
+
+            (:obj:`str`): The report.
+
+        """
+        lines = ["Phases:"]
+        for timing in self.timings:
+            if timing.kind == "phase":
+                lines.append("  {:<24} {:>9.3f}s wall {:>9.3f}s cpu".format(
+                    timing.name, timing.wall, timing.cpu))
+        lines.append("Slowest items:")
+        for timing in self.top(count):
+            lines.append("  {:<8} {:<48} {:>9.3f}s wall {:>9.3f}s cpu".format(
+                timing.kind, timing.name, timing.wall, timing.cpu))
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Write a JSON report of the build to ~path~.
+
+        Returns:
+
+            None.
+
+        """
+        data = {"summary": self.summary(),
+                "timings": [timing.asDict() for timing in self.timings]}
+        with open(path, "w", encoding="utf8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+
+class NullProfiler:
+    """A profiler recording nothing, used when profiling is off.
+
+    Its methods do no work, so that the timing hooks can stay in place at a
+    negligible cost.
+
+    """
+    enabled = False
+
+    def __repr__(self):
+        return "NullProfiler()"
+
+    def record(self, kind, name, wall, cpu):
+        pass
+
+    def phase(self, name):
+        return _NULL_CONTEXT
+
+    def measure(self, kind, name):
+        return _NULL_CONTEXT
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+NULL_PROFILER = NullProfiler()
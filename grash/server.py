@@ -0,0 +1,410 @@
+# * Libraries
+
+
+import mimetypes
+import os
+import posixpath
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from .config import HOST, PORT
+from .output import MemorySink
+from .watcher import ActionHandler, Watcher
+
+
+# * Variables
+
+
+# The path of the stream of server-sent events announcing reloads.
+EVENTS_PATH = "/__grash__/events"
+
+# The interval, in seconds, between keep-alive comments on idle streams.
+HEARTBEAT = 15
+
+RELOAD_SCRIPT = ('<script>new EventSource("{}").addEventListener("reload", '
+                 'function () {{ location.reload(); }});</script>'
+                 .format(EVENTS_PATH)).encode("utf8")
+
+
+# * Classes
+
+
+class PageCache:
+    """A thread-safe map from page names to their rendered contents."""
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "PageCache({} pages)".format(len(self._pages))
+
+    def __len__(self):
+        return len(self._pages)
+
+    def get(self, name):
+        with self._lock:
+            return self._pages.get(name)
+
+    def put(self, name, data):
+        with self._lock:
+            self._pages[name] = data
+
+    def invalidate(self, names):
+        """Drop the given pages, returning the number of pages dropped."""
+        with self._lock:
+            return sum(self._pages.pop(name, None) is not None
+                       for name in names)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+class Reloader:
+    """Announces reloads to the browsers listening for them.
+
+    Attributes:
+
+        generation (:obj:`int`): The number of reloads announced so far.
+
+    """
+
+    def __init__(self):
+        self.generation = 0
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return "Reloader({})".format(self.generation)
+
+    def notify(self):
+        """Announce a reload to every listener."""
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout=None):
+        """Wait for a reload after ~generation~.
+
+        Returns:
+
+            (:obj:`int`): The current generation, equal to ~generation~ if
+            the timeout has expired first.
+
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.generation != generation,
+                                     timeout)
+            return self.generation
+
+
+class ServeWatcher(Watcher):
+    """Invalidates the pages of a development server on file changes.
+
+    Rather than rendering the affected pages again, their cached contents
+    are dropped, to be rendered on their next request.
+
+    """
+
+    def __init__(self, server, verbose=True):
+        super().__init__(server.site, verbose, server.site.debounce,
+                         server.site.latency)
+        self.server = server
+
+    def handleChanges(self, changes, verbose=True):
+        """Invalidate the pages affected by a set of changed files.
+
+        Args:
+            changes (:obj:`dict`):
+                A map from the paths to changed files to the type of the
+                action applied to them.
+
+            verbose (:obj:`bool`):
+                A boolean to control the verbosity of the output.
+                Silent if False.
+
+        Returns:
+
+            None.
+
+        """
+        server = self.server
+        stale = set()
+        docDirs = set()
+        with server.lock:
+            # Every page may use the functions of plugins.
+            clear = self.site.reloadPlugins()
+            for source, actionType in changes.items():
+                if not source.startswith(self.projectPath):
+                    continue
+                filename = os.path.relpath(source, self.projectPath)
+                if self.site.isPrivate(filename):
+                    continue
+                self.site.sourceIndex.update(
+                    filename.replace(os.path.sep, "/"))
+                if verbose:
+                    print("{} {}".format(actionType, filename))
+                if not self.isHandled(actionType, source):
+                    # Removed or moved files may leave dangling references.
+                    clear = True
+                    if self.site.isData(filename):
+                        self.site.invalidateData(filename)
+                elif self.site.isPandoc(filename):
+                    docType = os.path.splitext(filename)[1][1:]
+                    docDirs.add((docType, os.path.dirname(filename)))
+                else:
+                    stale.update(self.site.getDependencies(filename))
+
+            # Nothing is written to the build directory while serving.
+            version = self.site.documents.version
+            with self.site.writing(MemorySink()):
+                for docType, dirname in sorted(docDirs):
+                    stale.update(self.site.renderDoc(docType, dirname))
+            if self.site.documents.version != version \
+               or any(map(self.site.isPaginated, stale)):
+                # Any page may list documents, and the pages of paginated
+                # templates are not known until rendered.
+                clear = True
+            if clear:
+                server.pages.clear()
+            else:
+                server.pages.invalidate(stale)
+        if stale or docDirs or clear:
+            server.reloader.notify()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "grash"
+
+    def log_message(self, format, *args):
+        if self.server.devServer.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, data=b"", contentType="text/plain", head=False,
+              headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        if not head:
+            self.wfile.write(data)
+
+    def _events(self):
+        reloader = self.server.devServer.reloader
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        generation = reloader.generation
+        try:
+            while True:
+                current = reloader.wait(generation, HEARTBEAT)
+                if current != generation:
+                    generation = current
+                    message = "event: reload\ndata: {}\n\n".format(current)
+                else:
+                    message = ": heartbeat\n\n"
+                self.wfile.write(message.encode("utf8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+    def _get(self, head):
+        path = urlsplit(self.path).path
+        if path == EVENTS_PATH and not head:
+            return self._events()
+        devServer = self.server.devServer
+        kind, name = devServer.resolve(path)
+        if kind == "redirect":
+            return self._send(301, head=head,
+                              headers=[("Location", path + "/")])
+        if kind is None:
+            return self._send(404, b"Not found", head=head)
+        try:
+            data, contentType = devServer.page(kind, name)
+        except Exception as error:
+            devServer.site.logger.exception("Failed to render %s", name)
+            return self._send(500, "{}: {}".format(
+                type(error).__name__, error).encode("utf8"), head=head)
+        self._send(200, data, contentType, head=head)
+
+    def do_GET(self):
+        self._get(head=False)
+
+    def do_HEAD(self):
+        self._get(head=True)
+
+
+class DevServer:
+    """Serves a site over HTTP, rendering pages on demand.
+
+    Pages are rendered on their first request and kept in memory until a
+    change to one of their sources invalidates them, so that a change only
+    costs the rendering of the pages actually viewed. Static files are
+    served from the template directory. HTML pages load a script reloading
+    them whenever sources change.
+
+    Attributes:
+
+        site (:obj:`grash.GrashSite`): The served site.
+
+        host (:obj:`str`): The address the server listens on.
+
+        port (:obj:`int`): The port the server listens on.
+
+        pages (:obj:`PageCache`): The rendered pages.
+
+        reloader (:obj:`Reloader`): Announces reloads to the browsers.
+
+        lock (:obj:`threading.RLock`):
+            Serialises the accesses to the site between the request handlers
+            and the watcher.
+
+    """
+
+    def __init__(self, site, host=HOST, port=PORT, verbose=True):
+        self.site = site
+        self.host = host
+        self.port = port
+        self.verbose = verbose
+        self.pages = PageCache()
+        self.reloader = Reloader()
+        self.lock = threading.RLock()
+
+    def __repr__(self):
+        return "DevServer({}:{})".format(self.host, self.port)
+
+    def resolve(self, urlPath):
+        """Map the path of a URL to a file of the site.
+
+        Args:
+
+            urlPath (:obj:`str`): The path of a URL.
+
+        Returns:
+
+            (:obj:`tuple`): The kind of the file (~template~, ~static~,
+            ~redirect~ for a directory requested without a trailing slash,
+            or None if nothing is served there) and its name.
+
+        """
+        name = unquote(urlPath).lstrip("/")
+        if name == "" or name.endswith("/"):
+            name += "index.html"
+        name = posixpath.normpath(name)
+        if name.startswith(".."):
+            return None, name
+        with self.lock:
+            kind = "template" if name in self.site.pages \
+                else self.site.sourceIndex.kind(name)
+            if kind is None and self.site.pageOf(name) is not None:
+                kind = "template"
+            if kind is None and (name + "/index.html" in self.site.pages
+                                 or self.site.sourceIndex.kind(
+                                     name + "/index.html") == "template"):
+                return "redirect", name
+        if kind not in ("template", "static"):
+            return None, name
+        return kind, name
+
+    def page(self, kind, name):
+        """Return the contents and the type of a page, rendering it if needed.
+
+        Args:
+
+            kind (:obj:`str`): Either ~template~ or ~static~.
+
+            name (:obj:`str`): The name of the page.
+
+        Returns:
+
+            (:obj:`tuple`): The contents of the page and their content type.
+
+        """
+        contentType = mimetypes.guess_type(name)[0] \
+            or "application/octet-stream"
+        if kind == "static":
+            with open(self.site.sourceIndex.path(name), "rb") as f:
+                data = f.read()
+        else:
+            data = self.pages.get(name)
+            if data is None:
+                # The page is cached under the lock, so that the watcher
+                # cannot invalidate it between its rendering and caching.
+                with self.lock:
+                    data = self.site.renderOutput(name) \
+                        .encode(self.site.encoding)
+                    self.pages.put(name, data)
+        if contentType == "text/html":
+            data = injectScript(data)
+            contentType += "; charset={}".format(self.site.encoding)
+        return data, contentType
+
+    def serve(self):
+        """Serve the site until interrupted.
+
+        Returns:
+
+            None.
+
+        """
+        from watchdog.observers import Observer
+
+        watcher = ServeWatcher(self, self.verbose)
+        stopped = threading.Event()
+
+        def watch():
+            while not stopped.is_set():
+                changes = watcher.queue.get(timeout=1)
+                if not changes:
+                    continue
+                try:
+                    watcher.handleChanges(changes, verbose=self.verbose)
+                except Exception:
+                    # Keep watching: the next change may fix the error.
+                    self.site.logger.exception("Failed to render changes")
+
+        observer = Observer()
+        observer.schedule(ActionHandler(watcher.queue.put),
+                          path=self.site.templatePath, recursive=True)
+        observer.start()
+        thread = threading.Thread(target=watch, name="grash-watcher",
+                                  daemon=True)
+        thread.start()
+
+        httpd = ThreadingHTTPServer((self.host, self.port), _RequestHandler)
+        httpd.daemon_threads = True
+        httpd.devServer = self
+        self.site.logger.info("Serving {} on http://{}:{}/".format(
+            self.site.templatePath, self.host, httpd.server_address[1]))
+        self.site.logger.info("Press Ctrl + C to stop.")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            httpd.server_close()
+            stopped.set()
+            observer.stop()
+            observer.join()
+            thread.join()
+
+
+# * Functions
+
+
+def injectScript(data):
+    """Insert the live reload script before the end of an HTML page.
+
+    >>> injectScript(b"<body></body>").startswith(b"<body><script>")
+    True
+
+    """
+    index = data.rfind(b"</body>")
+    if index < 0:
+        return data + RELOAD_SCRIPT
+    return data[:index] + RELOAD_SCRIPT + data[index:]
@@ -0,0 +1,108 @@
+# * Libraries
+
+
+import hashlib
+import os
+
+from .manifest import MANIFEST_NAME, Manifest
+from .sync import syncFiles
+
+
+# * Functions
+
+
+def parseShard(text):
+    """Parse a shard given as ~i/N~, the i-th of N shards counting from 1.
+
+    >>> parseShard("2/4")
+    (2, 4)
+
+    Raises:
+
+        ValueError: if ~text~ does not describe a shard.
+
+    """
+    index, _, count = text.partition("/")
+    index, count = int(index), int(count)
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError("invalid shard {!r}".format(text))
+    return index, count
+
+
+def shardOf(name, count):
+    """Return the shard, counting from 1, an output belongs to.
+
+    The shard only depends on the name of the output, so that every machine
+    building a site assigns outputs to the same shards.
+
+    >>> shardOf("index.html", 1)
+    1
+    >>> shardOf("index.html", 8) == shardOf("index.html", 8)
+    True
+
+    """
+    digest = hashlib.sha256(name.encode("utf8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def inShard(name, shard):
+    """Check whether an output belongs to a shard, or to any if it is None."""
+    return shard is None or shardOf(name, shard[1]) == shard[0]
+
+
+def _rebase(path, root, newRoot):
+    """Move ~path~ from under ~root~ to under ~newRoot~, if it lies there."""
+    relative = os.path.relpath(os.path.normpath(path), os.path.normpath(root))
+    if relative == os.curdir or relative.startswith(os.pardir):
+        return path
+    return os.path.join(newRoot, relative)
+
+
+def mergeShards(shardDirs, buildDir, strategy="copy", onCopy=None):
+    """Combine the build directories of shards into a single one.
+
+    The outputs of every shard are copied to ~buildDir~ and their manifests
+    merged, so that later builds in ~buildDir~ are incremental.
+
+    Args:
+
+        shardDirs (:obj:`list` of :obj:`str`):
+            The build directories of the shards.
+
+        buildDir (:obj:`str`): The build directory to merge them into.
+
+        strategy (:obj:`str`): The strategy passed to ~grash.sync.copyFile~.
+
+        onCopy (:obj:`callable`):
+            A function called with the source and destination of each file
+            about to be copied.
+
+    Returns:
+
+        (:obj:`grash.sync.SyncReport`): The numbers of files copied.
+
+    """
+    pairs = []
+    for shardDir in shardDirs:
+        for dirpath, _, filenames in os.walk(shardDir):
+            for filename in filenames:
+                source = os.path.join(dirpath, filename)
+                name = os.path.relpath(source, shardDir)
+                if name != MANIFEST_NAME:
+                    pairs.append((source, os.path.join(buildDir, name)))
+    report = syncFiles(pairs, strategy=strategy, onCopy=onCopy)
+
+    merged = Manifest.load(buildDir)
+    for shardDir in shardDirs:
+        manifest = Manifest.load(shardDir)
+        for stage, outputs in manifest.outputs.items():
+            merged.outputs.setdefault(stage, {}).update(outputs)
+        merged.references.update(manifest.references)
+        merged.documents.update(manifest.documents)
+        # Digests of outputs are keyed by their path in the build directory
+        # of the shard; copies keep the size and modification time.
+        root = manifest.buildDir or shardDir
+        for path, cached in manifest.files.items():
+            merged.files[_rebase(path, root, buildDir)] = cached
+    merged.save()
+    return report
@@ -0,0 +1,268 @@
+# * Libraries
+
+
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiler import NULL_PROFILER
+
+
+# * Variables
+
+
+# From <linux/fs.h>: clone the extents of a file into another one.
+FICLONE = 0x40049409
+
+STRATEGIES = ("copy", "hardlink")
+
+# Errors signalling that a copy method is not supported at all, rather than
+# failing for a particular file.
+_UNSUPPORTED = {errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+                errno.EXDEV, errno.EBADF, errno.EPERM}
+
+_disabledMethods = set()
+
+
+# * Classes
+
+
+class SyncReport:
+    """A summary of a synchronisation of files.
+
+    Attributes:
+
+        copied (:obj:`int`): The number of copied files.
+
+        copiedBytes (:obj:`int`): The number of copied bytes.
+
+        skipped (:obj:`int`): The number of files already up to date.
+
+        skippedBytes (:obj:`int`): The number of bytes of skipped files.
+
+    """
+
+    def __init__(self):
+        self.copied = 0
+        self.copiedBytes = 0
+        self.skipped = 0
+        self.skippedBytes = 0
+
+    def __repr__(self):
+        return "SyncReport(copied={}, skipped={})".format(self.copied,
+                                                          self.skipped)
+
+    def __str__(self):
+        return "Copied {} files ({}), skipped {} files ({}).".format(
+            self.copied, formatSize(self.copiedBytes),
+            self.skipped, formatSize(self.skippedBytes))
+
+
+# * Functions
+
+
+def formatSize(size):
+    """Return a human-readable representation of a number of bytes.
+
+    >>> formatSize(512)
+    '512 B'
+    >>> formatSize(3 * 1024 ** 3)
+    '3.0 GB'
+
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    if unit == "B":
+        return "{} B".format(size)
+    return "{:.1f} {}".format(size, unit)
+
+
+def _reflink(fsrc, fdst, size):
+    import fcntl
+    fcntl.ioctl(fdst, FICLONE, fsrc)
+
+
+def _copyFileRange(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        sent = os.copy_file_range(fsrc, fdst, size - copied)
+        if sent == 0:
+            break
+        copied += sent
+
+
+def _sendfile(fsrc, fdst, size):
+    copied = 0
+    while copied < size:
+        sent = os.sendfile(fdst, fsrc, copied, size - copied)
+        if sent == 0:
+            break
+        copied += sent
+
+
+COPY_METHODS = (("reflink", _reflink),
+                ("copy_file_range", _copyFileRange),
+                ("sendfile", _sendfile))
+
+
+def _copyContents(source, destination):
+    """Copy the contents of a file with the fastest method available.
+
+    Reflinks share the data blocks of the source on copy-on-write file
+    systems; ~copy_file_range~ and ~sendfile~ copy inside the kernel. Methods
+    the platform does not support are not attempted again.
+
+    Returns:
+
+        (:obj:`str`): The name of the method used.
+
+    """
+    with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        for name, method in COPY_METHODS:
+            if name in _disabledMethods:
+                continue
+            try:
+                method(fsrc.fileno(), fdst.fileno(), size)
+                return name
+            except (AttributeError, ImportError):
+                _disabledMethods.add(name)
+            except OSError as error:
+                if error.errno in _UNSUPPORTED:
+                    _disabledMethods.add(name)
+            # Start over after a partial copy.
+            os.lseek(fsrc.fileno(), 0, os.SEEK_SET)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, 1 << 20)
+        return "read/write"
+
+
+def copyFile(source, destination, strategy="copy"):
+    """Copy a file, preserving its metadata.
+
+    The destination is replaced atomically and never written in place, so
+    that a hard link from an earlier build cannot write through to its
+    source.
+
+    Args:
+
+        source (:obj:`str`): The path to the file to copy.
+
+        destination (:obj:`str`): The path to copy the file to.
+
+        strategy (:obj:`str`):
+            Either ~copy~, or ~hardlink~ to link the destination to the source
+            where possible.
+
+    Returns:
+
+        (:obj:`str`): The name of the method used.
+
+    """
+    temporary = "{}.{}.tmp".format(destination, os.getpid())
+    try:
+        if strategy == "hardlink":
+            try:
+                os.link(source, temporary)
+                os.replace(temporary, destination)
+                return "hardlink"
+            except OSError:
+                pass
+        method = _copyContents(source, temporary)
+        shutil.copystat(source, temporary)
+        os.replace(temporary, destination)
+        return method
+    finally:
+        if os.path.lexists(temporary):
+            os.remove(temporary)
+
+
+def isSynced(source, destination, digest=None):
+    """Check whether a destination file is identical to its source.
+
+    Args:
+
+        source (:obj:`str`): The path to the source file.
+
+        destination (:obj:`str`): The path to the destination file.
+
+        digest (:obj:`callable`):
+            A function returning the digest of a file. If given, files are
+            compared by contents, otherwise by size and modification time.
+
+    Returns:
+
+        True if the destination is up to date, False otherwise.
+
+    """
+    try:
+        destStat = os.stat(destination)
+    except OSError:
+        return False
+    sourceStat = os.stat(source)
+    if sourceStat.st_size != destStat.st_size:
+        return False
+    if (sourceStat.st_dev, sourceStat.st_ino) \
+       == (destStat.st_dev, destStat.st_ino):
+        return True
+    if digest is not None:
+        return digest(source) == digest(destination)
+    return sourceStat.st_mtime_ns == destStat.st_mtime_ns
+
+
+def syncFiles(pairs, strategy="copy", digest=None, threads=None,
+              onCopy=None, profiler=NULL_PROFILER):
+    """Copy files whose destinations are not up to date over a thread pool.
+
+    Args:
+
+        pairs (:obj:`list` of :obj:`tuple` of :obj:`str`):
+            A list of source and destination paths.
+
+        strategy (:obj:`str`): The strategy passed to ~copyFile~.
+
+        digest (:obj:`callable`):
+            A function returning the digest of a file, to compare files by
+            contents rather than by size and modification time.
+
+        threads (:obj:`int`): The number of copying threads.
+
+        onCopy (:obj:`callable`):
+            A function called with the source and destination of each file
+            about to be copied.
+
+        profiler (:obj:`grash.profiler.Profiler`):
+            A profiler timing each copy.
+
+    Returns:
+
+        (:obj:`SyncReport`): A summary of the synchronisation.
+
+    """
+    report = SyncReport()
+
+    def sync(pair):
+        source, destination = pair
+        size = os.path.getsize(source)
+        if isSynced(source, destination, digest):
+            return False, size
+        if onCopy is not None:
+            onCopy(source, destination)
+        with profiler.measure("static", source):
+            os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+            copyFile(source, destination, strategy)
+        return True, size
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for copied, size in executor.map(sync, pairs):
+            if copied:
+                report.copied += 1
+                report.copiedBytes += size
+            else:
+                report.skipped += 1
+                report.skippedBytes += size
+    return report
@@ -2,22 +2,193 @@
 
 
 import os
-from time import sleep
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from .config import Settings
+
+
+# * Variables
+
+
+settings = Settings()
+
+DEBOUNCE = settings.debounce
+LATENCY = settings.latency
+
+# Events which do not change the contents of files.
+IGNORED_ACTIONS = {"opened", "closed_no_write"}
 
 
 # * Classes
-class ActionHandler(FileSystemEventHandler):
+class ActionHandler:
+    """Hands the file system events of a watchdog observer over to a function.
+
+    Observers only call the ~dispatch~ method of their handlers, so that
+    watchdog need not be imported until an observer is started.
+
+    """
+
     def __init__(self, handler):
-        super().__init__()
         self.handler = handler
 
+    def dispatch(self, event):
+        return self.on_any_event(event)
+
     def on_any_event(self, event):
         if not event.is_directory:
+            if event.event_type == "moved":
+                return self.handler(event.event_type, event.src_path,
+                                    event.dest_path)
             return self.handler(event.event_type, event.src_path)
 
 
+class ChangeSet(OrderedDict):
+    """A map from paths to the type of the action applied to them.
+
+    Moves are recorded as the deletion of their source and the creation of
+    their destination.
+
+    Attributes:
+
+        moves (:obj:`dict`):
+            A map from the destinations of moved files to their sources.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.moves = {}
+
+
+class EventQueue:
+    """Coalesces bursts of file system events into change sets.
+
+    Events are merged per path until no event has arrived for ~debounce~
+    seconds, or until ~latency~ seconds have passed since the first pending
+    event, whichever comes first. Editors and version control tools emit
+    many events per file, so a burst ends up as a single change set.
+
+    Attributes:
+
+        debounce (:obj:`float`):
+            The quiet period, in seconds, ending a burst of events.
+
+        latency (:obj:`float`):
+            The longest time, in seconds, an event may wait before being
+            handed over, even if events keep arriving.
+
+    """
+
+    def __init__(self, debounce=DEBOUNCE, latency=LATENCY):
+        self.debounce = debounce
+        self.latency = max(latency, debounce)
+        self._changes = ChangeSet()
+        self._first = None
+        self._last = None
+        self._condition = threading.Condition()
+
+    def __repr__(self):
+        return "EventQueue({} pending)".format(len(self._changes))
+
+    def __len__(self):
+        return len(self._changes)
+
+    def _merge(self, actionType, source):
+        changes = self._changes
+        previous = changes.pop(source, None)
+        if actionType == "deleted":
+            changes.moves.pop(source, None)
+            if previous == "created":
+                # The file only existed within the burst.
+                return False
+        elif previous == "created" and actionType == "modified":
+            actionType = previous
+        changes[source] = actionType
+        return True
+
+    def put(self, actionType, source, destination=None):
+        """Record an event.
+
+        Successive events on a path are merged: a file created and then
+        modified within a burst counts as created, and a file created and
+        then deleted is left out. Closing a file after writing counts as a
+        modification, and events which do not change files are ignored.
+
+        Args:
+
+            actionType (:obj:`str`): The type of the action.
+
+            source (:obj:`str`): The path to the file acted upon.
+
+            destination (:obj:`str`):
+                The path a file has been moved to, for ~moved~ actions.
+
+        Returns:
+
+            None.
+
+        """
+        if actionType in IGNORED_ACTIONS:
+            return
+        if actionType == "closed":
+            actionType = "modified"
+        with self._condition:
+            if actionType == "moved":
+                origin = self._changes.moves.pop(source, source)
+                existed = self._merge("deleted", source)
+                self._merge("created", destination)
+                if existed or origin != source:
+                    self._changes.moves[destination] = origin
+            else:
+                self._merge(actionType, source)
+            now = monotonic()
+            if self._first is None:
+                self._first = now
+            self._last = now
+            self._condition.notify()
+
+    def _deadline(self):
+        return min(self._last + self.debounce, self._first + self.latency)
+
+    def get(self, timeout=None):
+        """Wait for the end of a burst of events and return its change set.
+
+        Args:
+
+            timeout (:obj:`float`):
+                The longest time, in seconds, to wait for events. Waits
+                indefinitely if None.
+
+        Returns:
+
+            (:obj:`ChangeSet`): A map from paths to the type of the action
+            applied to them, empty if the timeout has expired first.
+
+        """
+        with self._condition:
+            end = None if timeout is None else monotonic() + timeout
+            while True:
+                now = monotonic()
+                if self._changes and now >= self._deadline():
+                    changes = self._changes
+                    self._changes = ChangeSet()
+                    self._first = self._last = None
+                    return changes
+                if self._changes:
+                    # Pending changes are handed over within ~latency~,
+                    # regardless of the timeout.
+                    wait = self._deadline() - now
+                elif end is None:
+                    wait = None
+                elif now >= end:
+                    return ChangeSet()
+                else:
+                    wait = end - now
+                self._condition.wait(wait)
+
+
 class Watcher:
     """Watches for changes in the GrashSite template path and renders on change.
 
@@ -26,12 +197,16 @@ class Watcher:
         site (:obj:`GrashSite`): an instance of a Grash site
         verbose (:obj:`bool`):
             True if the output on progress must be included, False otherwise
+        queue (:obj:`EventQueue`):
+            The queue coalescing the events of the file system.
 
     """
 
-    def __init__(self, site, verbose=True):
+    def __init__(self, site, verbose=True, debounce=DEBOUNCE,
+                 latency=LATENCY):
         self.site = site
         self.verbose = verbose
+        self.queue = EventQueue(debounce, latency)
 
     @property
     def projectPath(self):
@@ -58,6 +233,106 @@ class Watcher:
             and source.startswith(self.projectPath)\
             and os.path.isfile(source)
 
+    def handleChanges(self, changes, verbose=True):
+        """Re-render the website once for a set of changed files.
+
+        The dependencies of all the changed files are merged, so that every
+        affected output is generated exactly once. The outputs of deleted
+        files are removed, and those of moved static files are moved along
+        rather than copied again.
+
+        Args:
+            changes (:obj:`dict`):
+                A map from the paths to changed files to the type of the
+                action applied to them. The ~moves~ attribute of a
+                :obj:`ChangeSet` maps moved files to their former paths.
+
+            verbose (:obj:`bool`):
+                A boolean to control the verbosity of the output.
+                Silent if False.
+
+        Returns:
+
+            None.
+
+        """
+        site = self.site
+        templates = set()
+        staticFiles = set()
+        docDirs = set()
+        removed = {"templates": set(), "static": set()}
+        for source, actionType in changes.items():
+            deleted = actionType == "deleted" \
+                and source.startswith(self.projectPath)
+            if not deleted and not self.isHandled(actionType, source):
+                continue
+            filename = os.path.relpath(source, self.projectPath)
+            name = filename.replace(os.path.sep, "/")
+            kind = site.classify(name)
+            if kind == "private":
+                continue
+            if verbose:
+                print("{} {}".format(actionType, filename))
+            site.sourceIndex.update(name)
+            if kind == "pandoc":
+                docType = os.path.splitext(filename)[1][1:]
+                docDirs.add((docType, os.path.dirname(filename)))
+            elif deleted and kind == "static":
+                removed["static"].add(name)
+            elif deleted:
+                if kind == "template":
+                    removed["templates"].add(name)
+                # Templates referencing the deleted one fail to render.
+                templates.update(site.getDependencies(name))
+            elif kind == "static":
+                staticFiles.update(site.getDependencies(name))
+            else:
+                templates.update(site.getDependencies(name))
+
+        moves = []
+        for destination, origin in getattr(changes, "moves", {}).items():
+            destination = os.path.relpath(destination, self.projectPath)
+            origin = os.path.relpath(origin, self.projectPath)
+            name = destination.replace(os.path.sep, "/")
+            former = origin.replace(os.path.sep, "/")
+            if former in removed["static"] and name in staticFiles:
+                removed["static"].discard(former)
+                moves.append((former, name))
+
+        if site.reloadPlugins():
+            # Every template may use the functions of plugins.
+            templates.update(site.outdatedTemplates(site.templateNames))
+
+        assetsChanged = False
+        if site.fingerprint and (staticFiles or removed["static"]):
+            assetsChanged = bool(site.updateAssets())
+            if assetsChanged:
+                # Templates referencing the changed static files render
+                # their new fingerprinted names.
+                templates.update(site.outdatedTemplates(site.templateNames))
+
+        with site.writing():
+            site.moveOutputs("static", moves)
+            for stage, names in removed.items():
+                site.removeOutputs(stage, sorted(names))
+            version = site.documents.version
+            for docType, dirname in sorted(docDirs):
+                templates.update(site.renderDoc(docType, dirname))
+            if site.documents.version != version:
+                # Templates listing documents render the new metadata.
+                templates.update(site.outdatedTemplates(site.templateNames))
+            if templates:
+                site.renderTemplates(sorted(templates))
+        if staticFiles:
+            site.copyStatic(sorted(staticFiles))
+        if assetsChanged:
+            site.writeAssetManifest()
+        if templates or staticFiles or docDirs or moves \
+           or any(removed.values()):
+            if site.compress:
+                site.compressOutputs(site.outputNames(), verbose)
+            site.manifest.save()
+
     def actionHandler(self, actionType, source, verbose=True):
         """Re-render the website upon any significant change in files.
 
@@ -78,36 +353,36 @@ class Watcher:
             None.
 
         """
-        filename = os.path.relpath(source, self.projectPath)
-        if self.isHandled(actionType, source):
-            if verbose:
-                print("{} {}".format(actionType, filename))
-            if self.site.isStatic(filename):
-                staticFiles = self.site.getDependencies(filename)
-                self.site.copyStatic(staticFiles)
-            elif self.site.isPandoc(filename):
-                docType = os.path.splitext(filename)[1][1:]
-                self.site.renderDoc(docType, filename)
-            else:
-                templates = self.site.getDependencies(filename)
-                self.site.renderTemplates(templates)
+        self.handleChanges({source: actionType}, verbose=verbose)
 
     def watch(self):
         """Watch and re-render upon the creation or modification of files.
 
+        Events are coalesced by ~self.queue~, and the site is re-rendered
+        once per quiet period.
+
         Returns:
 
             None.
 
         """
+        from watchdog.observers import Observer
+
         observer = Observer()
-        observer.schedule(ActionHandler(self.actionHandler),
+        observer.schedule(ActionHandler(self.queue.put),
                           path=self.projectPath,
                           recursive=True)
         observer.start()
         try:
             while True:
-                sleep(1)
+                changes = self.queue.get(timeout=1)
+                if not changes:
+                    continue
+                try:
+                    self.handleChanges(changes, verbose=self.verbose)
+                except Exception:
+                    # Keep watching: the next change may fix the error.
+                    self.site.logger.exception("Failed to render changes")
         except KeyboardInterrupt:
             observer.stop()
         observer.join()
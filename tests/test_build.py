@@ -0,0 +1,333 @@
+# * Libraries
+
+
+import errno
+import gzip
+import json
+import os
+
+import pytest
+
+import grash.grash
+from grash.grash import GrashSite, make
+from grash.watcher import ChangeSet, Watcher
+
+
+# * Variables
+
+
+TEMPLATES = {
+    "_base.html": "<html>{% block body %}{% endblock %}</html>\n",
+    "_nav.html": "<nav>{{ data.site.title }}</nav>\n",
+    "_posts.html": "{% extends '_base.html' %}"
+                   "{% block body %}<article>{% block post %}{% endblock %}"
+                   "</article>{% endblock %}\n",
+    "index.html": "{% set paginate = {'items': 'documents', 'size': 2} %}"
+                  "{% extends '_base.html' %}{% block body %}"
+                  "{% for document in pager.items %}{{ document.title }} "
+                  "{% endfor %}{{ pager.next }}{% endblock %}\n",
+    "about.html": "{% extends '_base.html' %}"
+                  "{% block body %}{% include '_nav.html' %}About"
+                  "{% endblock %}\n",
+    "plain.html": "<p>{{ 6 * 7 }}</p>\n",
+    "assets/main.css": "body { color: black; }\n",
+    "data/site.json": '{"title": "Test"}\n',
+}
+# Static files large enough to be compressed.
+TEMPLATES.update(("assets/long{}.css".format(number),
+                  "p {{ margin: {}px; }}\n".format(number) * 64)
+                 for number in range(6))
+
+POSTS = 5
+
+
+# * Functions
+
+
+def convert(text, *args, **kwargs):
+    """Stand in for pandoc, which the tests do not depend on."""
+    return "<p>{}</p>".format(" ".join(text.split()[-3:]))
+
+
+def writeFiles(root, files):
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A site of templates, static and data files and pandoc documents."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(grash.grash, "convert", convert)
+    writeFiles(tmp_path / "templates", TEMPLATES)
+    writeFiles(tmp_path / "posts", {
+        "p{}.org".format(number):
+        "#+TITLE: Post {0}\n#+DATE: 2020-01-0{0}\nWords of post {0}.\n"
+        .format(number)
+        for number in range(1, POSTS + 1)})
+    return tmp_path
+
+
+def makeSite(project, buildDir="build", **kwargs):
+    path = project / buildDir
+    path.mkdir(exist_ok=True)
+    return make(templatePath=str(project / "templates"),
+                buildDir=str(path),
+                pandocDirs=["posts"],
+                staticDirs=["assets"],
+                cacheDir=None,
+                verbose=False,
+                **kwargs)
+
+
+def rendered(monkeypatch):
+    """Record the names of the outputs rendered from now on."""
+    names = []
+    writeTemplate = GrashSite.writeTemplate
+
+    def spy(site, templateName, text):
+        names.append(templateName)
+        return writeTemplate(site, templateName, text)
+
+    monkeypatch.setattr(GrashSite, "writeTemplate", spy)
+    return names
+
+
+def outputs(project, buildDir="build"):
+    """Return the files of a build directory, manifest aside."""
+    root = project / buildDir
+    return sorted(str(path.relative_to(root)).replace(os.path.sep, "/")
+                  for path in root.rglob("*")
+                  if path.is_file() and not path.name.startswith("."))
+
+
+# * Tests
+
+# ** Parallel rendering
+
+
+def testParallelMatchesSerial(project):
+    serial = makeSite(project).buildToMemory()
+    parallel = makeSite(project, jobs=3).buildToMemory()
+    assert "page/3/index.html" in serial
+    assert parallel == serial
+
+
+@pytest.mark.parametrize("broken", ["{{ missing.attribute }}",
+                                    "{% if %}{% endif %}"])
+def testParallelRaisesLikeSerial(project, broken):
+    writeFiles(project / "templates", {"broken.html": broken})
+    errors = []
+    for jobs, buildDir in [(1, "serial"), (3, "parallel")]:
+        with pytest.raises(Exception) as error:
+            makeSite(project, buildDir, jobs=jobs).render()
+        errors.append((type(error.value), str(error.value)))
+    assert errors[0] == errors[1]
+
+
+# ** Incremental builds
+
+
+def testNoOpRebuildRendersNothing(project, monkeypatch):
+    makeSite(project).render()
+    before = {name: os.stat(project / "build" / name).st_mtime_ns
+              for name in outputs(project)}
+    names = rendered(monkeypatch)
+    makeSite(project).render()
+    assert names == []
+    assert {name: os.stat(project / "build" / name).st_mtime_ns
+            for name in outputs(project)} == before
+
+
+def testChangedModuleRendersItsDependentsOnly(project, monkeypatch):
+    makeSite(project).render()
+    names = rendered(monkeypatch)
+    writeFiles(project / "templates", {"_nav.html": "<nav>New</nav>\n"})
+    makeSite(project).render()
+    assert names == ["about.html"]
+
+
+def testChangedItemRendersItsPageOnly(project, monkeypatch):
+    makeSite(project).render()
+    names = rendered(monkeypatch)
+    # The oldest post is the only one of the last page.
+    writeFiles(project / "posts", {
+        "p1.org": "#+TITLE: First\n#+DATE: 2020-01-01\nThe first post.\n"})
+    makeSite(project).render()
+    assert sorted(names) == ["page/3/index.html", "posts/p1/index.html"]
+    assert "First" in (project / "build/page/3/index.html").read_text()
+
+
+def testFailedWriteIsNotRecorded(project, monkeypatch):
+    makeSite(project).render()
+    writeFiles(project / "templates", {"plain.html": "<p>New</p>\n"})
+    replace = os.replace
+
+    def full(source, destination):
+        if destination.endswith("plain.html"):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+        return replace(source, destination)
+
+    monkeypatch.setattr(os, "replace", full)
+    with pytest.raises(OSError):
+        makeSite(project).render()
+    monkeypatch.setattr(os, "replace", replace)
+    makeSite(project).render()
+    assert (project / "build/plain.html").read_text() == "<p>New</p>"
+
+
+def testEditedPluginIsLoadedAgain(project):
+    plugin = "def register(registry):\n" \
+        "    registry.filter(lambda text: {!r}, name='mark')\n"
+    writeFiles(project, {"grash_plugins.py": plugin.format("old")})
+    writeFiles(project / "templates", {"mark.html": "{{ 'x' | mark }}"})
+    site = makeSite(project)
+    site.render()
+    writeFiles(project, {"grash_plugins.py": plugin.format("new")})
+    site.render()
+    assert (project / "build/mark.html").read_text() == "new"
+    writeFiles(project, {"grash_plugins.py": plugin.format("newer")})
+    makeSite(project).render()
+    assert (project / "build/mark.html").read_text() == "newer"
+
+
+# ** Compression
+
+
+def testCompressionOffRemovesSiblings(project):
+    makeSite(project, compress=True, compressThreshold=0).render()
+    assert "assets/long0.css.gz" in outputs(project)
+    writeFiles(project / "templates/assets", {"long0.css": "p {}\n" * 64})
+    makeSite(project).render()
+    assert not any(name.endswith(".gz") for name in outputs(project))
+
+
+def testUnchangedOutputsAreNotCompressedAgain(project, monkeypatch):
+    makeSite(project, compress=True, compressThreshold=0).render()
+    names = outputs(project)
+    assert "assets/long0.css.gz" in names
+    # Small pages do not compress, so no sibling of theirs is kept.
+    assert "plain.html.gz" not in names
+    compressed = []
+    compressFiles = grash.grash.compressFiles
+
+    def spy(paths, *args):
+        compressed.extend(paths)
+        return compressFiles(paths, *args)
+
+    monkeypatch.setattr(grash.grash, "compressFiles", spy)
+    makeSite(project, compress=True, compressThreshold=0).render()
+    assert compressed == []
+    assert outputs(project) == names
+
+
+def testSiblingsMatchTheirOutputs(project):
+    makeSite(project, compress=True, compressThreshold=512).render()
+    names = outputs(project)
+    # Outputs below the threshold are not compressed.
+    assert "assets/main.css.gz" not in names
+    path = project / "build/assets/long0.css"
+    with gzip.open(str(path) + ".gz", "rb") as f:
+        assert f.read() == path.read_bytes()
+
+
+def testChangedOutputIsCompressedAgain(project):
+    makeSite(project, compress=True, compressThreshold=0).render()
+    site = makeSite(project, compress=True, compressThreshold=0)
+    writeFiles(project / "templates/assets", {"long0.css": "p {}\n" * 64})
+    site.render()
+    path = project / "build/assets/long0.css"
+    with gzip.open(str(path) + ".gz", "rb") as f:
+        assert f.read() == b"p {}\n" * 64
+    assert site.compressOutputs(site.outputNames(), verbose=False) == []
+
+
+# ** Fingerprinting
+
+
+def testFingerprintedNamesFollowContents(project):
+    writeFiles(project / "templates",
+               {"style.html": "{{ asset_url('/assets/main.css') }}"})
+    site = makeSite(project, fingerprint=True)
+    site.render()
+    former = site.outputName("assets/main.css")
+    assert former != "assets/main.css" and former in outputs(project)
+    assert (project / "build/style.html").read_text() == "/" + former
+    writeFiles(project / "templates/assets", {"main.css": "body {}\n"})
+    site = makeSite(project, fingerprint=True)
+    site.render()
+    current = site.outputName("assets/main.css")
+    names = outputs(project)
+    assert current != former and current in names and former not in names
+    assert (project / "build/style.html").read_text() == "/" + current
+    assets = json.loads((project / "build/asset-manifest.json").read_text())
+    assert assets["assets/main.css"] == current
+
+
+def testFingerprintingOffRestoresNames(project):
+    makeSite(project, fingerprint=True).render()
+    makeSite(project).render()
+    names = outputs(project)
+    assert "assets/main.css" in names and "asset-manifest.json" not in names
+    assert not any(name.startswith("assets/main.") and name.count(".") > 1
+                   for name in names)
+
+
+def testMovedStaticFileKeepsItsFingerprint(project):
+    site = makeSite(project, fingerprint=True)
+    site.render()
+    former = site.outputName("assets/main.css")
+    inode = os.stat(project / "build" / former).st_ino
+    templates = project / "templates"
+    os.rename(templates / "assets/main.css", templates / "assets/site.css")
+    changes = ChangeSet([(str(templates / "assets/main.css"), "deleted"),
+                         (str(templates / "assets/site.css"), "created")])
+    changes.moves[str(templates / "assets/site.css")] = \
+        str(templates / "assets/main.css")
+    Watcher(site, verbose=False).handleChanges(changes, verbose=False)
+    current = site.outputName("assets/site.css")
+    names = outputs(project)
+    assert current == former.replace("/main.", "/site.")
+    assert current in names and former not in names
+    # The output has been moved along rather than copied again.
+    assert os.stat(project / "build" / current).st_ino == inode
+
+
+# ** Pruning
+
+
+def testVanishedSourcesArePruned(project):
+    makeSite(project).render()
+    os.remove(project / "posts/p5.org")
+    os.remove(project / "templates/plain.html")
+    os.remove(project / "templates/assets/main.css")
+    makeSite(project).render()
+    names = outputs(project)
+    for name in ["posts/p5/index.html", "plain.html", "assets/main.css",
+                 "page/3/index.html"]:
+        assert name not in names
+    assert "posts/p4/index.html" in names
+
+
+def testBuildToMemoryLeavesBuildDirectory(project):
+    makeSite(project).render()
+    before = outputs(project)
+    site = makeSite(project)
+    site.buildToMemory()
+    os.remove(project / "posts/p2.org")
+    memory = site.buildToMemory()
+    assert "posts/p2/index.html" not in memory
+    assert outputs(project) == before
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def testShardKeepsOtherShards(project, compress):
+    options = {"compress": compress, "compressThreshold": 0}
+    makeSite(project, **options).render()
+    before = outputs(project)
+    assert compress == any(name.endswith(".gz") for name in before)
+    for index in range(1, 4):
+        makeSite(project, shard=(index, 3), **options).render()
+    assert outputs(project) == before
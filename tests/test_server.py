@@ -0,0 +1,83 @@
+# * Libraries
+
+
+import os
+
+import pytest
+
+from grash.output import MemorySink
+from grash.server import DevServer, ServeWatcher
+
+from test_build import makeSite, project, writeFiles  # noqa: F401
+
+
+# * Functions
+
+
+@pytest.fixture
+def server(project):  # noqa: F811
+    """A development server of the project, as ~GrashSite.serve~ makes."""
+    site = makeSite(project)
+    with site.writing(MemorySink()):
+        for docType in site.pandocTypes:
+            site.renderDocs(docType, site.pandocDirs, verbose=False)
+    return DevServer(site, verbose=False)
+
+
+def change(server, name, actionType="modified"):
+    """Let the watcher of a server handle the change of a source."""
+    path = os.path.join(server.site.templatePath, name)
+    ServeWatcher(server, verbose=False).handleChanges({path: actionType},
+                                                      verbose=False)
+
+
+# * Tests
+
+# ** Resolving URLs
+
+
+@pytest.mark.parametrize("path, resolved", [
+    ("/", ("template", "index.html")),
+    ("/about.html", ("template", "about.html")),
+    ("/page/2/", ("template", "page/2/index.html")),
+    ("/posts/p1/", ("template", "posts/p1/index.html")),
+    ("/posts/p1", ("redirect", "posts/p1")),
+    ("/assets/main.css", ("static", "assets/main.css")),
+    ("/_base.html", (None, "_base.html")),
+    ("/data/site.json", (None, "data/site.json")),
+    ("/missing.html", (None, "missing.html")),
+    ("/../secret", (None, "../secret")),
+])
+def testResolve(server, path, resolved):
+    assert server.resolve(path) == resolved
+
+
+def testPageInjectsReloadScript(server):
+    data, contentType = server.page("template", "about.html")
+    assert contentType == "text/html; charset=utf8"
+    assert b"<nav>Test</nav>" in data and b"EventSource" in data
+
+
+# ** Invalidating pages
+
+
+def testChangedModuleInvalidatesItsDependents(server, project):
+    for name in ["about.html", "plain.html"]:
+        server.page("template", name)
+    generation = server.reloader.generation
+    writeFiles(project / "templates", {"_nav.html": "<nav>New</nav>\n"})
+    change(server, "_nav.html")
+    assert server.pages.get("about.html") is None
+    assert server.pages.get("plain.html") is not None
+    assert server.reloader.generation == generation + 1
+    assert b"<nav>New</nav>" in server.page("template", "about.html")[0]
+
+
+def testChangedDataInvalidatesItsReaders(server, project):
+    for name in ["about.html", "plain.html"]:
+        server.page("template", name)
+    writeFiles(project / "templates", {"data/site.json": '{"title": "New"}'})
+    change(server, "data/site.json")
+    assert server.pages.get("plain.html") is not None
+    assert b"<nav>New</nav>" in server.page("template", "about.html")[0]
+
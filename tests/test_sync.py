@@ -0,0 +1,82 @@
+# * Libraries
+
+
+import os
+
+from grash.sync import copyFile, isSynced, syncFiles
+
+
+# * Functions
+
+
+def makeFile(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+# * Tests
+
+# ** Comparing files
+
+
+def testMissingDestinationIsNotSynced(tmp_path):
+    source = makeFile(tmp_path / "a.css", "a")
+    assert not isSynced(source, str(tmp_path / "b.css"))
+
+
+def testSyncedBySizeAndTime(tmp_path):
+    source = makeFile(tmp_path / "a.css", "a")
+    destination = makeFile(tmp_path / "b.css", "b")
+    stat = os.stat(source)
+    os.utime(destination, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    # Without digests, files of the same size and time are alike.
+    assert isSynced(source, destination)
+    os.utime(destination, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert not isSynced(source, destination)
+
+
+def testSyncedByDigest(tmp_path):
+    source = makeFile(tmp_path / "a.css", "a")
+    destination = makeFile(tmp_path / "b.css", "a")
+    os.utime(destination, ns=(0, 0))
+
+    def digest(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    assert isSynced(source, destination, digest)
+    makeFile(tmp_path / "b.css", "b")
+    assert not isSynced(source, destination, digest)
+
+
+# ** Copying files
+
+
+def testSyncSkipsUpToDateFiles(tmp_path):
+    pairs = [(makeFile(tmp_path / "src" / name, name * 10),
+              str(tmp_path / "dst" / name))
+             for name in ["a.css", "b.js"]]
+    report = syncFiles(pairs)
+    assert (report.copied, report.skipped) == (2, 0)
+    mtime = os.stat(pairs[0][1]).st_mtime_ns
+    makeFile(tmp_path / "src" / "b.js", "changed")
+    report = syncFiles(pairs)
+    assert (report.copied, report.skipped) == (1, 1)
+    assert os.stat(pairs[0][1]).st_mtime_ns == mtime
+    assert open(pairs[1][1]).read() == "changed"
+
+
+def testHardlinksAreSyncedAndNeverWrittenThrough(tmp_path):
+    source = makeFile(tmp_path / "a.css", "a")
+    destination = str(tmp_path / "build" / "a.css")
+    os.makedirs(os.path.dirname(destination))
+    assert syncFiles([(source, destination)], strategy="hardlink").copied == 1
+    assert os.path.samefile(source, destination)
+    assert syncFiles([(source, destination)],
+                     strategy="hardlink").skipped == 1
+    # Copying over the link replaces it rather than writing to its source.
+    other = makeFile(tmp_path / "b.css", "b")
+    copyFile(other, destination)
+    assert open(source).read() == "a"
+    assert open(destination).read() == "b"
@@ -0,0 +1,116 @@
+# * Libraries
+
+
+import threading
+import time
+
+from grash.watcher import ChangeSet, EventQueue
+
+
+# * Functions
+
+
+def drain(queue):
+    """Return the change set of the events put so far."""
+    return queue.get(timeout=0)
+
+
+# * Tests
+
+# ** Merging events
+
+
+def testCreatedThenModifiedIsCreated():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("created", "a")
+    queue.put("modified", "a")
+    assert drain(queue) == {"a": "created"}
+
+
+def testCreatedThenDeletedIsLeftOut():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("modified", "b")
+    queue.put("created", "a")
+    queue.put("deleted", "a")
+    assert drain(queue) == {"b": "modified"}
+
+
+def testModifiedThenDeletedIsDeleted():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("modified", "a")
+    queue.put("deleted", "a")
+    assert drain(queue) == {"a": "deleted"}
+
+
+def testClosedIsModifiedAndOpenedIgnored():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("opened", "a")
+    queue.put("closed_no_write", "a")
+    assert len(queue) == 0
+    queue.put("closed", "a")
+    assert drain(queue) == {"a": "modified"}
+
+
+def testMoveChainKeepsItsOrigin():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("moved", "a", "b")
+    queue.put("moved", "b", "c")
+    changes = drain(queue)
+    assert changes == {"a": "deleted", "c": "created"}
+    assert changes.moves == {"c": "a"}
+
+
+def testMovedNewFileIsCreated():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("created", "a")
+    queue.put("moved", "a", "b")
+    changes = drain(queue)
+    assert changes == {"b": "created"}
+    assert changes.moves == {}
+
+
+def testDeletedMoveDestinationForgetsTheMove():
+    queue = EventQueue(debounce=0, latency=0)
+    queue.put("moved", "a", "b")
+    queue.put("deleted", "b")
+    changes = drain(queue)
+    # The destination only existed within the burst.
+    assert changes == {"a": "deleted"}
+    assert changes.moves == {}
+
+
+# ** Timing
+
+
+def testEmptyQueueTimesOut():
+    changes = EventQueue(debounce=0, latency=0).get(timeout=0.01)
+    assert isinstance(changes, ChangeSet) and not changes
+
+
+def testBurstEndsAfterDebounce():
+    queue = EventQueue(debounce=0.2, latency=5)
+    start = time.monotonic()
+    queue.put("modified", "a")
+    assert drain(queue) == {"a": "modified"}
+    assert 0.2 <= time.monotonic() - start < 5
+
+
+def testLatencyBoundsEndlessBursts():
+    queue = EventQueue(debounce=0.2, latency=0.4)
+    stopped = threading.Event()
+
+    def modify():
+        while not stopped.is_set():
+            queue.put("modified", "a")
+            time.sleep(0.02)
+
+    start = time.monotonic()
+    thread = threading.Thread(target=modify)
+    thread.start()
+    try:
+        assert queue.get() == {"a": "modified"}
+        elapsed = time.monotonic() - start
+    finally:
+        stopped.set()
+        thread.join()
+    assert 0.4 <= elapsed < 2